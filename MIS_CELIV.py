@@ -3,6 +3,19 @@
 # do CELIV measurements
 # v0.01 02.11.2022 initial version  (based on scilab MIS_CELIV_FINAL working version_20160315_vw.sce )
 # v0.02 19.04.2022 class-based instr version
+# v0.03 18.10.2026 save_shots: single acquisitions are written to <fname>_shots.dat during the measurement
+# v0.04 18.10.2026 waveform uploads are skipped if the generator has the same waveform already (see celiv_send_WF())
+# v0.05 18.10.2026 acq_poll: triggers paced by scope acquisition count instead of fixed delays (TDS2022B)
+# v0.06 18.10.2026 acq_pipe: next acquisition runs while the previous record is decoded and saved (TDS2022B, see celiv_acq.py)
+# v0.07 18.10.2026 use_sim: simulated instruments and RC device instead of bench (see celiv_sim.py)
+# v0.08 18.10.2026 instruments initialized in parallel, LED waveform uploaded while FG waveform is prepared (see celiv_session.py)
+# v0.09 18.10.2026 use_cache: settings already set are not sent again (see celiv_scpi.py)
+# v0.10 18.10.2026 acq_bin: binary readout of TDS2022B, timing of readout printed (see celiv_acq.celiv_tds_bin_class)
+# v0.11 18.10.2026 streaming average (celiv_avg_class): rejected shots are repeated (was: dropped), stop at noise target se_target
+# v0.12 18.10.2026 use_cache, save_shots, acq_poll, acq_pipe, acq_bin default to False (behaviour as before v0.03)
+# v0.13 18.10.2026 init_concurrent: parallel init and LED upload of v0.08 only if switched on (default False: one instrument after the other)
+# v0.14 18.10.2026 acq_pipe removed (next burst in parallel to decoding / saving gained ~1 %, see celiv_acq.py)
+# v0.15 18.10.2026 dev_max defaults to None (no rejection by deviation), progress shows attempt and # of accepted acquisitions
 
 import numpy as np
 import time
@@ -13,26 +26,45 @@ from instr.fg_class import fg_class
 from instr.tds2022b import t20_x_intv, t20_y_intv
 #from instr.cs328a import *
 #from instr.spexctrl import spexctrl_class
-from meas.savefile import svspec
+from meas.savefile import svspec, svspec_append_class
 from meas.celiv import celiv_open_instr, celiv_init_FGs, celiv_init_osca, celiv_init_osca2, celiv_send_WF, celiv_osca2_aquire_WF, ny_calc_WF #*
+from meas.celiv import celiv_init_concurrent, celiv_send_WF_async
+from meas.celiv_session import celiv_session_class
+from meas.celiv_acq import celiv_tds_bin_class, celiv_avg_class
+from meas.celiv_sim import sim_rm_class
+from meas.celiv_scpi import celiv_cache_class
 
 if __name__ == "__main__":
     use_OSC1 = False#True #False False=Tektronix TDS2022B, True=CS328A Cleverscope
-    rsc = pyvisa.ResourceManager() if 'rsc' not in globals()  else rsc
+    use_sim  = False  # True: simulated instruments (celiv_sim.py), e.g. to check timing of the acquisition loop without bench
+    init_concurrent = False  # True: FG, AG and TDS2022B initialized in parallel, LED waveform uploaded in background (celiv_session.py)
+    if 'rsc' not in globals():
+        rsc = sim_rm_class()  if use_sim  else pyvisa.ResourceManager()
     viFG, viOSC, viAG, sxc = celiv_open_instr(rsc, use_SPEXCTRL=True, use_TDS2022B=not use_OSC1)
     FG = fg_class(viFG, fg_typ='a33220') # fg_typ='k3390')
     AG = fg_class(viAG, fg_typ='a33220')
+    use_cache = False # True: writes not changing a setting of FG, AG, TDS2022B are dropped (celiv_scpi.py)
+    if use_cache:
+        FG.vi, AG.vi = celiv_cache_class(FG.vi), celiv_cache_class(AG.vi)
+        if not use_OSC1:
+            viOSC = celiv_cache_class(viOSC)
     if use_OSC1:   # rename handle to avoid confusion (OSC1 uses own driver not VISA)
         OSC = viOSC
         del viOSC
     print('instruments opened.')
+    ses = None   # (sequential init and uploads)
+    if init_concurrent:
+        ses = celiv_session_class(FG=FG, AG=AG)  if use_OSC1  else celiv_session_class(FG=FG, AG=AG, OSC=viOSC)   # one thread per instrument
     
-    celiv_init_FGs(FG, AG, 0)
-    FG.setTerm50Ohm(False)
     if use_OSC1:
+        celiv_init_FGs(FG, AG, 0)
         celiv_init_osca(OSC, 0)
-    else:
+    elif ses is None:
+        celiv_init_FGs(FG, AG, 0)
         celiv_init_osca2(viOSC)
+    else:
+        celiv_init_concurrent(ses, 0)   # FG, AG and scope in parallel
+    FG.setTerm50Ohm(False)
     
     # -------------------------------------------
     # OTRACE parameter
@@ -54,7 +86,13 @@ if __name__ == "__main__":
     tLED          = 1e-6
     VLED          = 2
     nOSCrep       = 8 #16   # 1 4 16 64 128
-    nPCrep        = 2 #32
+    nPCrep        = 2 #32   # max. # of averaged acquisitions (less if se_target is reached)
+    nPCretry      = 4       # max. # of additional acquisitions replacing rejected ones
+    se_target     = None    # noise target: stop if rms of standard error of mean of ch1, ch2 <= se_target (V), None: nPCrep acquisitions
+    dev_max       = None    # e.g. 10: acquisition rejected if mean square deviation from average of ch1 or ch2 > dev_max * median of the channel (None: no check)
+    save_shots    = False  # True: each acquisition (t, ch1, ch2) is appended to <fname>_shots.dat while measuring (kept if run crashes)
+    acq_poll      = False  # True: next trigger as soon as the scope has the shot and charging time is over (TDS2022B), False: fixed t_delay
+    acq_bin       = False  # True: binary readout of TDS2022B (1 byte/point), False: ASCII
     ch2w1         = -0.1
     ch2w2         = 0.1
     
@@ -87,22 +125,33 @@ if __name__ == "__main__":
     cmt.append( '; Aarea (cm2):'+f"{Aarea:f}" )
     cmt.append( '; nOSCrep:   '+f"{nOSCrep:d}" )
     cmt.append( '; nPCrep:   '+f"{nPCrep:d}" )
+    cmt.append( '; se_target (V):   '+f"{se_target}" )
     cmt.append( '; t_min_charging(s):   '+f"{t_min_charging:e}" )
     # initialize instruments
-    celiv_init_FGs(FG, AG,1)
     if use_OSC1:
+        celiv_init_FGs(FG, AG,1)
         celiv_init_osca(OSC,1)
-    else:
+    elif ses is None:
+        celiv_init_FGs(FG, AG,1)
         celiv_init_osca2(viOSC)
+    else:
+        celiv_init_concurrent(ses, 1)
     sxc.setZ(0) # 0=through, 1=through + 1k to GND, 2=no connection, 3= no connect. with osca-side 1k to GND
         #global xxx_abort; xxx_abort = %F;
     # --------------------- 
     # calculate waveform form the Lightpulse (agilent)
     a,dtLED,fLED, nt0L, ntpL, nthL, ntnL, ntdL, n_L = AG.calc_CELIV_WF(tx, 0e-6, tLED, 0, 0, 4e-6, 1) #a33220_calc_CELIV_WF(tx, 0e-6, tLED, 0, 0, 4e-6, 1)
-    celiv_send_WF(AG, a)  # was: dac=round(8191*a); a33220_sendWF0(viAG, dac);
-    AG.setFreq(fLED) #*size(a,'*')/size(dac,'*'));
+    if ses is None:
+        fAG = None
+        if not celiv_send_WF(AG, a):  # was: dac=round(8191*a); a33220_sendWF0(viAG, dac);
+            print('LED waveform already loaded (upload skipped).')
+        AG.setFreq(fLED) #*size(a,'*')/size(dac,'*'));
+        AG.setV(0, VLED)
+    else:
+        fAG = celiv_send_WF_async(ses, 'AG', a)  # in background while FG waveform is prepared
+        ses.submit('AG', AG.setFreq, fLED)
+        ses.submit('AG', AG.setV, 0, VLED)
     tLEDdac = dtLED * len(a)  # total time of LED waveform
-    AG.setV(0, VLED)
     
     ## -------------create otrace waveform: vectr a
     ##a,dt,f, nt0, ntp, nth, ntn, ntd, n_ = k3390_calc_CELIV_WF(t0, tp, th, tn, td, te, n_pulses,VR,dV)
@@ -124,12 +173,17 @@ if __name__ == "__main__":
     fig, ax = plt.subplots(1,1)
 
     # ------------------------Sending Waveform and measure-------------------------------------
-    celiv_send_WF(FG, a)  # was: dac=round(8191*a); k3390_sendWF0(viFG, dac);
+    if not celiv_send_WF(FG, a):  # was: dac=round(8191*a); k3390_sendWF0(viFG, dac);
+        print('waveform already loaded (upload skipped).')
     FG.setFreq(f)  #*size(a,'*')/size(dac,'*'));
     tFGdac = dt * len(a)  # total time of waveform
     #k3390_setV(viFG, V0, 2*abs(dV)) #+abs(VR)
     #k3390_setV(viFG, V0, Vmax) #2*abs(dV)
     FG.setV((Vmax+Vmin)/2, abs(Vmax-Vmin))
+    if fAG is not None:
+        if not fAG.result():
+            print('LED waveform already loaded (upload skipped).')
+        ses.sync('AG')
     AG.output(True)
     FG.output(True)
     ##tw=[0*dt*nt0+t0(ii), 0*dt*n_+t0(ii)+tp(ii)]
@@ -157,39 +211,54 @@ if __name__ == "__main__":
     time.sleep(0.1) #Delay(0.1); //100ms
     t_delay_charging = dt*(nt0+ntp+nth+ntn) + t_min_charging
     t_delay = np.asarray([tFGdac, tend, tLEDdac, t_delay_charging]).max() + 0.001  # delay time between pulses
+    t_rep_min = np.asarray([tFGdac, tLEDdac, t_delay_charging]).max() + 0.001     # min. time between pulses with acq_poll (scope is polled)
     #scf(1); clf;
-    for itt in range(nPCrep):
-        if use_OSC1:
-            t, ch1, ch2 = celiv_osca_aquire_WF(OSC, FG, nOSCrep, t_delay, Tmin)
-        else:
-            t, ch1, ch2 = celiv_osca2_aquire_WF(viOSC, FG, nOSCrep, t_delay)
-        print(f'# itt={itt+1}/{nPCrep}')
-        if itt == 0:
-            ch1s, ch2s, ts = ch1, ch2, t
+    sv_shots = svspec_append_class(os.path.splitext(fname)[0]+'_shots.dat', cmt, '%e')  if save_shots  else None
+    if use_OSC1:
+        shots = (celiv_osca_aquire_WF(OSC, FG, nOSCrep, t_delay, Tmin)  for itt in range(nPCrep+nPCretry))
+    else:
+        rd = celiv_tds_bin_class(viOSC)  if acq_bin  else None
+        shots = (celiv_osca2_aquire_WF(viOSC, FG, nOSCrep, t_rep_min, poll=True, rd=rd)  if acq_poll  else celiv_osca2_aquire_WF(viOSC, FG, nOSCrep, t_delay, rd=rd)  for itt in range(nPCrep+nPCretry))
+    avg = celiv_avg_class(2, dev_max=dev_max, se_target=se_target)
+    for itt, (t, ch1, ch2) in enumerate(shots):
+        if sv_shots is not None:
+            sv_shots.add(t, np.asarray([ch1, ch2]))
+        accepted = avg.add(ch1, ch2)
+        print(f'# attempt {itt+1}/{nPCrep+nPCretry}: avg.n={avg.n}/{nPCrep}' + ('' if accepted else f', rejected: {avg.reject}'))
+        if accepted and avg.n == 1:
+            ts = t.copy()   # (binary readout reuses its arrays)
             #ax.plot(t*1e6, ch1)
             #ax.plot(t*1e6, ch2)
             #plt.show()
-        else:
-            if len(ch1s)!=len(ch1):
-                itt -= 1
-                print(itt)
-            else:
-                ch1s = ch1s + ch1
-                ch2s = ch2s + ch2
+        if avg.n >= nPCrep or avg.done():
+            break
+    shots.close()
+    assert avg.n > 0, f"no acquisition accepted ({avg.reject})"
+    if sv_shots is not None:
+        sv_shots.close()
+    if not use_OSC1 and rd is not None:
+        tim, tim_pt = rd.timing()
+        print("readout: " + ", ".join(f"{k} {v*1e3:.2f} ms" for k, v in tim.items() if k != 'nbytes') + f" ({tim['nbytes']:.0f} bytes)")
+
+    t = ts
+    ch1m, ch2m = avg.mean()
+    se1, se2 = avg.se_rms()
+    print(f"{avg.n} acquisitions averaged ({avg.nrej} rejected), standard error ch1: {se1:.2e} V, ch2: {se2:.2e} V")
+    cmt.append( f"; nPCavg={avg.n:d}, nPCrej={avg.nrej:d}, se_ch1={se1:e}, se_ch2={se2:e}" )
 
     # -----------compute offset and subtract it---------
     if True and V0e==0:
         V1off = 0
         V2off = 0
-        ch1 = ch1s / nPCrep
-        ch2 = ch2s / nPCrep
+        ch1 = ch1m
+        ch2 = ch2m
     #    scf(2); plot2d(t*1e6,ch2); xlabel("t (us)"); ylabel("ch2 (V)"); xgrid(4);
         V1off = ch1[:20].mean()
         V2off = ch2[:20].mean()
         print( f"new V1off={V1off:f}, V2off={V2off:f}" )
-    ch1 = ch1s / nPCrep - V1off #+ 0.00055
-    ch2 = ch2s / nPCrep - V2off #+ 0.0043
-    ch20 = ch2s / nPCrep #+ 0.0043
+    ch1 = ch1m - V1off #+ 0.00055
+    ch2 = ch2m - V2off #+ 0.0043
+    ch20 = ch2m.copy() #+ 0.0043
     
     cmt.append( f"; V1off={V1off:f}, V2off={V2off:f}" )
     
@@ -209,12 +278,17 @@ if __name__ == "__main__":
     print(f"saved file {fname} .")
         
     # -------------------------------------------
+    if use_cache:
+        for nm, vi in [('FG', FG.vi), ('AG', AG.vi)] + ([('OSC', viOSC)]  if not use_OSC1  else []):
+            print(f"{nm}: {vi.hits} settings not sent again, {vi.misses} sent")
     FG.vi.close()
     if use_OSC1:
         OSC.SendCleverscopeCommand(T_Command.T_Command_Close)
         OSC.SendCleverscopeCommand(T_Command.T_Command_Finish)
     else:
         viOSC.close()
+    if ses is not None:
+        ses.close()
     AG.vi.close()
     sxc.close()
     print("Instruments closed.")
@@ -5,6 +5,16 @@
 #  from meas.celiv import *
 # v0.01 01.11.2022 initial version (based on scilab meas/celiv_ah_ny_vw.sci 29.01.2014, last change 15.03.2016 added ny_calc_WF(), 24.10.2022 VW )
 # v0.02 19.04.2023 with class based instr access
+# v0.03 18.10.2026 waveforms by segment compiler celiv_compile_WF() (celiv_wf.py) ; celiv_calc_ecd_WF(): full hold phase (was only 1 point)
+# v0.04 18.10.2026 celiv_send_WF(): upload skipped if same waveform is already in VOLATILE memory of the generator (celiv_WF_loaded)
+# v0.05 18.10.2026 celiv_send_WF(): binary block upload (celiv_sendWF_bin()), ASCII transfer as fallback
+# v0.06 18.10.2026 celiv_osca2_aquire_WF(.., poll=True): triggers paced by ACQ:NUMACQ? polling instead of fixed sleeps
+# v0.07 18.10.2026 celiv_osca2_aquire_raw(): record of both channels in one transaction (for pipelined acquisition, see celiv_acq.py)
+# v0.08 18.10.2026 celiv_init_concurrent(), celiv_send_WF_async(), celiv_osca2_aquire_async(): instruments in parallel (celiv_session.py) ;
+#                  celiv_init_FGs() split into celiv_init_AG(), celiv_init_FG(), celiv_init_AG_ext()
+# v0.09 18.10.2026 celiv_osca2_aquire_WF(.., rd=), celiv_osca2_aquire_raw(.., rd=): binary readout by celiv_acq.celiv_tds_bin_class
+# v0.10 18.10.2026 celiv_send_WF(): ASCII transfer for good only if binary block is rejected (celiv_WF_nobin_err), else retried next time
+# v0.11 18.10.2026 waveform arrays by celiv_OTRACE_WF(), celiv_ecd_WF(), celiv_ny_WF() (celiv_wf.py, same DAC values as the former loops)
 
 #// needs instr/scilabvisa.sci
 #// memo: [rsc, status] = viOpenDefaultRM();
@@ -12,6 +22,7 @@ import pyvisa
 import time   # time.sleep(t_sec)
 import os
 import ctypes
+import hashlib
 os.chdir('/users/celiv/py')
 if True:
     from instr.cleverscope.CleverscopeInterface import Cleverscope
@@ -26,6 +37,8 @@ from instr.cs328a import cs32_open, cs32_setTrigger, cs32_setAcqModus, cs32_setA
 from instr.spexctrl import spexctrl_class
 from instr.k3390_k3390 import *
 from instr.a33220_a33220 import *
+from meas.celiv_wf import celiv_OTRACE_WF, celiv_ecd_WF, celiv_ny_WF, celiv_WF_msg_bin
+from meas.celiv_acq import celiv_osca2_fetch
 
 # -------------------------------------
 def celiv_open_instr(rsc, use_SPEXCTRL=False, use_TDS2022B=False):  # ret:  viFG, CAU, viAG
@@ -108,7 +121,13 @@ def celiv_init_FGs(FG, AG, lvl):  # ret:  -
     if (f'{FG.__class__}')[-11:-2] != ".fg_class":
         viFG, viAG = FG, AG
         return celiv_init_FGs_via_vi(viFG, viAG, lvl) # do old fassion with viFG, viAG
-    # Agilent Functionegenerator Ag33220A
+    celiv_init_AG(AG, lvl)
+    celiv_init_FG(FG, lvl)
+    celiv_init_AG_ext(AG)
+
+# -------------------------------------
+# Agilent Functionegenerator Ag33220A (LED), trigger source stays BUS until celiv_init_AG_ext() (after init of FG)
+def celiv_init_AG(AG, lvl):  # ret:  -
     if lvl==0:
         AG.init()
         AG.vi.write("BURSt:GATE:POLarity NORMal")    # BURSt:GATE:POLarity { NORMal|INVerted }
@@ -118,10 +137,27 @@ def celiv_init_FGs(FG, AG, lvl):  # ret:  -
         AG.vi.write("VOLTage:UNIT VPP")	             # VOLTage:UNIT {VPP|VRMS|DBM} (VPP is dflt (?))
         AG.vi.write("FORM:BORD SWAP")    # required by scilab_k3390_sendWF0.sci; ensure was sent before !!!  // FORMat:BORDer {NORMal|SWAPped} 
         AG.vi.write("DATA:DAC VOLATILE,0,255,0") # has to be set before a33220_setFunction_User(viAG, 'VOLATILE');
+        celiv_WF_forget(AG)
         AG.setTerm50Ohm(False)
         AG.setV(0.0, 0.02) # 10 mVSS bis 10 VSS an 50 Ohm; 20 mVSS bis 20 VSS im Leerlauf
-    
-    # Keithley Functionegenerator KE3390
+    AG.vi.write("BURSt:MODE TRIGgered")	# BURSt:MODE {TRIGgered|GATed}
+    # viAG.write("BURSt:GATE:POLarity NORMal")	# BURSt:GATE:POLarity { NORMal|INVerted }
+    AG.vi.write("BURSt:NCYCles 1")		# BURSt:NCYCles {<#cycles>|INF..
+    AG.vi.write("BURSt:STATe ON")
+    # viAG.write("TRIGger:SLOPe POSitive")	# TRIGger:SLOPe {POSitive|NEGative}
+    # viAG.write("OUTPut:TRIGger OFF")	# OUTPut:TRIGger {OFF|ON}
+    # viAG.write("DATA:DAC VOLATILE,0,255,0") # has to be set before a33220_setFunction_User(viAG, 'VOLATILE');
+    AG.setFunction('USER')
+    AG.setFunction_User('VOLATILE')
+    # a33220_setTerm50Ohm(viAG, False)
+
+# LED generator triggered by trigger output of FG
+def celiv_init_AG_ext(AG):  # ret:  -
+    AG.vi.write("TRIGger:SOURce EXT")	# TRIGger:SOURce {IMMediate|EXTernal|BUS}
+
+# -------------------------------------
+# Keithley Functionegenerator KE3390 (resp. A33220 as main generator)
+def celiv_init_FG(FG, lvl):  # ret:  -
     if lvl==0:
         FG.init()
         FG.vi.write("BURSt:GATE:POLarity NORMal")	# BURSt:GATE:POLarity { NORMal|INVerted }
@@ -130,6 +166,7 @@ def celiv_init_FGs(FG, AG, lvl):  # ret:  -
         FG.vi.write("VOLTage:UNIT VPP")	             # VOLTage:UNIT {VPP|VRMS|DBM} (VPP is dflt)
         FG.vi.write("FORM:BORD SWAP")    # required by scilab_k3390_sendWF0.sci; ensure was sent before !!!  // FORMat:BORDer {NORMal|SWAPped} 
         FG.vi.write("DATA:DAC VOLATILE,0,255,0") # be sure its exists (perhaps not needed for KE)
+        celiv_WF_forget(FG)
         FG.setTerm50Ohm(True)
         FG.setV(0.0, 0.01) # 10mVpp to 10Vpp in 50Ω; 20mVpp to 20Vpp in Hi-Z
     FG.vi.write("BURSt:MODE TRIGgered")	# BURSt:MODE {TRIGgered|GATed}
@@ -144,19 +181,18 @@ def celiv_init_FGs(FG, AG, lvl):  # ret:  -
     FG.setFunction('USER')
     FG.setFunction_User('VOLATILE')
     # k3390_setTerm50Ohm(viFG, True)
-    
-    # Agilent Functionegenerator Ag33220A
-    AG.vi.write("BURSt:MODE TRIGgered")	# BURSt:MODE {TRIGgered|GATed}
-    # viAG.write("BURSt:GATE:POLarity NORMal")	# BURSt:GATE:POLarity { NORMal|INVerted }
-    AG.vi.write("BURSt:NCYCles 1")		# BURSt:NCYCles {<#cycles>|INF..
-    AG.vi.write("TRIGger:SOURce EXT")	# TRIGger:SOURce {IMMediate|EXTernal|BUS}
-    AG.vi.write("BURSt:STATe ON")
-    # viAG.write("TRIGger:SLOPe POSitive")	# TRIGger:SLOPe {POSitive|NEGative}
-    # viAG.write("OUTPut:TRIGger OFF")	# OUTPut:TRIGger {OFF|ON}
-    # viAG.write("DATA:DAC VOLATILE,0,255,0") # has to be set before a33220_setFunction_User(viAG, 'VOLATILE');
-    AG.setFunction('USER')
-    AG.setFunction_User('VOLATILE')
-    # a33220_setTerm50Ohm(viAG, False)
+
+# -------------------------------------
+# init of generators and TDS2022B in parallel (one thread per instrument, writes batched), see celiv_session.py
+#   AG (up to trigger source) || TDS2022B,  FG after AG (LED not triggered while FG inits),  AG ext. trigger after FG
+# ses: celiv_session_class(FG=FG, AG=AG, OSC=viOSC) ; lvl: as celiv_init_FGs()
+def celiv_init_concurrent(ses, lvl):  # ret:  -
+    FG, AG, viOSC = ses.instr['FG'], ses.instr['AG'], ses.instr['OSC']
+    ses.submit('OSC', celiv_init_osca2, viOSC, batch=True)
+    ses.submit('AG', celiv_init_AG, AG, lvl, batch=True)
+    ses.submit('FG', celiv_init_FG, FG, lvl, after=('AG',)  if lvl==0  else (), batch=True)
+    ses.submit('AG', celiv_init_AG_ext, AG, after=('FG',), batch=True)
+    ses.sync()
 
 # -------------------------------------
 # lvl: 0=complete init, 1=assumed some init was already done
@@ -171,6 +207,7 @@ def celiv_init_FGs_via_vi(viFG, viAG, lvl):  # ret:  -
         viAG.write("VOLTage:UNIT VPP")	             # VOLTage:UNIT {VPP|VRMS|DBM} (VPP is dflt (?))
         viAG.write("FORM:BORD SWAP")    # required by scilab_k3390_sendWF0.sci; ensure was sent before !!!  // FORMat:BORDer {NORMal|SWAPped} 
         viAG.write("DATA:DAC VOLATILE,0,255,0") # has to be set before a33220_setFunction_User(viAG, 'VOLATILE');
+        celiv_WF_forget(viAG)
         a33220_setTerm50Ohm(viAG, False)
         a33220_setV(viAG, 0.0, 0.02) # 10 mVSS bis 10 VSS an 50 Ohm; 20 mVSS bis 20 VSS im Leerlauf
     
@@ -183,6 +220,7 @@ def celiv_init_FGs_via_vi(viFG, viAG, lvl):  # ret:  -
         viFG.write("VOLTage:UNIT VPP")	             # VOLTage:UNIT {VPP|VRMS|DBM} (VPP is dflt)
         viFG.write("FORM:BORD SWAP")    # required by scilab_k3390_sendWF0.sci; ensure was sent before !!!  // FORMat:BORDer {NORMal|SWAPped} 
         viFG.write("DATA:DAC VOLATILE,0,255,0") # be sure its exists (perhaps not needed for KE)
+        celiv_WF_forget(viFG)
         k3390_setTerm50Ohm(viFG, True)
         k3390_setV(viFG, 0.0, 0.01) # 10mVpp to 10Vpp in 50Ω; 20mVpp to 20Vpp in Hi-Z
     viFG.write("BURSt:MODE TRIGgered")	# BURSt:MODE {TRIGgered|GATed}
@@ -339,13 +377,66 @@ def celiv_init_osca2(viOSC):  # ret:  -
     viOSC.write("TRIG:MAI:MOD NORM")	# TRIGger:MAIn:MODe { AUTO | NORMal } p.2-229  (NORM=waits for valid trigger)
     viOSC.write("ACQ:STOPA SEQ")	# ACQuire:STOPAfter { RUNSTop | SEQuence} p. 2-50
 
+# -------------------------------------
+# waveforms currently in VOLATILE memory of the generators:  celiv_WF_loaded[instrument] = hash of DAC data
+# (set by celiv_send_WF(), cleared by celiv_init_FGs(.., lvl=0) which overwrites VOLATILE)
+celiv_WF_loaded = {}
+
+def celiv_WF_key(viFG):  # ret:  key of instrument in celiv_WF_loaded
+    return getattr(viFG, 'resource_name', None) or id(viFG)
+
+# forget loaded waveform of generator (e.g. after power cycle or manual changes), FG=None: of all generators
+def celiv_WF_forget(FG=None):  # ret:  -
+    if FG is None:
+        celiv_WF_loaded.clear()
+        return
+    viFG = FG if (f'{FG.__class__}')[-11:-2] != ".fg_class"  else FG.vi
+    celiv_WF_loaded.pop(celiv_WF_key(viFG), None)
+
+# -------------------------------------
+celiv_WF_binary = True      # True: binary block upload (celiv_sendWF_bin()), False: ASCII transfer (k3390_sendWF0())
+celiv_WF_bord   = 'SWAP'    # byte order of binary upload, as set by celiv_init_FGs() (FORM:BORD SWAP)
+celiv_WF_nobin  = set()     # instruments (celiv_WF_key()) which did not accept the binary upload -> ASCII
+celiv_WF_nobin_err = {-160, -161, -168}   # SCPI errors of SYST:ERR? meaning block data not accepted (block data error, invalid block data, block data not allowed)
+
 # -------------------------------------
 # suitable for KE3390 and A33220
-def celiv_send_WF(FG, a):  # ret:  -
+# a: waveform -1..+1 ; force: upload even if the same waveform was already sent to this generator
+def celiv_send_WF(FG, a, force=False):  # ret:  sent (False: upload skipped, waveform already loaded)
     viFG = FG if (f'{FG.__class__}')[-11:-2] != ".fg_class"  else FG.vi # allow old fassion with viFG as parameter
     dac = np.int16(np.round(8191*a))
-    k3390_sendWF0(viFG, dac)   # (slower) ASCII transfer
-    #err = k3390_sendWF0_bin(viFG, dac); // <- needs to have scilab_k3390_sendWF0.sci loaded and linked
+    key = celiv_WF_key(viFG)
+    h   = hashlib.blake2b(dac.tobytes(), digest_size=16).hexdigest()
+    if not force and celiv_WF_loaded.get(key) == h:
+        return False
+    celiv_WF_loaded.pop(key, None)   # unknown content if upload fails
+    if celiv_WF_binary and key not in celiv_WF_nobin:
+        err = celiv_sendWF_bin(viFG, dac, celiv_WF_bord)
+        ok = err == 0
+        if err in celiv_WF_nobin_err:    # binary block not accepted by instrument -> always ASCII
+            celiv_WF_nobin.add(key)
+            print(f"celiv_send_WF: binary upload not accepted by {key} (error {err}), using ASCII transfer.")
+        elif not ok:                     # e.g. timeout -> ASCII this time, binary again next time
+            print(f"celiv_send_WF: binary upload to {key} failed ({'transfer error'  if err is None  else f'error {err}'}), using ASCII transfer.")
+    else:
+        ok = False
+    if not ok:
+        k3390_sendWF0(viFG, dac)   # (slower) ASCII transfer
+    celiv_WF_loaded[key] = h
+    return True
+
+# -------------------------------------
+# binary upload of DAC values as IEEE 488.2 definite length block (2 bytes per value instead of up to 7 ASCII chars)
+# bord: byte order the instrument expects (FORM:BORD, 'SWAP' = LSB first)
+# ret: err (0: ok, else SCPI error code reported by SYST:ERR?, None: transfer failed, e.g. timeout)
+def celiv_sendWF_bin(viFG, dac, bord='SWAP'):  # ret:  err
+    try:
+        viFG.write("*CLS")              # clear error queue (SYST:ERR? below refers to the upload only)
+        viFG.write_raw(celiv_WF_msg_bin(dac, bord))
+        err = viFG.query("SYST:ERR?")   # e.g. '+0,"No error"'
+    except (pyvisa.errors.VisaIOError, AttributeError):
+        return None
+    return int(err.split(',')[0])
 
 # -------------------------------------
 #function [t, ch1, ch2, status] = celiv_osca_aquire_WF(CAU, viFG, noscarep, trep_delay)
@@ -488,23 +579,7 @@ def celiv_calc_OTRACE_WF(t0, tp, th, tn, td, te, n_pulses):  # ret:  a,dt,f, nt0
     ntn = max(1, int(round(rate * tn)))           # w/o 1st (high) point of ramp (set by tp,th-phase)
     ntd = max(0, int(round(rate * td)))
     n_ = nt0 + (ntp + nth + ntn) + (n_pulses-1) * (ntd + ntp + nth + ntn)	# # of data w/o te
-    a = np.zeros(n_WF)
-    n0 = nt0
-    for i in range(n_pulses):
-        #a(n0+[1:ntp]) = [1:ntp]/ntp;    n0 = n0+ntp;
-        a[n0:n0+ntp] = np.arange(1,ntp+1)/ntp
-        n0 += ntp  
-        #a(n0+[1:nth]) = 1;              n0 = n0+nth;
-        a[n0:n0+nth] = 1
-        n0 += nth
-        #a(n0+[1:ntn]) = [ntn:-1:1]/ntn; n0 = n0+ntn;
-        a[n0:n0+ntn] = np.arange(ntn,0,-1)/ntn
-        n0 += ntn
-        if i == n_pulses-1:
-            break
-        #a(n0+[1:ntd]) = 0;              n0 = n0+ntd;
-        a[n0:n0+ntd] = 0
-        n0 += ntd
+    a = celiv_OTRACE_WF(nt0, ntp, nth, ntn, ntd, n_pulses, n_WF)    # (celiv_wf.py)
     return a, dt, f, nt0, ntp, nth, ntn, ntd, n_, Tmin
 
 # -------------------------------------
@@ -526,43 +601,46 @@ def celiv_calc_ecd_WF(t0, tp, th, tn, td, tn2, tl, tp2, td2, te, n_pulses, dVp,
     #n_ = nt0 + (ntp + nth + ntn + ntd + ntn2 + ntl + ntp2 +ntd2) * (n_pulses);	// # of data w/o te
     n_ = nt0 + (ntp + ntn + ntd + ntn2 + ntp2 +ntd2) * (n_pulses)
     n_ = nt0 + (ntp + nth + ntn + ntd + ntn2 + ntl + ntp2 +ntd2) * (n_pulses)
-    a = np.zeros(n_WF)
-    n0 = nt0
-
-    for i in range(n_pulses):
-        #a(n0+[1:ntp]) = [1:ntp]/ntp *dVp;                   n0 = n0+ntp;
-        a[n0:n0+ntp] = np.arange(1,ntp+1)/ntp *dVp
-        n0 += ntp
-        #a(n0+[1:nth]) = 1*dVp;                              n0 = n0+nth;
-        a[n0:n0+1] = 1*dVp
-        n0 += nth
-        #a(n0+[1:ntn]) = [ntn:-1:1]/ntn*dVn+dVp-dVn;         n0 = n0+ntn;
-        a[n0:n0+ntn] = np.arange(ntn,0,-1)/ntn*dVn+dVp-dVn
-        n0 += ntn
-        #a(n0+[1:ntd]) = dVp-dVn;                            n0 = n0+ntd;
-        a[n0:n0+ntd] = dVp-dVn
-        n0 += ntd
-        #a(n0+[1:ntn2]) = dVp-dVn-([1:ntn2]/ntn2)*dVn2;      n0 = n0+ntn2;
-        a[n0:n0+ntn2] = dVp-dVn-(np.arange(1,ntn2+1)/ntn2)*dVn2
-        n0 += ntn2
-        #a(n0+[1:ntl]) = dVp-dVn-dVn2;                       n0 = n0+ntl;
-        a[n0:n0+ntl] = dVp-dVn-dVn2
-        n0 += ntl
-        #a(n0+[1:ntp2]) = dVp-dVn-dVn2+[1:ntp2]/ntp2 *dVp2;  n0 = n0+ntp2;
-        a[n0:n0+ntp2] = dVp-dVn-dVn2+np.arange(1,ntp2+1)/ntp2 *dVp2
-        n0 += ntp2
-        if i == n_pulses-1:
-            break
-        #a(n0+[1:ntd2]) = dVp-dVn-dVn2+dVp2;                 n0 = n0+ntd2;        
-        a[n0:n0+ntd2] = dVp-dVn-dVn2+dVp2
-        n0 += ntd2
+    a = celiv_ecd_WF(nt0, ntp, nth, ntn, ntd, ntn2, ntl, ntp2, ntd2, n_pulses, dVp, dVn, dVp2, dVn2, n_WF)    # (celiv_wf.py, full hold phase)
     Vmax = np.abs(a).max()
     a = a/Vmax
     return a, dt, f, nt0, ntp, nth, ntn, ntd,ntn2,ntl,ntp2,ntd2, n_, Tmin, Vmax
 
 
 # -------------------------------------
-def celiv_osca2_aquire_WF(viOSC, FG, noscarep, trep_delay):  # ret:  t, ch1, ch2
+# celiv_send_WF() in thread of generator name ('FG' or 'AG') of session ses (celiv_session_class)
+def celiv_send_WF_async(ses, name, a, force=False):  # ret:  future (-> sent)
+    return ses.submit(name, celiv_send_WF, ses.instr[name], a, force)
+
+# celiv_osca2_aquire_WF() (raw=True: celiv_osca2_aquire_raw()) in thread of scope, after pending jobs of FG and AG
+def celiv_osca2_aquire_async(ses, noscarep, trep_delay, poll=False, timeout=1.0, raw=False, rd=None):  # ret:  future (-> t, ch1, ch2  resp. raw)
+    fn = celiv_osca2_aquire_raw  if raw  else celiv_osca2_aquire_WF
+    return ses.submit('OSC', fn, ses.instr['OSC'], ses.instr['FG'], noscarep, trep_delay, poll, timeout, rd, after=('FG', 'AG'))
+
+# -------------------------------------
+# poll=False: FG is triggered every trep_delay (fixed sleeps)
+# poll=True:  trep_delay is the min. time between triggers (e.g. charging time), each shot is confirmed by the scope
+#             (ACQ:NUMACQ?, lost shots are triggered again), returns as soon as the averaged record is complete
+# rd:         None: readout by t20_getData(), celiv_tds_bin_class (celiv_acq.py): binary readout of both channels
+#             (ch1, ch2 are then views of arrays of rd, overwritten by the next readout)
+def celiv_osca2_aquire_WF(viOSC, FG, noscarep, trep_delay, poll=False, timeout=1.0, rd=None):  # ret:  t, ch1, ch2
+    celiv_osca2_shots(viOSC, FG, noscarep, trep_delay, poll, timeout)
+    if rd is not None:
+        return rd.decode(rd.fetch())
+    t, ch1, pre = t20_getData(viOSC, 0, 2500, '1')
+    t, ch2, pre = t20_getData(viOSC, 0, 2500, '2')
+    return t, ch1, ch2
+
+# -------------------------------------
+# as celiv_osca2_aquire_WF(), but the record of both channels is read in one transaction and returned undecoded
+# (decode by celiv_acq.celiv_osca2_decode(raw) resp. rd.decode(raw) -> t, ch1, ch2) ; rd: None: ASCII, celiv_tds_bin_class: binary readout
+def celiv_osca2_aquire_raw(viOSC, FG, noscarep, trep_delay, poll=False, timeout=1.0, rd=None):  # ret:  raw
+    celiv_osca2_shots(viOSC, FG, noscarep, trep_delay, poll, timeout)
+    return celiv_osca2_fetch(viOSC)  if rd is None  else rd.fetch()
+
+# -------------------------------------
+# starts averaging acquisition of noscarep shots and triggers FG (see celiv_osca2_aquire_WF())
+def celiv_osca2_shots(viOSC, FG, noscarep, trep_delay, poll=False, timeout=1.0):  # ret:  -
     if noscarep==1:
         viOSC.write("ACQ:MOD SAM")		# ACQuire:MODe { SAMple | PEAKdetect | AVErage } p. 2-46
     else:
@@ -574,14 +652,42 @@ def celiv_osca2_aquire_WF(viOSC, FG, noscarep, trep_delay):  # ret:  t, ch1, ch2
     viOSC.write("ACQ:STATE?")		# ACQuire:STATE? p. 2-50; -> 0 or 1
     ACQ_STATE = viOSC.read()    #buffer = blanks(64); [ACQ_STATE, status, n] = viRead(viOSC, buffer);
     #
-    for i in range(noscarep):
-        FG.trigger()
-        time.sleep(trep_delay)  #sleep(trep_delay*1e3);  // Delay(trep_delay)
-       
-    t, ch1, pre = t20_getData(viOSC, 0, 2500, '1')
-    t, ch2, pre = t20_getData(viOSC, 0, 2500, '2')
-    return t, ch1, ch2
+    if poll:
+        celiv_osca2_trigger_poll(viOSC, FG, noscarep, trep_delay, timeout)
+    else:
+        for i in range(noscarep):
+            FG.trigger()
+            time.sleep(trep_delay)  #sleep(trep_delay*1e3);  // Delay(trep_delay)
+
 
+# -------------------------------------
+# # of acquisitions of TDS2022B since ACQ:STATE RUN
+def celiv_osca2_numacq(viOSC):  # ret:  n
+    viOSC.write("ACQ:NUMACQ?")		# ACQuire:NUMACq? p. 2-48
+    return int(viOSC.read().rstrip())
+
+# -------------------------------------
+# triggers FG until the scope has acquired noscarep more waveforms (acquisition has to be running)
+# trep_min: min. time between triggers (e.g. charging time, burst length of FG) ; timeout: extra wait for a shot before it is retriggered
+def celiv_osca2_trigger_poll(viOSC, FG, noscarep, trep_min, timeout=1.0, dt_poll=1e-3):  # ret:  ntrig (# of triggers sent)
+    n = celiv_osca2_numacq(viOSC)
+    n_end = n + noscarep
+    ntrig, t_trig = 0, -np.inf
+    while n < n_end:
+        assert ntrig < 2*noscarep + 2, f"celiv_osca2_trigger_poll: scope acquired only {noscarep - (n_end-n)} of {noscarep} shots after {ntrig} triggers"
+        dt_wait = t_trig + trep_min - time.perf_counter()
+        if dt_wait > 0:
+            time.sleep(dt_wait)
+        FG.trigger()
+        t_trig = time.perf_counter()
+        ntrig += 1
+        n_prev = n
+        while True:    # wait for the shot (or timeout -> trigger again)
+            n = celiv_osca2_numacq(viOSC)
+            if n > n_prev or time.perf_counter() - t_trig > trep_min + timeout:
+                break
+            time.sleep(dt_poll)
+    return ntrig
 
 # -------------------------------------
 """
@@ -655,20 +761,8 @@ def ny_calc_WF(t0, tp, th, tn, te, V0e, Vh):  # ret: a,dt,f, nt0, ntp, nth, ntn,
     ntn = max(1, int(round(rate * tn)))           # w/o 1st (high) point of ramp (set by tp,th-phase)
     nte = max(0, int(round(rate * te)))
     n_ = nt0 + (ntp + nth + ntn) + nte
-    a = V0e + np.zeros(n_WF)
-    n0 = nt0
-    # a(1:nt0) = V0e;
     dV = Vh - V0e
-    for i in range(1):
-        #a(n0+[1:ntp]) = V0e + [1:ntp]/ntp *dV;              n0 = n0+ntp;
-        a[n0:n0+ntp] = V0e + np.arange(1,ntp+1)/ntp *dV
-        n0 += ntp
-        #a(n0+[1:nth]) = Vh;                                 n0 = n0+nth;
-        a[n0:n0+nth] = Vh
-        n0 += nth
-        #a(n0+[1:ntn]) = V0e + [ntn:-1:1]/ntn*dV;            n0 = n0+ntn;
-        a[n0:n0+ntn] = V0e + np.arange(ntn,0,-1)/ntn*dV
-        n0 += ntn
+    a = celiv_ny_WF(nt0, ntp, nth, ntn, V0e, Vh, n_WF)    # (celiv_wf.py)
     
     a = a - (V0e + Vh)/2
     a = a / (dV/2)     # a goes now from -1 .. +1
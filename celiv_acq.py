@@ -0,0 +1,370 @@
+# celiv_acq.py
+# written by Veit Wagner
+#  --- CELIV acquisition: scope readout of TDS2022B in one transaction, binary readout, streaming average of shots ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 celiv_tds_bin_class: binary readout (RIB, 1 byte/point), preamble cached, decoding into preallocated arrays
+# v0.03 18.10.2026 celiv_avg_class: streaming average (Welford) with rejection of shots and noise target
+# v0.04 18.10.2026 celiv_avg_class: deviation check per channel (own median), update in place w/o temporary arrays
+# v0.05 18.10.2026 celiv_tds_bin_class.decode(): record lengths of the channels are checked
+# v0.06 18.10.2026 header setting of scope (HEAD) is restored after readout (tds_head_restore())
+# v0.07 18.10.2026 celiv_pipe_class removed: decoding / saving of a record takes ~2 ms of ~240 ms per repetition (see benchmark)
+#
+# The TDS2022B has only one acquisition memory: the record has to be transferred before the next burst can be armed.
+# Per repetition the time goes into the shots (nOSCrep * t_delay) and the transfer of the record, both on the
+# instrument side, so only decoding / averaging / saving could run in parallel to the next burst, which gains ~1 %.
+#
+# usage:
+#  from meas.celiv_acq import celiv_osca2_fetch, celiv_osca2_decode
+#  t, ch1, ch2 = celiv_osca2_decode(celiv_osca2_fetch(viOSC))     # both channels in one transaction
+import numpy as np
+import time
+
+# -----------------------------------------
+# the readout commands switch the response headers off (HEAD OFF) and switch them on again at the end of the same
+# message if they were on before (state of each scope queried once by HEAD?, i.e. a later manual change is not seen)
+# output:   cmd     ';:HEAD ON' or ''  (to be appended to the readout message)
+# -----------------------------------------
+tds_head = {}    # scope (resource name) -> command restoring the header setting
+def tds_head_restore(viOSC):    # -> cmd
+    key = getattr(viOSC, 'resource_name', None) or id(viOSC)
+    if key not in tds_head:
+        tds_head[key] = ';:HEAD ON'  if viOSC.query("HEAD?").strip().split()[-1].upper() in ('1', 'ON')  else ''
+    return tds_head[key]
+
+# -----------------------------------------
+# reads both channels with one write + one read (ASCII, scaling parameters of each channel in the same transaction)
+# output:   raw     response string: per channel  XINcr;XZEro;PT_Off;YMUlt;YZEro;YOFf;<curve values>  (separated by ;)
+# -----------------------------------------
+def celiv_osca2_fetch(viOSC, chs=('1', '2'), n_pt=2500):    # -> raw
+    cmd = f"HEAD OFF;:DAT:ENC ASCI;WID 1;STAR 1;STOP {n_pt:d}"
+    for ch in chs:
+        cmd += f";:DAT:SOU CH{ch};:WFMP:XIN?;XZE?;PT_O?;YMU?;YZE?;YOF?;:CURV?"
+    viOSC.write(cmd + tds_head_restore(viOSC))
+    return viOSC.read()
+
+# -----------------------------------------
+# decodes response of celiv_osca2_fetch()
+# output:   t, ch1, ch2, ..   time [s] and channel voltages [V]
+# -----------------------------------------
+def celiv_osca2_decode(raw):    # -> t, ch1, ch2, ..
+    f = raw.strip().split(';')
+    assert len(f) % 7 == 0, f"celiv_osca2_decode: unexpected response ({len(f)} fields)"
+    res = []
+    for k in range(0, len(f), 7):
+        xin, xze, pto, ymu, yze, yof = map(float, f[k:k+6])
+        c = np.array(f[k+6].split(','), dtype=np.float64)
+        if k == 0:
+            res.append(xze + xin * (np.arange(len(c)) - pto))
+        res.append(yze + ymu * (c - yof))
+    return tuple(res)
+
+# -----------------------------------------
+# binary readout of TDS2022B: both channels as RIB blocks (1 byte/point) in one transaction together with the scales
+# (CH<x>:SCA/POS, HOR:MAI:SCA/POS), preamble (XIN, XZE, PT_O, YMU, YZE, YOF) only read again if a scale has changed,
+# decoding by np.frombuffer() into preallocated arrays
+# input:    viOSC   VISA resource of TDS2022B
+#           chs     channels
+#           n_pt    # of points
+# usage:
+#  rd = celiv_tds_bin_class(viOSC)
+#  t, ch1, ch2 = rd.decode(rd.fetch())
+#  print(rd.tim)                            # timing of last readout [s]:  write, read, pre (preamble), decode, nbytes
+# note: decode() returns views of internal arrays, overwritten by the next decode() (copy to keep)
+# -----------------------------------------
+class celiv_tds_bin_class:
+    def __init__(self, viOSC, chs=('1', '2'), n_pt=2500):
+        self.vi, self.chs, self.n_pt = viOSC, tuple(chs), n_pt
+        self.key, self.pre = None, None       # scales of preamble, preamble per channel (xin, xze, pto, ymu, yze, yof)
+        self.t = np.empty(n_pt)
+        self.y = np.empty((len(self.chs), n_pt))
+        self.t_pre = None                     # preamble of self.t
+        self.tim = {}                         # timing of last readout
+        self.tim_sum, self.n = {}, 0          # sum of timings, # of readouts
+        nsca = ';:'.join(f"CH{ch}:SCA?;POS?" for ch in self.chs)
+        self.cmd = (f"HEAD OFF;:DAT:ENC RIB;WID 1;STAR 1;STOP {n_pt:d};:{nsca};:HOR:MAI:SCA?;POS?"
+                    + ''.join(f";:DAT:SOU CH{ch};:CURV?" for ch in self.chs))
+        self.nsca = 2*len(self.chs) + 2
+
+    # forget preamble (e.g. after settings changed at the scope)
+    def invalidate(self):
+        self.key = None
+
+    # -----------------------------------------
+    # reads scales and records (+ preamble if scales changed)
+    # output:   raw     (response bytes, preamble, [(offset, # of bytes) of each channel], timing)
+    # -----------------------------------------
+    def fetch(self):    # -> raw
+        t0 = time.perf_counter()
+        self.vi.write(self.cmd + tds_head_restore(self.vi))
+        t1 = time.perf_counter()
+        buf, f = b'', None
+        while f is None:    # binary data may contain termination chars: read until all blocks are complete
+            buf += self.vi.read_raw()
+            f = tds_resp_split(buf, self.nsca + len(self.chs))
+        t2 = time.perf_counter()
+        key = tuple(buf[o:o+n] for o, n in f[:self.nsca])
+        if key != self.key:
+            self.pre = self.preamble()
+            self.key = key
+        tim = {'write':t1 - t0, 'read':t2 - t1, 'pre':time.perf_counter() - t2, 'nbytes':len(buf)}
+        return buf, self.pre, f[self.nsca:], tim
+
+    def preamble(self):    # -> preamble per channel
+        cmd = ''.join(f";:DAT:SOU CH{ch};:WFMP:XIN?;XZE?;PT_O?;YMU?;YZE?;YOF?" for ch in self.chs)
+        v = [float(s) for s in self.vi.query("HEAD OFF" + cmd + tds_head_restore(self.vi)).strip().split(';')]
+        return [tuple(v[6*k:6*k+6]) for k in range(len(self.chs))]
+
+    # -----------------------------------------
+    # decodes raw record of fetch()
+    # output:   t, ch1, ch2, ..     time [s], voltages [V]  (views of preallocated arrays)
+    # error:    ValueError if the records of the channels differ in length or are longer than n_pt
+    # -----------------------------------------
+    def decode(self, raw):    # -> t, ch1, ch2, ..
+        t0 = time.perf_counter()
+        buf, pre, blk, tim = raw
+        nbs = [nb for o, nb in blk]
+        n = nbs[0]
+        if len(nbs) != len(self.chs) or any(nb != n for nb in nbs) or n > self.n_pt:
+            raise ValueError(f"celiv_tds_bin_class.decode(): record lengths {nbs} of channels {list(self.chs)} differ or are > n_pt={self.n_pt}")
+        if pre is not self.t_pre:
+            xin, xze, pto = pre[0][:3]
+            np.multiply(np.arange(self.n_pt) - pto, xin, out=self.t)
+            self.t += xze
+            self.t_pre = pre
+        for k, (o, nb) in enumerate(blk):
+            xin, xze, pto, ymu, yze, yof = pre[k]
+            y = self.y[k, :nb]
+            np.subtract(np.frombuffer(buf, dtype=np.int8, count=nb, offset=o), yof, out=y)
+            y *= ymu
+            y += yze
+        tim['decode'] = time.perf_counter() - t0
+        self.tim = tim
+        for k, v in tim.items():
+            self.tim_sum[k] = self.tim_sum.get(k, 0) + v
+        self.n += 1
+        return (self.t[:n],) + tuple(self.y[k, :n] for k in range(len(self.chs)))
+
+    # mean timing per readout, per point of one channel [s]
+    def timing(self):    # -> tim, tim_pt
+        tim = {k: v / max(self.n, 1) for k, v in self.tim_sum.items()}
+        return tim, {k: v / self.n_pt for k, v in tim.items()  if k != 'nbytes'}
+
+# -----------------------------------------
+# splits TDS response of ;-separated fields (ASCII or IEEE 488.2 definite length block #<nd><nbytes><data>)
+# output:   list of (offset, length) of the fields in buf, None if less than nf fields are complete
+# -----------------------------------------
+def tds_resp_split(buf, nf):    # -> f
+    f, i = [], 0
+    while len(f) < nf:
+        if i >= len(buf):
+            return None
+        if buf[i:i+1] == b'#':
+            if i + 2 > len(buf):
+                return None
+            nd = int(buf[i+1:i+2])
+            if i + 2 + nd > len(buf):
+                return None
+            nb = int(buf[i+2:i+2+nd])
+            o = i + 2 + nd
+            if o + nb > len(buf):
+                return None
+            f.append((o, nb))
+            i = o + nb + 1
+        else:
+            j = min(k for k in (buf.find(b';', i), buf.find(b'\n', i), len(buf)) if k >= 0)
+            if j == len(buf) and len(f) < nf - 1:
+                return None
+            f.append((i, j - i))
+            i = j + 1
+    return f
+
+# -----------------------------------------
+# streaming average of shots (several channels) with variance per point (Welford), preallocated arrays
+# input:    nch         # of channels
+#           n_pt        # of points (None: from 1st shot)
+#           dev_max     shot rejected if the mean square deviation from the current mean of any channel is > dev_max *
+#                       median of this channel of the accepted shots (after nmin shots, None: no check), e.g. spikes,
+#                       missed trigger
+#           v_max       shot rejected if a value |v| >= v_max (e.g. overrange), None: no check
+#           se_target   standard error target [V]: done() is True if rms of standard error of all channels <= se_target
+#           nmin        min. # of shots for deviation check and done()
+# usage:
+#  avg = celiv_avg_class(2, se_target=1e-4)
+#  for t, ch1, ch2 in shots:
+#      if not avg.add(ch1, ch2):   print(avg.reject)
+#      if avg.done():  break
+#  ch1m, ch2m = avg.mean() ; se1, se2 = avg.se()
+# -----------------------------------------
+class celiv_avg_class:
+    def __init__(self, nch, n_pt=None, dev_max=None, v_max=None, se_target=None, nmin=3):
+        self.nch, self.n_pt = nch, n_pt
+        self.dev_max, self.v_max, self.se_target, self.nmin = dev_max, v_max, se_target, nmin
+        self.n, self.nrej = 0, 0        # # of accepted / rejected shots
+        self.reject = ''                # reason of last rejection
+        self.dev = []                   # mean square deviations of accepted shots (one array of nch values per shot)
+        if n_pt is not None:
+            self.alloc(n_pt)
+
+    def alloc(self, n_pt):
+        self.n_pt = n_pt
+        self.m  = np.zeros((self.nch, n_pt))    # running mean
+        self.m2 = np.zeros((self.nch, n_pt))    # sum of squared deviations
+        self.d  = np.empty((self.nch, n_pt))
+
+    # adds shot (one array per channel) -> False: rejected (reason in self.reject)
+    def add(self, *chs):    # -> accepted
+        if len(chs) != self.nch:
+            raise ValueError(f"celiv_avg_class.add(): {len(chs)} channels given, {self.nch} expected")
+        if self.n_pt is None:
+            self.alloc(len(chs[0]))
+        if any(len(c) != self.n_pt for c in chs):
+            return self._rej(f"length {[len(c) for c in chs]} != {self.n_pt}")
+        if self.v_max is not None and any(np.abs(c).max() >= self.v_max for c in chs):
+            return self._rej(f"value out of range (|v| >= {self.v_max:g})")
+        d = self.d
+        for k, c in enumerate(chs):
+            np.subtract(c, self.m[k], out=d[k])
+        dev = np.einsum('ij,ij->i', d, d) / self.n_pt    # per channel
+        if self.dev_max is not None and self.n >= self.nmin:
+            med = np.median(self.dev, axis=0)
+            k = np.flatnonzero(dev > self.dev_max * med)
+            if len(k):
+                k = k[0]
+                return self._rej(f"deviation of channel {k+1} {dev[k]:.3g} > {self.dev_max:g} * median {med[k]:.3g}")
+        self.n += 1
+        # Welford: m_n = m_n-1 + (x - m_n-1)/n ; m2_n = m2_n-1 + (x - m_n-1)*(x - m_n) = m2_n-1 + ((x - m_n-1)/n)^2 * n*(n-1)
+        np.divide(d, self.n, out=d)
+        self.m += d
+        np.multiply(d, d, out=d)
+        d *= self.n * (self.n - 1)
+        self.m2 += d
+        if self.n > 1:
+            self.dev.append(dev)
+        return True
+
+    def _rej(self, reason):
+        self.nrej += 1
+        self.reject = reason
+        return False
+
+    def mean(self):    # -> mean of each channel
+        return tuple(self.m)
+
+    def var(self):    # -> variance of shots per point of each channel
+        return tuple(self.m2 / max(self.n - 1, 1))
+
+    def se(self):    # -> standard error of mean per point of each channel
+        return tuple(np.sqrt(self.m2 / max(self.n - 1, 1) / max(self.n, 1)))
+
+    def se_rms(self):    # -> rms over points of standard error, per channel
+        return np.sqrt(self.m2.mean(axis=1) / max(self.n - 1, 1) / max(self.n, 1))  if self.n > 1  else np.full(self.nch, np.inf)
+
+    # noise target reached
+    def done(self):    # -> bool
+        return self.se_target is not None and self.n >= max(self.nmin, 2) and bool(np.all(self.se_rms() <= self.se_target))
+
+# --- benchmark with simulated scope: time per repetition of the acquisition loop ---
+# execute with python celiv_acq.py
+if __name__ == '__main__':
+    import time
+    import os
+    import tempfile
+    from meas.celiv_sim import sim_rm_class, sim_bench_class
+    from meas.celiv_wf import celiv_compile_WF, celiv_WF_msg_bin
+    from meas.savefile import svspec_append_class
+    # --- acquisition loop as in MIS_CELIV.py (simulated FG, TDS2022B and RC device of celiv_sim.py) ---
+    # nOSCrep = 8 shots per record, fixed trigger delay t_delay = t_min_charging + 2 ms, ASCII readout, record averaged and saved (save_shots)
+    nrep, nosc, trep = 8, 8, 22e-3
+    rsc = sim_rm_class(sim_bench_class(R=1e3, C=100e-9))
+    viFG = rsc.open_resource("USB0::0x0957::0x0407::MY44003895::0::INSTR")
+    viOSC = rsc.open_resource("USB0::0x0699::0x0369::C101634::INSTR")
+    viFG.write("FORM:BORD SWAP;:TRIG:SOUR BUS;:OUTP:TRIG ON;:BURS:MODE TRIG;NCYC 1;STAT ON")
+    viFG.write_raw(celiv_WF_msg_bin(np.int16(np.round(8191 * celiv_compile_WF([(400, 0.0), (2000, 1, 1, 2000, 1.0), (1, 0.0)], n_WF=4000)))))
+    viFG.write("FREQ 250;:VOLT 2.0;VOLT:OFFS 1.0;:OUTP ON")
+    viOSC.write("HEAD OFF;:HOR:MAI:SCA 5.0E-4;POS 2.0E-3;:CH1:SCA 0.5;:CH2:SCA 0.05;:ACQ:STOPA SEQ")
+    tim = {'shots': 0.0, 'readout': 0.0, 'decode': 0.0, 'avg+save': 0.0}
+    def shots():    # burst of nosc shots with fixed delay (as celiv_osca2_shots(), poll=False)
+        t = time.perf_counter()
+        viOSC.write("ACQ:MOD AVE")
+        viOSC.write(f"ACQ:NUMAV {nosc:d}")
+        viOSC.write("ACQ:STATE 1")
+        viOSC.query("ACQ:STATE?")
+        for i in range(nosc):
+            viFG.assert_trigger()
+            time.sleep(trep)
+        tim['shots'] += time.perf_counter() - t
+    def acquire():    # -> raw  (as celiv_osca2_aquire_raw())
+        shots()
+        t = time.perf_counter()
+        raw = celiv_osca2_fetch(viOSC)
+        tim['readout'] += time.perf_counter() - t
+        return raw
+    def decode(raw):    # -> t, ch1, ch2
+        t = time.perf_counter()
+        rec = celiv_osca2_decode(raw)
+        tim['decode'] += time.perf_counter() - t
+        return rec
+    def run(records):    # -> avg  (loop body of MIS_CELIV.py)
+        avg = celiv_avg_class(2)
+        with tempfile.TemporaryDirectory() as d, svspec_append_class(os.path.join(d, 'x_shots.dat'), ['bench'], '%e') as sv:
+            for t, ch1, ch2 in records:
+                t0 = time.perf_counter()
+                sv.add(t, np.asarray([ch1, ch2]))
+                avg.add(ch1, ch2)
+                tim['avg+save'] += time.perf_counter() - t0
+        return avg
+    t = time.perf_counter()
+    avg = run(decode(acquire()) for i in range(nrep))
+    dt_s = (time.perf_counter() - t) / nrep
+    assert avg.n == nrep
+    print(f"per repetition ({nosc} shots of {trep*1e3:.0f} ms): {dt_s*1e3:.1f} ms = " + ", ".join(f"{k} {v/nrep*1e3:.1f} ms" for k, v in tim.items())
+          + f"  (decode and avg+save in parallel to the next burst would gain {(tim['decode']+tim['avg+save'])/nrep/dt_s*100:.1f} %)")
+    # --- ASCII vs. binary readout (simulated TDS2022B of celiv_sim.py) ---
+    from meas.celiv_sim import sim_rm_class
+    vi = sim_rm_class().open_resource("USB0::0x0699::0x0369::C101634::INSTR")
+    vi.rec = np.array([np.sin(np.linspace(0, 9, 2500)), 0.1*np.cos(np.linspace(0, 9, 2500))])
+    vi.write("CH2:SCA 0.05;:HOR:MAI:SCA 1.0E-4")
+    rd = celiv_tds_bin_class(vi)
+    for i in range(nrep):
+        t = time.perf_counter()
+        ta, a1, a2 = celiv_osca2_decode(celiv_osca2_fetch(vi))
+        dt_a = time.perf_counter() - t
+        tb, b1, b2 = rd.decode(rd.fetch())
+    assert np.allclose(ta, tb) and np.array_equal(a1, b1) and np.array_equal(a2, b2), "binary / ASCII readout differ"
+    vi2 = sim_rm_class().open_resource("USB0::0x0699::0x0369::C101634::INSTR")    # headers on: restored after readout
+    vi2.write("HEAD ON")
+    tds_head.clear()    # (state of the 1st simulated scope of the same resource name)
+    rd2 = celiv_tds_bin_class(vi2)
+    ra, rb = celiv_osca2_decode(celiv_osca2_fetch(vi2)), rd2.decode(rd2.fetch())
+    assert all(np.allclose(a, b) for a, b in zip(ra, rb)) and vi2.query("HEAD?").split()[-1] in ('1', 'ON'), "header setting not restored"
+    buf, pre, blk, tim = rd.fetch()
+    try:    # record of channel 2 shorter (e.g. truncated transfer)
+        rd.decode((buf, pre, [blk[0], (blk[1][0], blk[1][1] - 1)], tim))
+        assert False, "different record lengths not detected"
+    except ValueError as e:
+        print(e)
+    # --- streaming average: rejected shots, early stop at noise target ---
+    rng = np.random.default_rng(1)
+    sig = np.sin(np.linspace(0, 9, 2500))
+    avg = celiv_avg_class(2, dev_max=10, v_max=5.0, se_target=2e-3)
+    for i in range(1000):
+        y1 = sig + 0.02 * rng.standard_normal(2500)
+        y2 = 0.1*sig + 0.01 * rng.standard_normal(2500)
+        if i == 5:
+            y1[100] = 9.0              # overrange
+        if i == 7:
+            y2 = y2 + 0.05             # offset jump of channel 2 only (small compared to noise of channel 1)
+        if i == 9:
+            y1 = y1[:2000]             # wrong length
+        if not avg.add(y1, y2):
+            print(f"shot {i}: rejected ({avg.reject})")
+        if avg.done():
+            break
+    m1, m2 = avg.mean()
+    print(f"stopped after {i+1} shots ({avg.n} averaged, {avg.nrej} rejected), se = {avg.se_rms()}, "
+          f"error of mean {np.std(m1 - sig):.2e}")
+    assert avg.nrej == 3 and abs(np.std(m1 - sig) - avg.se_rms()[0]) < 3e-4
+    tim, tim_pt = rd.timing()
+    print(f"readout ASCII:  {dt_a*1e3:6.1f} ms")
+    print(f"readout binary: {sum(v for k, v in tim.items() if k != 'nbytes')*1e3:6.1f} ms  (" + ", ".join(f"{k} {v*1e3:.2f} ms" for k, v in tim.items() if k != 'nbytes')
+          + f"; {tim['nbytes']:.0f} bytes; decode {tim_pt['decode']*1e9:.1f} ns/point)")
@@ -0,0 +1,233 @@
+# celiv_scpi.py
+# written by Veit Wagner
+#  --- SCPI message parsing and write-through cache of instrument settings (drops writes not changing a setting) ---
+# v0.01 18.10.2026 initial version (scpi_split() etc. from celiv_sim.py)
+#
+# celiv_cache_class wraps a VISA resource: each setting command (header with parameters, e.g. "BURS:MODE TRIG") is
+# compared with the value last written; if equal it is removed from the message (all of a message removed: nothing is
+# sent). Queries, common commands (*xxx) and actions (see scpi_nocache) are always sent.
+# The cache is cleared by *RST / *RCL, by an error reported to SYST:ERR? / ALLEV? / *ESR? and by exceptions of the
+# resource (state of instrument unknown). Values are only known from own writes: after manual changes at the
+# instrument call invalidate().
+#
+# usage:
+#  from meas.celiv_scpi import celiv_cache_class
+#  FG.vi = celiv_cache_class(FG.vi)
+#  viOSC = celiv_cache_class(viOSC)
+#  ...
+#  print(viOSC.hits, viOSC.misses)      # dropped / sent settings
+import re
+import threading
+
+# SCPI long -> short form of mnemonics used here (anything else is compared as given)
+scpi_short = {'ACQUIRE':'ACQ', 'ALLEV':'ALLEV', 'AMPLITUDE':'AMPL', 'APPLY':'APPL', 'BORDER':'BORD', 'BURST':'BURS',
+              'CURVE':'CURV', 'DATA':'DAT', 'ENCDG':'ENC', 'ERROR':'ERR', 'FORMAT':'FORM', 'FREQUENCY':'FREQ',
+              'FUNCTION':'FUNC', 'HEADER':'HEAD', 'HORIZONTAL':'HOR', 'LEVEL':'LEV', 'MAIN':'MAI', 'MODE':'MOD',
+              'NCYCLES':'NCYC', 'NUMACQ':'NUMAC', 'NUMAVG':'NUMAV', 'OFFSET':'OFFS', 'OUTPUT':'OUTP', 'POSITION':'POS',
+              'PT_OFF':'PT_O', 'SCALE':'SCA', 'SOURCE':'SOUR', 'START':'STAR', 'STATE':'STAT', 'STOPAFTER':'STOPA',
+              'SYSTEM':'SYST', 'TRIGGER':'TRIG', 'VOLTAGE':'VOLT', 'WFMPRE':'WFMP', 'WIDTH':'WID', 'XINCR':'XIN',
+              'XZERO':'XZE', 'YMULT':'YMU', 'YOFF':'YOF', 'YZERO':'YZE', 'CHANNEL1':'CH1', 'CHANNEL2':'CH2',
+              'SOU':'SOUR', 'POLARITY':'POL', 'SLOPE':'SLOP'}
+
+def scpi_norm(mn):    # -> short form (upper case) of mnemonic
+    mn = mn.upper()
+    if mn in scpi_short:
+        return scpi_short[mn]
+    for lng, sht in scpi_short.items():    # e.g. NUMACQ, ACQUIR
+        if lng.startswith(mn) and mn.startswith(sht):
+            return sht
+    return mn
+
+# -----------------------------------------
+# splits SCPI message into commands
+# output:   list of (hdr, query, args)   hdr: tuple of short mnemonics, e.g. ('DAT','SOUR') or ('*IDN',)
+# -----------------------------------------
+def scpi_split(msg):    # -> cmds
+    cmds, path = [], ()
+    for unit in msg.strip().split(';'):
+        unit = unit.strip()
+        if not unit:
+            continue
+        m = re.match(r"(:?)([*\w:]+?)(\?)?(?:\s+(.*))?$", unit, re.S)
+        if m is None:
+            cmds.append((None, False, unit))
+            continue
+        absol, hdr, q, args = m.groups()
+        nodes = tuple(scpi_norm(s) for s in hdr.split(':') if s)
+        if hdr.startswith('*'):
+            cmds.append((nodes, bool(q), (args or '').strip()))
+            continue
+        if not absol and path:
+            nodes = path + nodes
+        path = nodes[:-1]
+        cmds.append((nodes, bool(q), (args or '').strip()))
+    return cmds
+
+def scpi_float(s):    # -> float  (also ON/OFF)
+    s = s.strip().upper()
+    return {'ON':1.0, 'OFF':0.0}[s]  if s in ('ON', 'OFF')  else float(s)
+
+# normalized parameter(s) of setting: upper case, numbers as float, ON/OFF as 1/0
+def scpi_val(args):    # -> str
+    v = []
+    for a in args.split(','):
+        a = a.strip().upper()
+        a = {'ON':'1', 'OFF':'0'}.get(a, a)
+        try:
+            a = repr(float(a))
+        except ValueError:
+            pass
+        v.append(a)
+    return ','.join(v)
+
+# commands with parameters which are actions, not settings: always sent,  header -> headers (prefix) invalidated by it
+# (None: all)
+scpi_nocache = {'ACQ:STAT':(), 'DAT:DAC':('FUNC',), 'DAT:COPY':('FUNC',), 'APPL':None, '*RST':None, '*RCL':None,
+                'SYST:PRES':None, 'DAT:INIT':None, 'FACT':None, 'AUTOS':None}
+
+# -----------------------------------------
+# write-through cache of settings of VISA resource vi (see above)
+# -----------------------------------------
+class celiv_cache_class:
+    def __init__(self, vi, nocache=None):
+        self.vi = vi
+        self.nocache = dict(scpi_nocache)  if nocache is None  else nocache
+        self.val = {}                   # header -> last written value
+        self.hits = self.misses = 0     # # of settings dropped / sent
+        self.n_msg = self.n_drop = 0    # # of messages sent / not sent at all (only known settings)
+        self.chk_err = False            # error query pending (answer checked by read())
+        self.lock = threading.RLock()
+
+    # forget cached settings (all or headers starting with prefix, e.g. 'FUNC')
+    def invalidate(self, prefix=None):    # -> -
+        with self.lock:
+            if prefix is None:
+                self.val.clear()
+            else:
+                for k in [k for k in self.val if k.startswith(prefix)]:
+                    del self.val[k]
+
+    # -> message without settings known to be set, None: nothing to send
+    def filter(self, msg):    # -> msg
+        cmds = scpi_split(msg)
+        keep, drop = [], False
+        for hdr, q, args in cmds:
+            h = None  if hdr is None  else ':'.join(hdr)
+            if h is None or q or (not args and not h.startswith('*')):
+                keep.append((hdr, q, args))
+                continue
+            if h in self.nocache or h.startswith('*'):
+                inv = self.nocache.get(h, ())
+                if inv is None:
+                    self.invalidate()
+                else:
+                    for p in inv:
+                        self.invalidate(p)
+                keep.append((hdr, q, args))
+                continue
+            v = scpi_val(args)
+            if self.val.get(h) == v:
+                self.hits += 1
+                drop = True
+                continue
+            self.misses += 1
+            self.val[h] = v
+            keep.append((hdr, q, args))
+        if any(q and ':'.join(hdr) in ('SYST:ERR', 'ALLEV', '*ESR') for hdr, q, args in keep if hdr is not None):
+            self.chk_err = True
+        if not keep:
+            return None
+        if not drop:
+            return msg
+        return ';'.join(args  if hdr is None  else (('' if hdr[0].startswith('*') else ':') + ':'.join(hdr)
+                        + ('?' if q else '') + (' ' + args  if args  else '')) for hdr, q, args in keep)
+
+    def _call(self, fn, *args, **kw):    # resource call, exception -> state unknown
+        try:
+            return fn(*args, **kw)
+        except Exception:
+            self.invalidate()
+            self.chk_err = False
+            raise
+
+    def write(self, msg, *args, **kw):
+        with self.lock:
+            m = self.filter(msg)
+            if m is None:
+                self.n_drop += 1
+                return 0
+            self.n_msg += 1
+            return self._call(self.vi.write, m, *args, **kw)
+
+    def write_raw(self, msg):    # binary message (e.g. waveform upload) -> sent, function settings invalidated
+        with self.lock:
+            if msg.lstrip()[:4].upper() == b'DATA':
+                self.invalidate('FUNC')
+            else:
+                self.invalidate()
+            self.n_msg += 1
+            return self._call(self.vi.write_raw, msg)
+
+    def check(self, resp):    # error in response of error query -> cache cleared
+        if self.chk_err:
+            self.chk_err = False
+            m = re.match(r"\s*(?::\S+\s+)?([+-]?\d+)", resp)
+            if m is None or int(m.group(1)) != 0:
+                self.invalidate()
+        return resp
+
+    def read(self, *args, **kw):
+        with self.lock:
+            return self.check(self._call(self.vi.read, *args, **kw))
+
+    def read_raw(self, *args, **kw):
+        with self.lock:
+            self.chk_err = False
+            return self._call(self.vi.read_raw, *args, **kw)
+
+    def query(self, msg, *args, **kw):
+        with self.lock:
+            m = self.filter(msg)
+            self.n_msg += 1
+            return self.check(self._call(self.vi.query, m, *args, **kw))
+
+    def assert_trigger(self):
+        return self._call(self.vi.assert_trigger)
+
+    def __getattr__(self, k):    # everything else (resource_name, timeout, close(), ..) from resource
+        return getattr(self.vi, k)
+
+# --- test with simulated instruments: repeated setup (parameter sweep) with and without cache ---
+# execute with python celiv_scpi.py
+if __name__ == '__main__':
+    import time
+    from meas.celiv_sim import sim_rm_class
+    def setup(vi, f):    # as per sweep point: generator settings + scope acquisition settings
+        vi.write("BURSt:MODE TRIGgered;:BURS:NCYC 1;:TRIGger:SOURce BUS;:BURS:STAT ON;:VOLT:UNIT VPP;:FORM:BORD SWAP")
+        vi.write("OUTPut:TRIGger ON")
+        vi.write(f"FREQ {f:e}")
+        vi.write("VOLT 2.0;VOLT:OFFS 1.0")
+        return vi.query("SYST:ERR?")
+    rsc = sim_rm_class()
+    vi = rsc.open_resource("USB0::0x0957::0x0407::MY44003895::0::INSTR")
+    vi.t_lat = 5e-3
+    fs = [100, 200, 100, 500] * 5
+    res = {}
+    for name, v in [('direct', vi), ('cached', celiv_cache_class(vi))]:
+        vi.reset()
+        n0 = vi.n_write
+        t = time.perf_counter()
+        r = [setup(v, f) for f in fs]
+        res[name] = (r, dict(vi.set))
+        print(f"{name}: {vi.n_write - n0:3d} messages, {(time.perf_counter() - t)*1e3:6.1f} ms", end='')
+        print(f"  (hits {v.hits}, misses {v.misses})"  if name == 'cached'  else '')
+    assert res['direct'] == res['cached'], "different instrument state"
+    c = celiv_cache_class(vi)
+    c.write("FREQ 1000;VOLT 1")
+    assert c.filter("FREQ 1.0E3;:VOLT 2") == ":VOLT 2" and c.filter("FREQ 1e3") is None
+    c.write("*RST")
+    assert c.filter("FREQ 1e3") == "FREQ 1e3"
+    c.write("VOLT 3;:FREQ abc")          # -> -224 Illegal parameter value
+    c.query("SYST:ERR?")
+    assert c.val == {}, "cache not cleared after error"
+    print("ok")
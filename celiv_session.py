@@ -0,0 +1,184 @@
+# celiv_session.py
+# written by Veit Wagner
+#  --- concurrent access to several instruments: one worker thread per instrument, batched (;-joined) SCPI writes ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 batch mode: fg_class objects are not modified (fn gets a copy with the batching proxy in .vi)
+#
+# Jobs of one instrument run in order in its own thread, jobs of different instruments run concurrently, so the
+# setup time of independent instruments is the one of the slowest instrument instead of the sum.
+# submit() returns a concurrent.futures.Future (.result() waits, in asyncio code:  await asyncio.wrap_future(fut)).
+# With batch=True consecutive write() calls of a job are collected and sent as one ;-joined message
+# (flushed before each read / query / write_raw, at the end of the job or when nmax chars are reached).
+#
+# usage:
+#  from meas.celiv_session import celiv_session_class
+#  ses = celiv_session_class(FG=FG, AG=AG, OSC=viOSC)          # fg_class objects or VISA resources
+#  f1 = ses.submit('OSC', celiv_init_osca2, viOSC, batch=True)  # viOSC is replaced by its batching proxy in the job
+#  f2 = ses.submit('FG', celiv_send_WF, FG, a)
+#  f3 = ses.submit('OSC', celiv_osca2_aquire_WF, viOSC, FG, 16, 5e-3, after=('FG',))  # waits for FG jobs before
+#  t, ch1, ch2 = f3.result()
+#  ses.close()
+import concurrent.futures
+import threading
+import copy
+
+# -----------------------------------------
+# VISA resource proxy collecting write() calls, sent as one message  cmd1;:cmd2;:cmd3 ..
+# (each command with absolute header, common commands *xxx as they are)
+# input:    vi      VISA resource
+#           nmax    max. # of chars per message
+# -----------------------------------------
+class celiv_batch_class:
+    def __init__(self, vi, nmax=240):
+        self.vi, self.nmax = vi, nmax
+        self.buf = []
+        self.n_msg = self.n_cmd = 0   # # of messages sent, # of commands in them
+
+    def write(self, cmd, *args, **kw):
+        cmd = cmd.strip()
+        cmd = cmd  if cmd[:1] in ('*', ':')  else ':' + cmd
+        if self.buf and sum(len(c)+1 for c in self.buf) + len(cmd) > self.nmax:
+            self.flush()
+        self.buf.append(cmd)
+        self.n_cmd += 1
+        return len(cmd)
+
+    def flush(self):
+        if self.buf:
+            msg, self.buf = ';'.join(self.buf), []
+            self.n_msg += 1
+            self.vi.write(msg)
+
+    def write_raw(self, msg):
+        self.flush()
+        return self.vi.write_raw(msg)
+
+    def read(self, *args, **kw):
+        self.flush()
+        return self.vi.read(*args, **kw)
+
+    def read_raw(self, *args, **kw):
+        self.flush()
+        return self.vi.read_raw(*args, **kw)
+
+    def query(self, cmd, *args, **kw):    # query is appended to the pending commands
+        self.write(cmd)
+        msg, self.buf = ';'.join(self.buf), []
+        self.n_msg += 1
+        return self.vi.query(msg, *args, **kw)
+
+    def assert_trigger(self):
+        self.flush()
+        return self.vi.assert_trigger()
+
+    def __getattr__(self, k):    # everything else (resource_name, timeout, close(), ..) from resource
+        return getattr(self.vi, k)
+
+# -----------------------------------------
+# instruments with one worker thread each
+# input:    instr   name=instrument (VISA resource or object with VISA resource in .vi, e.g. fg_class)
+# -----------------------------------------
+class celiv_session_class:
+    def __init__(self, **instr):
+        self.instr = instr
+        self.pool = {k: concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix=f'celiv_{k}') for k in instr}
+        self.last = {k: None for k in instr}    # last submitted job of each instrument
+        self.lock = threading.Lock()
+
+    # -----------------------------------------
+    # runs fn(*args, **kw) in thread of instrument name
+    # input:    after   names of instruments whose jobs submitted so far have to be finished before (e.g. acquisition
+    #                   of scope triggering the generator)
+    #           batch   True: writes to the instrument are batched (instrument in args replaced by celiv_batch_class,
+    #                   resp. for fg_class by a copy with celiv_batch_class in .vi, the instrument itself is not changed)
+    # output:   future  (-> result of fn)
+    # -----------------------------------------
+    def submit(self, name, fn, *args, after=(), batch=False, **kw):    # -> future
+        with self.lock:
+            deps = [self.last[k] for k in after  if k != name and self.last[k] is not None]
+            fut = self.pool[name].submit(self._job, name, fn, args, kw, deps, batch)
+            self.last[name] = fut
+        return fut
+
+    def _job(self, name, fn, args, kw, deps, batch):
+        concurrent.futures.wait(deps)
+        if not batch:
+            return fn(*args, **kw)
+        ins = self.instr[name]
+        if hasattr(ins, 'vi'):    # fg_class: methods write to .vi -> copy with proxy (ins.vi may be used by other threads)
+            bvi = celiv_batch_class(ins.vi)
+            bins = copy.copy(ins)
+            bins.vi = bvi
+        else:
+            bvi = bins = celiv_batch_class(ins)
+        try:
+            return fn(*[bins  if a is ins  else a for a in args], **{k: bins  if a is ins  else a for k, a in kw.items()})
+        finally:
+            bvi.flush()
+
+    # waits for all jobs submitted so far (exception of a failed job is raised)
+    def sync(self, *names):    # -> results of last jobs
+        names = names  or tuple(self.instr)
+        return [self.last[k].result()  if self.last[k] is not None  else None for k in names]
+
+    def close(self):
+        for p in self.pool.values():
+            p.shutdown(wait=True)
+
+# --- benchmark with simulated instruments: setup of 3 instruments sequential vs. concurrent + batched ---
+# execute with python celiv_session.py
+if __name__ == '__main__':
+    import time
+    from meas.celiv_sim import sim_rm_class
+    def init_fg(vi):    # similar to celiv_init_FGs()
+        for c in ["BURSt:GATE:POLarity NORMal", "TRIGger:SLOPe POSitive", "OUTPut:TRIGger:SLOPe POSitive",
+                  "VOLTage:UNIT VPP", "FORM:BORD SWAP", "DATA:DAC VOLATILE,0,255,0", "OUTPut:LOAD INF",
+                  "VOLTage:OFFSet 0.0", "VOLTage 0.01", "BURSt:MODE TRIGgered", "BURSt:NCYCles 1",
+                  "TRIGger:SOURce BUS", "BURSt:STATe ON", "OUTPut:TRIGger ON", "FUNCtion USER", "FUNCtion:USER VOLATILE"]:
+            vi.write(c)
+        return vi.query("SYST:ERR?")
+    def init_osc(vi):    # similar to celiv_init_osca2()
+        vi.query("*ESR?")
+        vi.query("ALLEV?")
+        for c in ["HEAD OFF", "trig:main:edge:source ext5", "trig:main:level 1.6", "ACQ:MOD SAM", "ACQ:STATE 0",
+                  "TRIG:MAI:MOD NORM", "ACQ:STOPA SEQ", "CH1:SCA 1.0", "CH2:SCA 0.1", "HOR:MAI:SCA 5.0E-4"]:
+            vi.write(c)
+        return vi.query("ALLEV?")
+    rsc = sim_rm_class()
+    viFG = rsc.open_resource("USB0::0x0957::0x0407::MY44003895::0::INSTR")
+    viAG = rsc.open_resource("USB0::0x0957::0x0407::MY44002154::0::INSTR")
+    viOSC = rsc.open_resource("USB0::0x0699::0x0369::C101634::INSTR")
+    for ins in (viFG, viAG):
+        ins.t_lat = 5e-3
+    viOSC.t_lat = 10e-3
+    t = time.perf_counter()
+    r_seq = [init_fg(viAG), init_fg(viFG), init_osc(viOSC)]
+    dt_seq = time.perf_counter() - t
+    set_seq = [dict(i.set) for i in (viFG, viAG, viOSC)]
+    for ins in (viFG, viAG, viOSC):
+        ins.reset()
+    ses = celiv_session_class(FG=viFG, AG=viAG, OSC=viOSC)
+    t = time.perf_counter()
+    fut = [ses.submit('AG', init_fg, viAG, batch=True), ses.submit('FG', init_fg, viFG, batch=True),
+           ses.submit('OSC', init_osc, viOSC, batch=True)]
+    r_con = [f.result() for f in fut]
+    dt_con = time.perf_counter() - t
+    ses.close()
+    assert r_con == r_seq and [i.set for i in (viFG, viAG, viOSC)] == set_seq, "different instrument state"
+    print(f"sequential:            {dt_seq*1e3:6.1f} ms")
+    print(f"concurrent + batched:  {dt_con*1e3:6.1f} ms  (speedup {dt_seq/dt_con:.1f}x)")
+    # batch mode with object holding the resource in .vi (as fg_class): fn gets a copy, the object is not changed
+    class fg_sim_class:
+        def __init__(self, vi):
+            self.vi = vi
+        def setV(self, off, vpp):
+            self.vi.write(f"VOLTage {vpp}")
+            self.vi.write(f"VOLTage:OFFSet {off}")
+    FG = fg_sim_class(viFG)
+    ses = celiv_session_class(FG=FG)
+    def set_fg(fg):
+        fg.setV(0.1, 2.0)
+        return fg is not FG and isinstance(fg.vi, celiv_batch_class) and FG.vi is viFG
+    assert ses.submit('FG', set_fg, FG, batch=True).result() and FG.vi is viFG, "instrument object modified"
+    ses.close()
+    assert viFG.query("VOLT?;VOLT:OFFS?") == "2.0;0.1", "settings not sent"
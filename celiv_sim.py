@@ -0,0 +1,521 @@
+# celiv_sim.py
+# written by Veit Wagner
+#  --- simulated CELIV setup for tests without bench: pyvisa compatible resources of KE3390 / A33220, TDS2022B, SPEXCTRL
+#      and a series RC device driven by the generator ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 SCPI parsing moved to celiv_scpi.py
+# v0.03 18.10.2026 ASCII upload DATA:DAC (header is normalized to DAT:DAC), uploads of less than 8 points accepted
+#
+# The simulated resources implement write(), write_raw(), read(), read_raw(), query(), assert_trigger(), close() as
+# pyvisa resources do, with command latency and transfer bandwidth (real time.sleep(), so timing of acquisition loops
+# can be measured). SCPI messages may contain several ;-separated commands (header path rules as IEEE 488.2).
+# Only the commands used by celiv.py / celiv_acq.py are modeled, other settings are stored and can be queried back.
+#
+# setup model:
+#   generator with TRIG:SOUR BUS fires on *TRG (burst of one waveform period), its trigger output (OUTP:TRIG ON)
+#   triggers generators with TRIG:SOUR EXT and the scope (ext. trigger)
+#   device: generator -- C (device) -- Rload -- GND,  ch1 = generator voltage, ch2 = voltage across Rload (tau = Rload*C)
+#   scope:  ACQ:STATE 1 starts acquisition, a trigger during recording / rearming is lost, ACQ:STOPA SEQ stops after
+#           NUMAV (AVE) or 1 (SAM) shots, record in 8 bit (25 counts/div) plus noise of each shot
+#   LED generator (A33220 on ext. trigger) and SPEXCTRL switch are not coupled to the device
+#
+# usage:
+#  from meas.celiv_sim import sim_rm_class
+#  rsc = sim_rm_class()                         # instead of pyvisa.ResourceManager()
+#  viFG, viOSC, viAG, sxc = celiv_open_instr(rsc, use_SPEXCTRL=True, use_TDS2022B=True)
+#  rsc.bench.R, rsc.bench.C = 1e3, 100e-12      # device
+#  print(rsc.bench.stats())                     # # of messages, bytes and bus time per instrument
+import numpy as np
+import threading
+import hashlib
+import time
+from meas.celiv_wf import celiv_WF_parse
+from meas.celiv_scpi import scpi_split, scpi_float
+try:
+    import pyvisa
+    sim_timeout_error = lambda: pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_timeout)
+except ImportError:    # simulation does not need pyvisa
+    sim_timeout_error = lambda: TimeoutError("VI_ERROR_TMO (-1073807339): Timeout expired before operation completed.")
+
+# -----------------------------------------
+# base class of simulated resources: latency, bandwidth, output queue, error queue, stored settings
+# input:    bench       sim_bench_class
+#           name        resource name (VISA descriptor)
+#           t_lat       latency of each write / read [s]
+#           bw          transfer rate [bytes/s]
+# -----------------------------------------
+class sim_instr_class:
+    idn = "SIM,INSTR,0,0.01"
+
+    def __init__(self, bench, name, t_lat=1e-3, bw=1e6):
+        self.bench, self.resource_name = bench, name
+        self.t_lat, self.bw = t_lat, bw
+        self.timeout = 2000          # ms (as pyvisa)
+        self.read_termination, self.write_termination = '\n', '\n'
+        self.lock = threading.RLock()
+        self.n_write = self.n_read = self.n_bytes = 0
+        self.t_bus = 0.0
+        self.reset()
+
+    def reset(self):    # *RST
+        self.out, self.err, self.set = b'', [], {}
+
+    def _bus(self, nbytes):    # waits latency + transfer time
+        dt = self.t_lat + nbytes / self.bw
+        self.n_bytes += nbytes
+        self.t_bus += dt
+        time.sleep(dt)
+
+    # --- pyvisa interface ---
+    def write(self, msg, termination=None, encoding=None):
+        self.write_raw(msg.encode('latin-1'))
+        return len(msg)
+
+    def write_raw(self, msg):
+        with self.lock:
+            self.n_write += 1
+            self._bus(len(msg))
+            resp = self.handle(msg)
+            if resp:
+                self.out = b';'.join(resp) + b'\n'
+            return len(msg)
+
+    def read_raw(self, size=None):
+        with self.lock:
+            if not self.out:
+                time.sleep(self.timeout * 1e-3)
+                raise sim_timeout_error()
+            self.n_read += 1
+            msg, self.out = self.out, b''
+            self._bus(len(msg))
+            return msg
+
+    def read(self, termination=None, encoding=None):
+        return self.read_raw().decode('latin-1').rstrip('\n')
+
+    def query(self, msg, delay=None):
+        with self.lock:
+            self.write(msg)
+            return self.read()
+
+    def assert_trigger(self):
+        with self.lock:
+            self.n_write += 1
+            self._bus(0)
+            self.trigger()
+
+    def clear(self):
+        self.out = b''
+
+    def close(self):
+        pass
+
+    # --- command handling ---
+    def handle(self, msg):    # -> list of responses (bytes)
+        resp = []
+        for hdr, q, args in scpi_split(msg.decode('latin-1')):
+            if hdr is None:
+                self.error(-102, "Syntax error")
+                continue
+            try:
+                r = self.command(hdr, q, args)
+            except (ValueError, IndexError, KeyError):
+                self.error(-224, "Illegal parameter value")
+                continue
+            if q and r is not None:
+                resp.append(r  if isinstance(r, bytes)  else str(r).encode('latin-1'))
+        return resp
+
+    def command(self, hdr, q, args):    # -> response of query (str or bytes)
+        h = ':'.join(hdr)
+        if h == '*IDN':
+            return self.idn
+        if h == '*RST':
+            return self.reset()
+        if h == '*CLS':
+            self.err = []
+            return None
+        if h == '*ESR':
+            return '0'
+        if h == '*OPC':
+            return '1'  if q  else None
+        if h in ('*TRG', 'TRIG'):
+            return self.trigger()
+        if h == '*WAI':
+            return None
+        if h in ('SYST:ERR', 'ALLEV'):
+            if not self.err:
+                return '+0,"No error"'  if h == 'SYST:ERR'  else '0,"No events to report - queue empty"'
+            return self.err.pop(0)
+        if q:
+            if h in self.set:
+                return self.set[h]
+            self.error(-113, "Undefined header")
+            return None
+        self.set[h] = args
+        return None
+
+    def error(self, code, txt):
+        self.err.append(f'{code:+d},"{txt}"')
+
+    def trigger(self):
+        pass
+
+    def get(self, h, dflt):    # -> stored setting as float
+        try:
+            return scpi_float(self.set[h])
+        except (KeyError, ValueError):
+            return dflt
+
+# -----------------------------------------
+# KE3390 / A33220: arbitrary waveform (DATA:DAC VOLATILE), FREQ, VOLT, VOLT:OFFS, OUTP, APPL:USER, burst on trigger
+# -----------------------------------------
+class sim_fg_class(sim_instr_class):
+    idn = "Agilent Technologies,33220A,SIM,2.02-2.02-22-2"
+
+    def __init__(self, bench, name, t_lat=1e-3, bw=1e6, t_dac=1e-6):
+        self.t_dac = t_dac    # time to store one DAC point [s]
+        super().__init__(bench, name, t_lat, bw)
+
+    def reset(self):
+        super().reset()
+        self.dac = np.zeros(8, dtype=np.int16)
+        self.wf_hash = None
+        self.set.update({'FREQ':'1.0E+3', 'VOLT':'0.1', 'VOLT:OFFS':'0.0', 'OUTP':'0', 'FORM:BORD':'NORM',
+                         'TRIG:SOUR':'IMM', 'OUTP:TRIG':'0', 'BURS:STAT':'0'})
+        self.t_busy = -np.inf
+
+    def handle(self, msg):
+        if msg.lstrip()[:4].upper() == b'DATA' and b'#' in msg[:40]:    # binary block, no ; splitting
+            bord = 'SWAP'  if self.set.get('FORM:BORD', 'NORM').upper().startswith('SW')  else 'NORM'
+            try:
+                mem, dac = celiv_WF_parse(msg.rstrip(b'\n'), bord)
+            except (AssertionError, ValueError):
+                self.error(-161, "Invalid block data")
+                return []
+            self.load(dac)
+            return []
+        return super().handle(msg)
+
+    def command(self, hdr, q, args):
+        h = ':'.join(hdr)
+        if h == 'DAT:DAC' and not q:
+            mem, _, vals = args.partition(',')
+            self.load(np.array(vals.split(','), dtype=np.int64))
+            return None
+        if h.startswith('APPL') and not q:    # APPL:USER f, Vpp, Voffs
+            p = [s for s in args.split(',') if s.strip()]
+            for k, v in zip(('FREQ', 'VOLT', 'VOLT:OFFS'), p):
+                self.set[k] = v.strip()
+            self.set['OUTP'] = '1'
+            return None
+        if h in ('FREQ', 'VOLT', 'VOLT:OFFS') and not q:
+            scpi_float(args)
+        return super().command(hdr, q, args)
+
+    def load(self, dac):    # waveform into volatile memory
+        dac = np.asarray(dac)
+        if dac.size < 1 or np.abs(dac).max() > 8191:
+            self.error(-222, "Data out of range")
+            return
+        time.sleep(self.t_dac * dac.size)
+        self.dac = dac.astype(np.int16)
+        self.wf_hash = hashlib.blake2b(self.dac.tobytes(), digest_size=8).hexdigest()
+
+    def trigger(self):    # BUS trigger (*TRG): burst of one period, trigger output fires
+        if not self.set.get('TRIG:SOUR', 'IMM').upper().startswith('BUS'):
+            self.error(-211, "Trigger ignored")
+            return None
+        self.fire(time.perf_counter())
+        return None
+
+    def fire(self, t):
+        if t < self.t_busy:    # burst still running: trigger is ignored
+            return
+        self.t_busy = t + self.period()
+        if self.get('OUTP:TRIG', 0):
+            self.bench.ext_trigger(self, t)
+
+    def period(self):
+        return 1.0 / self.get('FREQ', 1e3)
+
+    # output voltage of waveform points, dt of points
+    def output(self):    # -> v, dt
+        vpp, voff = self.get('VOLT', 0.1), self.get('VOLT:OFFS', 0.0)
+        v = voff + vpp / 2 * self.dac / 8191.0  if self.get('OUTP', 0)  else np.zeros(self.dac.size)
+        return v, self.period() / self.dac.size
+
+# -----------------------------------------
+# TDS2022B: averaging acquisition, ACQ:NUMACQ?, waveform transfer (ASCII and binary, WID 1 / 2), preamble
+# -----------------------------------------
+class sim_tds_class(sim_instr_class):
+    idn = "TEKTRONIX,TDS 2022B,SIM,CF:91.1CT FV:v22.01"
+    n_pt = 2500
+
+    def __init__(self, bench, name, t_lat=2e-3, bw=400e3, t_rearm=5e-3, noise=(2e-3, 1e-3)):
+        self.t_rearm, self.noise = t_rearm, noise    # dead time after record [s], noise (rms) of ch1, ch2 [V]
+        super().__init__(bench, name, t_lat, bw)
+
+    def reset(self):
+        super().reset()
+        self.set.update({'HEAD':'0', 'ACQ:MOD':'SAM', 'ACQ:NUMAV':'16', 'ACQ:STOPA':'RUNST', 'DAT:SOUR':'CH1',
+                         'DAT:ENC':'RIB', 'DAT:WID':'1', 'DAT:STAR':'1', 'DAT:STOP':'2500', 'HOR:MAI:SCA':'5.0E-4',
+                         'HOR:MAI:POS':'0.0', 'CH1:SCA':'1.0', 'CH2:SCA':'1.0', 'CH1:POS':'0.0', 'CH2:POS':'0.0'})
+        self.run, self.numacq, self.pend, self.t_ready = False, 0, [], -np.inf
+        self.sum, self.nsum = np.zeros((2, self.n_pt)), 0
+        self.rec = np.zeros((2, self.n_pt))
+
+    def xscale(self):    # -> xin, xze  (trigger at t=0)
+        s = self.get('HOR:MAI:SCA', 5e-4)
+        xin = 10 * s / self.n_pt
+        return xin, self.get('HOR:MAI:POS', 0.0) - 5 * s
+
+    def yscale(self, ch):    # -> ymu, yoff (counts)
+        return self.get(f'CH{ch}:SCA', 1.0) / 25, -25 * self.get(f'CH{ch}:POS', 0.0)
+
+    def nav(self):
+        return int(self.get('ACQ:NUMAV', 16))  if self.set['ACQ:MOD'].upper().startswith('AVE')  else 1
+
+    def ext_trigger(self, fg, t):    # trigger from generator fg at time t
+        self.update(t)
+        if not self.run or t < self.t_ready or self.bench.rng.random() < self.bench.p_miss:
+            return
+        xin, xze = self.xscale()
+        t_done = t + max(0.0, xze + xin * self.n_pt)
+        self.t_ready = t_done + self.t_rearm
+        self.pend.append((t_done, self.bench.response(fg, xze + xin * np.arange(self.n_pt))))
+
+    def update(self, t=None):    # completes shots recorded until t
+        t = time.perf_counter()  if t is None  else t
+        while self.pend and self.pend[0][0] <= t:
+            t_done, v = self.pend.pop(0)
+            if not self.run:
+                continue
+            self.sum += v + np.asarray(self.noise)[:, None] * self.bench.rng.standard_normal(v.shape)
+            self.nsum += 1
+            self.numacq += 1
+            n = self.nav()
+            if self.nsum >= n:
+                self.rec = self.sum / self.nsum
+                if self.set['ACQ:STOPA'].upper().startswith('SEQ'):
+                    self.run = False
+                else:
+                    self.sum, self.nsum = np.zeros_like(self.sum), 0
+
+    def command(self, hdr, q, args):
+        h = ':'.join(hdr)
+        self.update()
+        if h == 'ACQ:STAT':
+            if q:
+                return '1'  if self.run  else '0'
+            on = args.upper() in ('ON', 'RUN')  or (args.lstrip('+-').isdigit() and int(args) != 0)
+            if on:    # (re)starts sequence / averaging
+                self.numacq, self.pend, self.nsum = 0, [], 0
+                self.sum = np.zeros_like(self.sum)
+            self.run = on
+            return None
+        if h == 'ACQ:NUMAC' and q:
+            return str(self.numacq)
+        if h == 'CURV' and q:
+            return self.curve()
+        if h == 'WFMP' and q:
+            return self.preamble()
+        if len(hdr) == 2 and hdr[0] == 'WFMP' and q:
+            p = self.preamble_dict()
+            if hdr[1] in p:
+                return p[hdr[1]]
+        r = super().command(hdr, q, args)
+        return r  if not (q and r is not None and self.get('HEAD', 0))  else f":{h} {r}"
+
+    def source(self):    # -> channel index 0/1
+        return int(self.set['DAT:SOUR'].upper().replace('CH', '')) - 1
+
+    def counts(self):    # -> record of data source in counts (float)
+        ch = self.source() + 1
+        ymu, yof = self.yscale(ch)
+        lim = 127.0  if int(self.get('DAT:WID', 1)) == 1  else 32767 / 256
+        return np.clip(self.rec[ch-1] / ymu + yof, -128, lim)
+
+    def window(self):    # -> i0, i1 (DAT:STAR, DAT:STOP -> python slice)
+        i0 = int(self.get('DAT:STAR', 1)) - 1
+        return max(0, i0), min(self.n_pt, int(self.get('DAT:STOP', self.n_pt)))
+
+    def curve(self):    # -> ASCII or binary block
+        i0, i1 = self.window()
+        c = self.counts()[i0:i1]
+        enc, wid = self.set['DAT:ENC'].upper(), int(self.get('DAT:WID', 1))
+        if wid == 1:
+            c = np.round(c).astype(np.int16)
+        else:
+            c = np.round(c * 256).astype(np.int32)
+        if enc.startswith('ASC'):
+            return ','.join(map(str, c.tolist()))
+        signed = enc in ('RIB', 'SRI')
+        if not signed:
+            c = c + (128  if wid == 1  else 32768)
+        dt = ('i'  if signed  else 'u') + str(wid)
+        dt = ('<'  if enc.startswith('SR')  else '>') + dt
+        data = c.astype(dt).tobytes()
+        nb = str(len(data))
+        return f"#{len(nb)}{nb}".encode('ascii') + data
+
+    def preamble_dict(self):    # -> WFMPre fields (short mnemonics, as strings)
+        ch = self.source() + 1
+        xin, xze = self.xscale()
+        ymu, yof = self.yscale(ch)
+        wid = int(self.get('DAT:WID', 1))
+        i0, i1 = self.window()
+        enc = self.set['DAT:ENC'].upper()
+        return {'BYT_N':str(wid), 'BIT_N':str(8*wid), 'ENC':'ASC'  if enc.startswith('ASC')  else 'BIN',
+                'BN_F':'RI'  if enc in ('RIB', 'SRI')  else 'RP', 'BYT_O':'LSB'  if enc.startswith('SR')  else 'MSB',
+                'NR_P':str(i1 - i0), 'WFI':f'"Ch{ch}, DC coupling, {self.get(f"CH{ch}:SCA", 1.0):.1E} V/div, '
+                f'{self.get("HOR:MAI:SCA", 5e-4):.1E} s/div, {self.n_pt} points, {"Average" if self.nav() > 1 else "Sample"} mode"',
+                'PT_F':'Y', 'XIN':f'{xin:.4E}', 'PT_O':'0', 'XZE':f'{xze:.4E}', 'XUN':'"s"',
+                'YMU':f'{ymu / (256  if wid == 2  else 1):.4E}', 'YZE':'0.0E0', 'YOF':f'{yof * (256  if wid == 2  else 1):.4E}',
+                'YUN':'"Volts"'}
+
+    def preamble(self):    # -> WFMPre? response
+        return ';'.join(self.preamble_dict().values())
+
+# -----------------------------------------
+# SPEXCTRL (serial): protocol of instr.spexctrl is not modeled, lines are logged and echoed
+# -----------------------------------------
+class sim_spex_class(sim_instr_class):
+    idn = "SPEXCTRL,SIM"
+
+    def __init__(self, bench, name, t_lat=5e-3, bw=960):
+        super().__init__(bench, name, t_lat, bw)
+        self.baud_rate = 9600
+
+    def handle(self, msg):
+        self.log.append(msg)
+        return [msg.rstrip(b'\r\n')]
+
+    def reset(self):
+        super().reset()
+        self.log = []
+
+# -----------------------------------------
+# simulated setup (all resources of one sim_rm_class) and device model
+# input:    R, C        load resistance [Ohm] and device capacitance [F]
+#           p_miss      probability that the scope misses a trigger
+# -----------------------------------------
+class sim_bench_class:
+    def __init__(self, R=1e3, C=100e-12, p_miss=0.0, seed=0):
+        self.R, self.C, self.p_miss = R, C, p_miss
+        self.rng = np.random.default_rng(seed)
+        self.instr = {}
+        self.cache = {}
+
+    def ext_trigger(self, src, t):    # trigger output of generator src
+        for ins in self.instr.values():
+            if ins is src:
+                continue
+            if isinstance(ins, sim_fg_class) and ins.set.get('TRIG:SOUR', 'IMM').upper().startswith('EXT'):
+                ins.fire(t)
+            elif isinstance(ins, sim_tds_class):
+                ins.ext_trigger(src, t)
+
+    # -----------------------------------------
+    # ch1 (generator voltage) and ch2 (voltage across R) at times t after trigger of generator fg (burst of one period,
+    # before and after at level of 1st point)
+    # -----------------------------------------
+    def response(self, fg, t):    # -> v (2 x len(t))
+        v, dt = fg.output()
+        key = (fg.resource_name, fg.wf_hash, v[0], v[-1], dt, self.R, self.C, t[0], t[-1], len(t))
+        if key not in self.cache:
+            n_end = int(np.ceil(max(t[-1], 0) / dt)) + 2
+            u = np.full(max(n_end, v.size) + 1, v[0])
+            u[1:v.size+1] = v                             # u[k]: voltage at t = (k-1)*dt, u[0] before trigger
+            du = np.diff(u)
+            a = np.exp(-dt / (self.R * self.C))
+            vr = np.zeros(u.size)
+            for k in range(1, u.size):                    # high pass:  vR' = u' - vR/RC
+                vr[k] = a * (vr[k-1] + du[k-1])
+            tk = (np.arange(u.size) - 1) * dt
+            ch1 = np.where(t < 0, v[0], np.interp(t, tk[1:], u[1:]))
+            ch2 = np.where(t < 0, 0.0, np.interp(t, tk[1:], vr[1:]))
+            if len(self.cache) > 16:
+                self.cache.clear()
+            self.cache[key] = np.array([ch1, ch2])
+        return self.cache[key]
+
+    def stats(self):    # -> {resource name: (# writes, # reads, bytes, bus time [s])}
+        return {k: (i.n_write, i.n_read, i.n_bytes, i.t_bus) for k, i in self.instr.items()}
+
+# -----------------------------------------
+# pyvisa.ResourceManager replacement: resources by vendor id of descriptor
+#   0x0957 -> A33220, 0x05e6 -> KE3390, 0x0699 -> TDS2022B, ASRL / COM -> SPEXCTRL
+# -----------------------------------------
+class sim_rm_class:
+    def __init__(self, bench=None):
+        self.bench = sim_bench_class()  if bench is None  else bench
+
+    def open_resource(self, name, **kw):    # -> resource
+        if name in self.bench.instr:
+            return self.bench.instr[name]
+        n = name.upper()
+        if '0X0957' in n or '0X05E6' in n:
+            ins = sim_fg_class(self.bench, name)
+            if '0X05E6' in n:
+                ins.idn = "Keithley Instruments Inc.,3390,SIM,1.02-0B1-03-07-03"
+        elif '0X0699' in n:
+            ins = sim_tds_class(self.bench, name)
+        elif n.startswith('ASRL') or n.startswith('COM'):
+            ins = sim_spex_class(self.bench, name)
+        else:
+            raise ValueError(f"sim_rm_class: no simulated instrument for '{name}'")
+        for k, v in kw.items():
+            setattr(ins, k, v)
+        self.bench.instr[name] = ins
+        return ins
+
+    def list_resources(self, query='?*::INSTR'):
+        return tuple(self.bench.instr)
+
+    def close(self):
+        pass
+
+# --- simulated CELIV measurement: upload, averaging acquisition with polled triggers, readout; timing per step ---
+# execute with python celiv_sim.py
+if __name__ == '__main__':
+    from meas.celiv_wf import celiv_compile_WF, celiv_WF_msg_bin, celiv_WF_msg_ascii
+    from meas.celiv_acq import celiv_osca2_fetch, celiv_osca2_decode
+    rsc = sim_rm_class(sim_bench_class(R=1e3, C=100e-9))
+    viFG = rsc.open_resource("USB0::0x0957::0x0407::MY44003895::0::INSTR")
+    viOSC = rsc.open_resource("USB0::0x0699::0x0369::C101634::INSTR")
+    viFG.write("FORM:BORD SWAP;:TRIG:SOUR BUS;:OUTP:TRIG ON;:BURS:MODE TRIG;NCYC 1;STAT ON")
+    n_WF, Tmin = 4000, 4e-3
+    a = celiv_compile_WF([(400, 0.0), (2000, 1, 1, 2000, 1.0), (1, 0.0)], n_WF=n_WF)    # 2 ms ramp 0..1
+    viFG.write("DATA:DAC VOLATILE,0,255,0")    # short ASCII upload (3 points)
+    assert np.array_equal(viFG.dac, [0, 255, 0]) and viFG.query("SYST:ERR?").startswith('+0'), "short upload rejected"
+    dac = np.int16(np.round(8191 * a))
+    for name, msg in [('ascii', celiv_WF_msg_ascii(dac)), ('bin', celiv_WF_msg_bin(dac))]:
+        t = time.perf_counter()
+        viFG.write_raw(msg)
+        err = viFG.query("SYST:ERR?")
+        print(f"upload {name:5s}: {(time.perf_counter()-t)*1e3:6.1f} ms  ({err})")
+        assert np.array_equal(viFG.dac, dac) and err.startswith('+0'), f"{name} upload failed ({err})"
+    viFG.write(f"FREQ {1/Tmin:e};:VOLT 2.0;VOLT:OFFS 1.0;:OUTP ON")
+    viOSC.write("HEAD OFF;:HOR:MAI:SCA 5.0E-4;POS 2.0E-3;:CH1:SCA 0.5;:CH2:SCA 0.05;:ACQ:STOPA SEQ;MOD AVE;NUMAV 16")
+    t = time.perf_counter()
+    viOSC.write("ACQ:STATE 1")
+    ntrig = 0
+    while viOSC.query("ACQ:STATE?") == '1':    # paced by scope, as celiv_osca2_trigger_poll()
+        viFG.assert_trigger()
+        ntrig += 1
+        n = int(viOSC.query("ACQ:NUMACQ?"))
+        while int(viOSC.query("ACQ:NUMACQ?")) == n and viOSC.query("ACQ:STATE?") == '1':
+            time.sleep(1e-3)
+    t_acq = time.perf_counter() - t
+    t = time.perf_counter()
+    tt, ch1, ch2 = celiv_osca2_decode(celiv_osca2_fetch(viOSC))
+    t_rd = time.perf_counter() - t
+    print(f"acquisition: 16 shots, {ntrig} triggers, {t_acq*1e3:6.1f} ms;  readout 2 channels: {t_rd*1e3:6.1f} ms")
+    # displacement current of ramp: R*C*dV/dt (tau = 0.1 ms << ramp)
+    jd = 1e3 * 100e-9 * 1.0 / 2e-3    # ramp 1 V in 2 ms
+    i = np.searchsorted(tt, 1.5e-3)
+    print(f"ch2 on ramp: {ch2[i]:.4f} V (expected R*C*dV/dt = {jd:.4f} V), ch1 end of ramp: {ch1[np.searchsorted(tt, 2.39e-3)]:.3f} V")
+    assert abs(ch2[i] - jd) < 0.01 and abs(ch2[np.searchsorted(tt, -0.5e-3)]) < 0.01
+    for k, s in rsc.bench.stats().items():
+        print(f"{k}: {s[0]:4d} writes, {s[1]:4d} reads, {s[2]:7d} bytes, bus {s[3]*1e3:6.1f} ms")
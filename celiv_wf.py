@@ -0,0 +1,211 @@
+# celiv_wf.py
+# written by Veit Wagner
+#  --- segment based waveform compiler for the function generator waveforms of celiv.py (no instrument access) ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 DAC upload messages: binary IEEE 488.2 definite length block and ASCII (celiv_WF_msg_bin(), celiv_WF_msg_ascii())
+# v0.03 18.10.2026 ramps as k/m*scale + offsets (same values as the former loops), waveforms of celiv.py (celiv_OTRACE_WF() ..)
+#
+# A waveform is a list of segments:  (n, v) constant level v,  or  (n, k0, dk, m, scale, off1, off2) ramp with the values
+# (k0 + j*dk)/m * scale + off1 - off2,  j = 0..n-1  (off1, off2 optional, dflt 0).  The ramp values are calculated with
+# the same operations as the former loops (e.g. np.arange(1, ntp+1)/ntp * dV), so the DAC codes are identical.
+# The whole array is built in one pass (np.repeat of the segment parameters), no python loop over pulses / points.
+#
+# usage:
+#  from meas.celiv_wf import celiv_compile_WF
+#  pulse = [(ntp, 1, 1, ntp, 1.0), (nth, 1.0), (ntn, ntn, -1, ntn, 1.0)]     # ramp up [1:ntp]/ntp, hold, ramp down [ntn:-1:1]/ntn
+#  a = celiv_compile_WF([(ntd, 0.0)] + pulse, n_pulses-1, head=[(nt0, 0.0)] + pulse, n_WF=n_WF)
+#  vi.write_raw( celiv_WF_msg_bin(np.int16(np.round(8191*a))) )                   # upload as binary block (FORM:BORD SWAP)
+import numpy as np
+import re
+
+# -----------------------------------------
+# builds waveform from segments
+# input:    segs    list of segments (n, v) or (n, k0, dk, m, scale[, off1[, off2]]), repeated nrep times
+#           nrep    # of repetitions of segs
+#           head    segments before the repeated part
+#           n_WF    length of waveform (dflt: sum of all segment lengths), the rest after the segments is filled with fill
+#           fill    value of points after the last segment
+# output:   a       waveform (n_WF values)
+# -----------------------------------------
+def celiv_compile_WF(segs, nrep=1, head=(), n_WF=None, fill=0.0):    # -> a
+    def row(sg):    # -> (n, k0, dk, m), (scale, off1, off2)
+        if len(sg) == 2:
+            return (sg[0], 0, 0, 1), (0.0, sg[1], 0.0)
+        n, k0, dk, m, scale, off1, off2 = (*sg, 0.0, 0.0)[:7]  if len(sg) < 7  else sg
+        return (n, k0, dk, m), (scale, off1, off2)
+    rh = [row(sg) for sg in head]
+    rs = [row(sg) for sg in segs] * max(0, nrep)
+    si = np.array([r[0] for r in rh + rs], dtype=np.int64).reshape((-1, 4))
+    sf = np.array([r[1] for r in rh + rs], dtype=np.float64).reshape((-1, 3))
+    ok = si[:, 0] > 0
+    si, sf = si[ok], sf[ok]
+    n  = si[:, 0]
+    ntot = int(n.sum())
+    n_WF = ntot  if n_WF is None  else n_WF
+    assert ntot <= n_WF, f"celiv_compile_WF: segments need {ntot} points, but waveform has only n_WF = {n_WF}"
+    iseg = np.repeat(np.arange(len(n)), n)                           # segment of each point
+    j    = np.arange(ntot) - np.repeat(np.cumsum(n) - n, n)          # index of point within its segment
+    k    = si[iseg, 1] + j * si[iseg, 2]
+    a    = np.full(n_WF, fill, dtype=np.float64)
+    a[:ntot] = k / si[iseg, 3] * sf[iseg, 0] + sf[iseg, 1] - sf[iseg, 2]
+    return a
+
+# -----------------------------------------
+# waveforms of celiv.py (w/o normalization), point numbers of the phases as calculated there
+# -----------------------------------------
+# celiv_calc_OTRACE_WF():  n_pulses x (ramp 0..1, hold 1, ramp 1..0), pause 0 between pulses
+def celiv_OTRACE_WF(nt0, ntp, nth, ntn, ntd, n_pulses, n_WF):    # -> a
+    #a(n0+[1:ntp]) = [1:ntp]/ntp;  a(n0+[1:nth]) = 1;  a(n0+[1:ntn]) = [ntn:-1:1]/ntn;  a(n0+[1:ntd]) = 0 (not after last pulse)
+    pulse = [(ntp, 1, 1, ntp, 1.0), (nth, 1.0), (ntn, ntn, -1, ntn, 1.0)]
+    return celiv_compile_WF([(ntd, 0.0)] + pulse, n_pulses-1, head=[(nt0, 0.0)] + pulse, n_WF=n_WF)
+
+# celiv_calc_ecd_WF():  n_pulses x (ramp 0..dVp, hold, ramp down by dVn, pause, ramp down by dVn2, hold, ramp up by dVp2, pause)
+def celiv_ecd_WF(nt0, ntp, nth, ntn, ntd, ntn2, ntl, ntp2, ntd2, n_pulses, dVp, dVn, dVp2, dVn2, n_WF):    # -> a
+    #a(n0+[1:ntp]) = [1:ntp]/ntp *dVp;                   n0 = n0+ntp;
+    #a(n0+[1:nth]) = 1*dVp;                              n0 = n0+nth;   (former python version: only 1st point of hold phase)
+    #a(n0+[1:ntn]) = [ntn:-1:1]/ntn*dVn+dVp-dVn;         n0 = n0+ntn;
+    #a(n0+[1:ntd]) = dVp-dVn;                            n0 = n0+ntd;
+    #a(n0+[1:ntn2]) = dVp-dVn-([1:ntn2]/ntn2)*dVn2;      n0 = n0+ntn2;
+    #a(n0+[1:ntl]) = dVp-dVn-dVn2;                       n0 = n0+ntl;
+    #a(n0+[1:ntp2]) = dVp-dVn-dVn2+[1:ntp2]/ntp2 *dVp2;  n0 = n0+ntp2;
+    #a(n0+[1:ntd2]) = dVp-dVn-dVn2+dVp2;                 n0 = n0+ntd2;   (not after last pulse)
+    Vl = dVp-dVn-dVn2
+    pulse = [(ntp, 1, 1, ntp, dVp), (nth, 1*dVp), (ntn, ntn, -1, ntn, dVn, dVp, dVn), (ntd, dVp-dVn),
+             (ntn2, 1, 1, ntn2, -dVn2, dVp-dVn), (ntl, Vl), (ntp2, 1, 1, ntp2, dVp2, Vl)]
+    return celiv_compile_WF([(ntd2, Vl+dVp2)] + pulse, n_pulses-1, head=[(nt0, 0.0)] + pulse, n_WF=n_WF)
+
+# ny_calc_WF():  single pulse V0e -> Vh -> V0e
+def celiv_ny_WF(nt0, ntp, nth, ntn, V0e, Vh, n_WF):    # -> a
+    #a(n0+[1:ntp]) = V0e + [1:ntp]/ntp *dV;  a(n0+[1:nth]) = Vh;  a(n0+[1:ntn]) = V0e + [ntn:-1:1]/ntn*dV;  rest V0e
+    dV = Vh - V0e
+    pulse = [(ntp, 1, 1, ntp, dV, V0e), (nth, Vh), (ntn, ntn, -1, ntn, dV, V0e)]
+    return celiv_compile_WF(pulse, 1, head=[(nt0, V0e)], n_WF=n_WF, fill=V0e)
+
+# -----------------------------------------
+# SCPI message uploading DAC values (-8191..8191) to the arbitrary waveform memory of KE3390 / A33220
+# as IEEE 488.2 definite length block:   DATA:DAC VOLATILE, #<# of digits><# of bytes><int16 data>
+# input:    dac     DAC values (int16)
+#           bord    byte order as set by FORM:BORD:  'SWAP' (LSB first, used by celiv_init_FGs()) or 'NORM' (MSB first)
+#           mem     waveform memory
+# output:   msg     bytes incl. terminating newline (send by vi.write_raw(msg))
+# -----------------------------------------
+def celiv_WF_msg_bin(dac, bord='SWAP', mem='VOLATILE'):    # -> msg
+    assert bord in ('SWAP', 'NORM'), f"celiv_WF_msg_bin: illegal byte order '{bord}' (allowed: 'SWAP', 'NORM')"
+    data = np.asarray(dac).astype('<i2'  if bord == 'SWAP'  else '>i2').tobytes()
+    nb   = str(len(data))
+    return f"DATA:DAC {mem}, #{len(nb)}{nb}".encode('ascii') + data + b'\n'
+
+# -----------------------------------------
+# same upload as comma separated ASCII values (as k3390_sendWF0())
+# -----------------------------------------
+def celiv_WF_msg_ascii(dac, mem='VOLATILE'):    # -> msg
+    return (f"DATA:DAC {mem}, " + ", ".join(map(str, np.asarray(dac).tolist())) + "\n").encode('ascii')
+
+# -----------------------------------------
+# decodes upload message (binary block or ASCII, see above), e.g. for simulated instruments
+# output:   mem, dac    waveform memory name, DAC values (int16)
+# -----------------------------------------
+def celiv_WF_parse(msg, bord='SWAP'):    # -> mem, dac
+    m = re.match(rb"DATA:DAC\s+(\w+)\s*,\s*", msg)
+    assert m is not None, f"celiv_WF_parse: no DATA:DAC message: {msg[:40]!r}"
+    mem, i = m.group(1).decode('ascii'), m.end()
+    if msg[i:i+1] == b'#':
+        nd  = int(msg[i+1:i+2])
+        nb  = int(msg[i+2:i+2+nd])
+        dac = np.frombuffer(msg[i+2+nd:i+2+nd+nb], dtype='<i2'  if bord == 'SWAP'  else '>i2').astype(np.int16)
+    else:
+        dac = np.array(msg[i:].decode('ascii').split(','), dtype=np.int16)
+    return mem, dac
+
+# --- simulated instrument: checks payload bytes of binary and ASCII upload, compares size and time ---
+# execute with python celiv_wf.py
+if __name__ == '__main__':
+    import time
+    class sim_fg_class:    # accepts DATA:DAC messages like KE3390 / A33220 with FORM:BORD SWAP
+        def __init__(self, bord='SWAP', rate=1e6):
+            self.bord, self.rate, self.dac, self.t_bus = bord, rate, None, 0.0
+        def write_raw(self, msg):
+            self.t_bus += len(msg) / self.rate            # bus time at rate [bytes/s]
+            mem, self.dac = celiv_WF_parse(msg, self.bord)
+    nt = 65536
+    a  = celiv_compile_WF([(2000, 0.0), (5000, 1, 1, 5000, 1.0), (20000, 1.0), (6000, 6000, -1, 6000, 1.0)], 1, n_WF=nt)
+    dac = np.int16(np.round(8191*np.sin(2*np.pi*np.arange(nt)/nt*3) * a))
+    for name, mk in [('ascii', lambda: celiv_WF_msg_ascii(dac)), ('bin', lambda: celiv_WF_msg_bin(dac))]:
+        fg = sim_fg_class()
+        t  = time.perf_counter()
+        msg = mk()
+        fg.write_raw(msg)
+        dt = time.perf_counter() - t
+        assert np.array_equal(fg.dac, dac), f"{name}: payload mismatch"
+        print(f"{name:5s}: {len(msg):7d} bytes, encode+decode {dt*1e3:6.1f} ms, bus time at 1 MB/s {fg.t_bus*1e3:6.1f} ms")
+    msg = celiv_WF_msg_bin(dac[:3])
+    assert msg == b"DATA:DAC VOLATILE, #16" + dac[:3].astype('<i2').tobytes() + b"\n", msg
+    assert celiv_WF_msg_bin(dac[:3], 'NORM')[-7:-1] == dac[:3].astype('>i2').tobytes()
+    print("payload bytes ok (little endian for FORM:BORD SWAP)")
+    # --- parity of the waveforms with the former loop code of celiv.py (DAC codes identical) ---
+    def otrace_loop(nt0, ntp, nth, ntn, ntd, n_pulses, n_WF):
+        a = np.zeros(n_WF)
+        n0 = nt0
+        for i in range(n_pulses):
+            a[n0:n0+ntp] = np.arange(1,ntp+1)/ntp
+            n0 += ntp
+            a[n0:n0+nth] = 1
+            n0 += nth
+            a[n0:n0+ntn] = np.arange(ntn,0,-1)/ntn
+            n0 += ntn
+            if i == n_pulses-1:
+                break
+            a[n0:n0+ntd] = 0
+            n0 += ntd
+        return a
+    def ecd_loop(nt0, ntp, nth, ntn, ntd, ntn2, ntl, ntp2, ntd2, n_pulses, dVp, dVn, dVp2, dVn2, n_WF):
+        a = np.zeros(n_WF)
+        n0 = nt0
+        for i in range(n_pulses):
+            a[n0:n0+ntp] = np.arange(1,ntp+1)/ntp *dVp
+            n0 += ntp
+            a[n0:n0+nth] = 1*dVp        # (fixed hold phase, was a[n0:n0+1])
+            n0 += nth
+            a[n0:n0+ntn] = np.arange(ntn,0,-1)/ntn*dVn+dVp-dVn
+            n0 += ntn
+            a[n0:n0+ntd] = dVp-dVn
+            n0 += ntd
+            a[n0:n0+ntn2] = dVp-dVn-(np.arange(1,ntn2+1)/ntn2)*dVn2
+            n0 += ntn2
+            a[n0:n0+ntl] = dVp-dVn-dVn2
+            n0 += ntl
+            a[n0:n0+ntp2] = dVp-dVn-dVn2+np.arange(1,ntp2+1)/ntp2 *dVp2
+            n0 += ntp2
+            if i == n_pulses-1:
+                break
+            a[n0:n0+ntd2] = dVp-dVn-dVn2+dVp2
+            n0 += ntd2
+        return a
+    def ny_loop(nt0, ntp, nth, ntn, V0e, Vh, n_WF):
+        a = V0e + np.zeros(n_WF)
+        n0 = nt0
+        dV = Vh - V0e
+        a[n0:n0+ntp] = V0e + np.arange(1,ntp+1)/ntp *dV
+        n0 += ntp
+        a[n0:n0+nth] = Vh
+        n0 += nth
+        a[n0:n0+ntn] = V0e + np.arange(ntn,0,-1)/ntn*dV
+        return a
+    rate, n_WF = 1e7, 131072
+    def npt(t, nmin=1):    # # of points as in celiv.py
+        return max(nmin, int(round(rate * t)))
+    for t0, tp, th, tn, td, n_pulses in [(0, 1e-6, 0, 1e-6, 0, 1), (2e-6, 20e-6, 5e-6, 30e-6, 10e-6, 3), (1e-5, 3e-7, 1e-6, 7e-7, 2e-6, 50),
+                                         (5e-6, 100e-6, 0, 100e-6, 50e-6, 10), (0, 4e-6, 2e-5, 6e-6, 1e-6, 200), (1e-6, 1.3e-5, 7e-7, 2.1e-5, 0, 7)]:
+        nt0, ntp, nth, ntn, ntd = max(1, int(round(0.5 + rate * t0))), npt(tp), npt(th, 0), npt(tn), npt(td, 0)
+        a0, a1 = otrace_loop(nt0, ntp, nth, ntn, ntd, n_pulses, n_WF), celiv_OTRACE_WF(nt0, ntp, nth, ntn, ntd, n_pulses, n_WF)
+        assert np.array_equal(a0, a1) and np.array_equal(np.round(8191*a0), np.round(8191*a1)), f"OTRACE differs for {(t0, tp, th, tn, td, n_pulses)}"
+        for dVp, dVn, dVp2, dVn2 in [(1.0, 0.3, 0.2, 0.5), (0.7, 1.1, 0.35, 0.15), (2.0, 2.0, 1.0, 1.0)]:
+            ntn2, ntl, ntp2, ntd2 = npt(tn/2), npt(th/3, 0), npt(tp/2), npt(td, 0)
+            a0 = ecd_loop(nt0, ntp, nth, ntn, ntd, ntn2, ntl, ntp2, ntd2, n_pulses, dVp, dVn, dVp2, dVn2, n_WF)
+            a1 = celiv_ecd_WF(nt0, ntp, nth, ntn, ntd, ntn2, ntl, ntp2, ntd2, n_pulses, dVp, dVn, dVp2, dVn2, n_WF)
+            assert np.array_equal(a0, a1) and np.array_equal(np.round(8191*a0/np.abs(a0).max()), np.round(8191*a1/np.abs(a1).max())), \
+                   f"ecd differs for {(t0, tp, th, tn, td, n_pulses)}, dV = {(dVp, dVn, dVp2, dVn2)}"
+        for V0e, Vh in [(0.0, 1.0), (-0.5, 2.0), (1.5, -0.3)]:
+            a0, a1 = ny_loop(nt0, ntp, nth, ntn, V0e, Vh, n_WF), celiv_ny_WF(nt0, ntp, nth, ntn, V0e, Vh, n_WF)
+            assert np.array_equal(a0, a1), f"ny differs for {(t0, tp, th, tn, V0e, Vh)}"
+    print("waveforms identical to former loop code (OTRACE, ecd with full hold phase, ny)")
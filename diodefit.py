@@ -0,0 +1,228 @@
+# diodefit.py
+# written by Veit Wagner
+#  --- fit of the single-diode model (Iph, I0, n, Rs, Rsh) to all IV curves of stala files (vectorized, warm-started) ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 warm start only from good fits (else start parameters of sdm_guess()) ; Rsh = inf for Gsh = 0 w/o warning
+#
+# Model (stala sign convention, generation current negative):
+#   I = -Iph + I0*(exp((V - I*Rs)/(n*Vt)) - 1) + (V - I*Rs)/Rsh
+# evaluated explicitly with the Lambert W function (W(exp(x)) by Newton iteration, no overflow for large x).
+# The Jacobian is analytic (implicit differentiation of the model equation). All devices of a file are fitted at once
+# by a batched Levenberg-Marquardt; the sweeps are fitted one after the other (z-values, forward/backward), each
+# sweep starts from the solution of the previous sweep of the same device. Files are fitted in parallel by a process pool.
+#
+# usage:
+#  from meas.diodefit import diodefit, diodefit_many
+#  ff  = rdstala_class('Z:/data/IV/2023/02/20/ACO003_iv.dat')
+#  fit = diodefit(ff, idat=0)                          # -> fit['Rs'][idev, iz, isweep], fit['n'][..], fit['rms'][..]
+#  fits, err = diodefit_many(fnames, workers=8)        # list of fit dicts (None for files with errors, see err)
+import numpy as np
+import functools
+from meas.rdmany import load_many
+from meas.ivpar import ivpar
+
+diodefit_keys = ['Iph', 'I0', 'n', 'Rs', 'Rsh']
+kB_q = 8.617333262e-5    # [V/K] Boltzmann constant / elementary charge
+
+# -----------------------------------------
+# W(exp(x)) (principal branch of Lambert W of exp(x)), i.e. solution w of  w + ln(w) = x, for any real x (array)
+# -----------------------------------------
+def lambertw_exp(x, nit=8):    # -> w
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(over='ignore'):
+        w = np.where(x > 1.0, x - np.log(np.maximum(x, 1.0)), np.exp(np.minimum(x, 1.0)) / (1.0 + np.exp(np.minimum(x, 1.0))))
+    for i in range(nit):    # Newton on w + ln w = x  (w stays > 0, quadratic convergence)
+        w = w * (1.0 + x - np.log(w)) / (1.0 + w)
+    return w
+
+# -----------------------------------------
+# current of single-diode model
+# input:    V       voltage [V] (array, broadcast with the parameters)
+#           Iph, I0, n, Rs, Rsh   model parameters [A], [A], -, [Ohm], [Ohm] (arrays, e.g. shape (m, 1) for m curves)
+#           Vt      thermal voltage kT/q [V]
+# output:   I       [A]
+# -----------------------------------------
+def sdm_current(V, Iph, I0, n, Rs, Rsh, Vt=0.025693):    # -> I
+    a  = n * Vt
+    Gsh = 1.0 / Rsh                         # (Rsh = inf allowed)
+    A  = (V * Gsh - (Iph + I0)) / (1.0 + Rs * Gsh)
+    lnth = np.log(I0 * Rs / ((1.0 + Rs * Gsh) * a)) + (V - A * Rs) / a
+    return A + a / Rs * lambertw_exp(lnth)
+
+# -----------------------------------------
+# model current and Jacobian w.r.t. the fit parameters q = (Iph, ln I0, n, ln Rs, Gsh=1/Rsh)  (shape (m, 5))
+# (shunt as conductance: Rsh -> inf stays reachable and has a non-vanishing gradient)
+# output:   I (m, nx),  J (m, nx, 5)
+# -----------------------------------------
+def sdm_jac(V, q, Vt):    # -> I, J
+    Iph, I0, n, Rs, Rsh = _q2par(q)
+    I   = sdm_current(V, Iph, I0, n, Rs, Rsh, Vt)
+    a   = n * Vt
+    Vd  = V - I * Rs
+    Gsh = 1.0 / Rsh
+    I0E = I + Iph + I0 - Vd * Gsh                      # = I0*exp(Vd/a) (from model equation, no overflow)
+    dFdI = -1.0 - (I0E / a + Gsh) * Rs
+    dF  = np.stack(np.broadcast_arrays(
+            -np.ones_like(I),                          # d/dIph
+            I0E - I0,                                  # d/dln(I0)
+            -I0E * Vd / (a * n),                       # d/dn
+            -(I0E / a + Gsh) * I * Rs,                 # d/dln(Rs)
+            Vd), axis=-1)                              # d/dGsh
+    return I, -dF / dFdI[..., None]
+
+def _q2par(q):    # -> Iph, I0, n, Rs, Rsh  (each (m, 1))
+    with np.errstate(divide='ignore'):    # Gsh = 0 -> Rsh = inf (no shunt)
+        return q[:, 0:1], np.exp(q[:, 1:2]), q[:, 2:3], np.exp(q[:, 3:4]), 1.0 / q[:, 4:5]
+
+# -----------------------------------------
+# batched Levenberg-Marquardt fit of the single-diode model to m curves on a common voltage grid
+# input:    V       voltages (nx)
+#           I       currents (m, nx) (NaN values are ignored)
+#           q0      start parameters (m, 5), see sdm_jac()
+#           Vt      thermal voltage [V]
+# output:   q       fitted parameters (m, 5)
+#           rms     rms deviation of the fit [A] (m)
+# -----------------------------------------
+def sdm_fit(V, I, q0, Vt=0.025693, maxit=100, tol=1e-10):    # -> q, rms
+    ok  = np.isfinite(I)
+    Im  = np.where(ok, I, 0.0)
+    s   = 1.0 / np.maximum(np.abs(Im).max(axis=1, keepdims=True), 1e-30)    # residuals relative to current range
+    w   = ok * s
+    q   = np.array(q0, dtype=np.float64)
+    lam = np.full(len(q), 1e-3)
+    def cost(q, ii=slice(None)):
+        with np.errstate(all='ignore'):
+            Ic = sdm_current(V, *_q2par(q), Vt)
+        c = np.sum(((Ic - Im[ii]) * w[ii])**2, axis=1)
+        return np.where(np.isfinite(c), c, np.inf)
+    c    = cost(q)
+    act  = np.flatnonzero(np.isfinite(c))                        # curves still iterating
+    for it in range(maxit):
+        if len(act) == 0:
+            break
+        qa, wa = q[act], w[act]
+        with np.errstate(all='ignore'):
+            Ic, J = sdm_jac(V, qa, Vt)
+        r   = (Ic - Im[act]) * wa
+        Jw  = J * wa[..., None]
+        JtJ = np.einsum('mki,mkj->mij', Jw, Jw)
+        g   = np.einsum('mki,mk->mi', Jw, r)
+        D   = np.einsum('mii->mi', JtJ) + 1e-30
+        dq  = np.linalg.solve(JtJ + lam[act, None, None] * (D[:, :, None] * np.eye(5)), -g[..., None])[..., 0]
+        qn  = qa + dq
+        qn[:, 2] = np.clip(qn[:, 2], 0.2, 20.0)                   # ideality factor within sensible range
+        qn[:, 4] = np.maximum(qn[:, 4], 0.0)                      # Gsh >= 0
+        cn  = cost(qn, act)
+        better = (cn < c[act]) & np.all(np.isfinite(dq), axis=1)
+        conv   = better & (c[act] - cn <= tol * c[act])
+        q[act[better]], c[act[better]] = qn[better], cn[better]
+        lam[act] = np.where(better, lam[act] / 3.0, lam[act] * 4.0)
+        act = act[~conv & (lam[act] < 1e12)]
+    rms = np.sqrt(c / np.maximum(ok.sum(axis=1), 1)) / s[:, 0]
+    return q, rms
+
+# -----------------------------------------
+# start parameters from the curve shape (Jsc, Voc, slopes of ivpar()), used for the first sweep of each device
+# -----------------------------------------
+def sdm_guess(V, I, Vt):    # -> q0 (m, 5)
+    r   = ivpar(V, I, swp=[slice(0, len(V))])
+    Iph = np.nan_to_num(r['Jsc'][:, 0], nan=0.0)
+    Rsh = np.clip(np.nan_to_num(np.abs(r['Rp'][:, 0]), nan=1e6), 1.0, 1e12)
+    Rs  = np.clip(np.nan_to_num(np.abs(r['Rs'][:, 0]), nan=1.0) * 0.5, 1e-3, Rsh / 10)
+    n   = np.full(len(I), 1.5)
+    Voc = np.where(np.isfinite(r['Voc'][:, 0]), r['Voc'][:, 0], np.nanmax(V))
+    Iv  = np.where(np.isfinite(r['Voc'][:, 0]), 0.0, np.nanmax(I, axis=1))    # dark curve: current at max. V
+    with np.errstate(over='ignore', invalid='ignore'):
+        I0 = (Iv + Iph - Voc / Rsh) / np.expm1(Voc / (n * Vt))
+    I0  = np.clip(np.nan_to_num(I0, nan=1e-12), 1e-30, 1e-3)
+    return np.stack([Iph, np.log(I0), n, np.log(Rs), 1.0 / Rsh], axis=1)
+
+# -----------------------------------------
+# start parameters of the next sweep: fitted parameters q of the previous sweep (warm start), for curves whose previous
+# fit failed (rms not finite or > rms_max * current range, parameters not finite) those of sdm_guess()
+# input:    q, rms  result of sdm_fit() of previous sweep (q=None: sdm_guess() for all curves)
+#           Imax    current range max|I| of previous sweep (m)
+# -----------------------------------------
+def sdm_start(V, I, Vt, q=None, rms=None, Imax=None, rms_max=0.05):    # -> q0 (m, 5)
+    if q is None:
+        return sdm_guess(V, I, Vt)
+    q0  = np.array(q, dtype=np.float64)
+    bad = ~((rms <= rms_max * Imax) & np.all(np.isfinite(q0), axis=1))
+    if np.any(bad):
+        q0[bad] = sdm_guess(V, I[bad], Vt)
+    return q0
+
+# -----------------------------------------
+# fits single-diode model to all curves of a stala file
+# input:    ff      rdstala_class object
+#           idat    index of current in the measured quantities
+#           T       temperature [C] for Vt (dflt: sample temperature of file, 25 C if not given)
+#           rms_max warm start from previous sweep only if its rms <= rms_max * current range (see sdm_start())
+# output:   fit     dict of arrays (nglob, nz, nsweep): 'Iph', 'I0', 'n', 'Rs', 'Rsh' [A, A, -, Ohm, Ohm], 'rms' [A]
+#                   and 'Vt', 'sweeps' (x-sweeps, see rdstala_class.xsweeps())
+# -----------------------------------------
+def diodefit(ff, idat=0, T=None, maxit=100, rms_max=0.05):    # -> fit
+    T   = (ff.p['T']  if ff.p['T'] > 0  else 25.0)  if T is None  else T
+    Vt  = kB_q * (T + 273.15)
+    x   = ff.x[0]  if np.ndim(ff.x) > 1  else ff.x
+    Y   = np.asarray(ff.cube[:, :, idat], dtype=np.float64)     # (nglob, nz, n)
+    swp = ff.xsweeps()[0]
+    nglob, nz = Y.shape[:2]
+    out = np.full((nglob, nz, len(swp), 6), np.nan)
+    q = rms = Imax = None
+    for iz in range(nz):
+        for k, sl in enumerate(swp):    # warm start from previous sweep (all devices at once)
+            V, I = x[sl], Y[:, iz, sl]
+            q0   = sdm_start(V, I, Vt, q, rms, Imax, rms_max)
+            q, rms = sdm_fit(V, I, q0, Vt, maxit)
+            Imax = np.abs(np.where(np.isfinite(I), I, 0.0)).max(axis=1)
+            out[:, iz, k] = np.column_stack([q, rms])
+    with np.errstate(divide='ignore'):
+        fit = {'Iph': out[..., 0], 'I0': np.exp(out[..., 1]), 'n': out[..., 2], 'Rs': np.exp(out[..., 3]), 'Rsh': 1.0 / out[..., 4],
+               'rms': out[..., 5], 'Vt': Vt, 'sweeps': swp}
+    return fit
+
+# --- runs in worker process: load and fit one file ---
+def _diodefit_file(fname, idat=0, T=None, maxit=100):    # -> fit
+    from meas.rdstala_class import rdstala_class
+    return diodefit(rdstala_class(fname), idat, T, maxit)
+
+# -----------------------------------------
+# fits single-diode model to all curves of many stala files in parallel (process pool, see load_many())
+# output:   fits    list of diodefit() results (None for files with errors)
+#           err     list of (i, filename, error text)
+# -----------------------------------------
+def diodefit_many(fnames, idat=0, T=None, maxit=100, workers=None):    # -> fits, err
+    return load_many(fnames, reader=functools.partial(_diodefit_file, idat=idat, T=T, maxit=maxit), workers=workers)
+
+# --- benchmark: fits per second on synthetic curves ---
+# execute with python diodefit.py
+if __name__ == '__main__':
+    import time
+    rng  = np.random.default_rng(0)
+    m    = 2000
+    Vt   = 0.025693
+    V    = np.linspace(-0.2, 1.0, 301)
+    ptrue = np.column_stack([rng.uniform(1e-3, 2e-3, m), np.log(10**rng.uniform(-12, -9, m)), rng.uniform(1.2, 2.0, m),
+                             np.log(rng.uniform(2, 30, m)), 1.0 / rng.uniform(1e4, 1e5, m)])
+    I    = sdm_current(V, *_q2par(ptrue), Vt)
+    I   += rng.normal(size=I.shape) * 1e-7
+    t = time.perf_counter()
+    q0 = sdm_guess(V, I, Vt)
+    q, rms = sdm_fit(V, I, q0, Vt)
+    dt = time.perf_counter() - t
+    print(f"cold start: {m} fits in {dt:.3f} s -> {m/dt:.0f} fits/s, median rms {np.median(rms):.2e} A")
+    t = time.perf_counter()
+    q2, rms2 = sdm_fit(V, I * 1.01, q, Vt)    # next sweep, slightly changed curves
+    dt = time.perf_counter() - t
+    print(f"warm start: {m} fits in {dt:.3f} s -> {m/dt:.0f} fits/s, median rms {np.median(rms2):.2e} A")
+    par = _q2par(q)
+    for k, (pt, pf) in enumerate(zip(_q2par(ptrue), par)):
+        print(f" {diodefit_keys[k]:4s} median rel. error {np.median(np.abs(pf/pt - 1)):.2e}")
+    # warm start after failed fits (e.g. curve of a broken contact before): restarted from sdm_guess()
+    q[:10] = np.nan
+    rms[10:20] = 1.0
+    q0 = sdm_start(V, I, Vt, q, rms, np.abs(I).max(axis=1))
+    q3, rms3 = sdm_fit(V, I, q0, Vt)
+    assert np.all(np.isfinite(q3[:20])) and np.median(rms3[:20]) < 2 * np.median(rms), "no restart of failed fits"
+    print(f"restart:    median rms {np.median(rms3[:20]):.2e} A of {20} failed fits")
@@ -0,0 +1,230 @@
+# ivpar.py
+# written by Veit Wagner
+#  --- solar cell parameters (Jsc, Voc, MPP, FF, PCE, Rs, Rp) of many IV curves at once (vectorized, no loops over curves) ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 hysteresis(): hysteresis indices of forward/backward sweep pairs; sweeps can be given (swp)
+# v0.03 18.10.2026 sweeps(): turning point also found if the value is repeated there (x steps of 0)
+# v0.04 18.10.2026 ivpar_sweep(): NaN parameters for sweeps of less than 2 points
+#
+# All curves share one voltage axis x (as the devices/sweeps of a stala file, see rdstala_class.cube). x may contain several
+# sweeps (e.g. forward and backward), each monotonic part of x is evaluated separately (last axis of the results).
+# Current sign as measured by stala: generation current is negative (4th quadrant, V > 0, I < 0).
+# Zero crossings (Jsc, Voc) are linearly interpolated between the neighbouring samples, the MPP is refined by a parabola
+# through the 3 samples around the maximum power, Rs and Rp are the inverse slopes of linear fits of 2*nfit points
+# around V=Voc and V=0.
+#
+# usage:
+#  from meas.ivpar import ivpar, ivpar_many
+#  ff  = rdstala_class('Z:/data/IV/2023/02/20/ACO003_iv.dat')
+#  res = ivpar(ff.x, ff.cube[:, :, 0], area=0.089)        # -> res['PCE'][idev, iz, isweep], res['Voc'][..], ..
+#  res = ivpar_many(ffs, idat=0, area=0.089)              # many files (same x): res['FF'][ifile, idev, iz, isweep]
+#  hy  = hysteresis(ff.x, ff.cube[:, :, 0])               # -> hy['HI_P'][idev, iz, ipair], hy['HI_area'][..], ..
+import numpy as np
+
+ivpar_keys = ['Jsc', 'Voc', 'Vmpp', 'Jmpp', 'Pmpp', 'FF', 'PCE', 'Rs', 'Rp']
+
+# -----------------------------------------
+# computes solar cell parameters of IV curves
+# input:    x       voltage values [V] (vector of n values, may hold several sweeps, see sweeps())
+#           Y       currents [A] (array of shape (.., n), e.g. ff.cube[:, :, idat] -> (nglob, nz, n))
+#           area    [cm2] device area (None: values per device, i.e. currents [A], power [W], no PCE)
+#           Pin     [W/cm2] incident light power density (dflt 100 mW/cm2)
+#           nfit    # of points on each side of V=Voc, V=0 used for the linear fits of Rs, Rp (dflt 3)
+#           swp     list of slices of the sweeps in x (dflt: sweeps(x), e.g. rdstala_class.xsweeps()[0])
+# output:   res     dict of arrays of shape (.., nsweep), NaN if a value doesn't exist (e.g. no zero crossing):
+#                   Jsc     -I(V=0) (/area)                    [A] or [A/cm2]   (> 0 for generation current)
+#                   Voc     V(I=0)                             [V]
+#                   Vmpp    voltage of max. power point        [V]
+#                   Jmpp    -I (/area) at max. power point     [A] or [A/cm2]
+#                   Pmpp    max. power -V*I (/area)            [W] or [W/cm2]
+#                   FF      fill factor Pmpp / (Voc*Jsc)
+#                   PCE     power conversion efficiency Pmpp/Pin (NaN if area is None)
+#                   Rs      series resistance   1/(dI/dV) at Voc (*area)   [Ohm] or [Ohm cm2]
+#                   Rp      parallel resistance 1/(dI/dV) at V=0 (*area)   [Ohm] or [Ohm cm2]
+#                   sweeps  list of slices of x of the sweeps (last axis of all other values)
+# -----------------------------------------
+def ivpar(x, Y, area=None, Pin=0.1, nfit=3, swp=None):    # -> res
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    assert Y.shape[-1] == len(x), f"ivpar: last axis of Y ({Y.shape}) must match length of x ({len(x)})"
+    a = 1.0  if area is None  else area
+    out = {k: [] for k in ivpar_keys}
+    swp = sweeps(x)  if swp is None  else swp
+    for sl in swp:
+        xs, Ys = x[sl], Y[..., sl] / a
+        if xs[-1] < xs[0]:     # backward sweep -> ascending x (same results)
+            xs, Ys = xs[::-1], Ys[..., ::-1]
+        r = ivpar_sweep(xs, Ys, nfit)
+        for k in ivpar_keys:
+            out[k].append(r[k])
+    res = {k: np.stack(v, axis=-1)  for k, v in out.items()}    # (R from J = I/area -> 1/(dJ/dV) = R*area)
+    res['PCE'] = res['Pmpp'] / Pin  if area is not None  else np.full_like(res['Pmpp'], np.nan)
+    res['sweeps'] = swp
+    return res
+
+# -----------------------------------------
+# splits voltage axis into monotonic sweeps (e.g. forward + backward sweep of stala iv curves)
+# output:   list of slices (neighbouring sweeps share their turning point, repeated values at the turn stay in the 1st sweep)
+# -----------------------------------------
+def sweeps(x):    # -> [slice, ..]
+    sd = np.sign(np.diff(np.asarray(x, dtype=np.float64)))
+    sd = sd[np.maximum.accumulate(np.where(sd != 0, np.arange(len(sd)), 0))]    # steps of 0 get direction of step before
+    i_turn = [i+1 for i in np.flatnonzero(sd[1:] * sd[:-1] < 0)]    # index of turning points
+    i0 = [0] + i_turn
+    i1 = [i+1 for i in i_turn] + [len(x)]
+    return [slice(a, b)  for a, b in zip(i0, i1)]
+
+# -----------------------------------------
+# direction of sweeps: +1 forward (increasing x), -1 backward, 0 constant x
+# -----------------------------------------
+def sweeps_dir(x, swp):    # -> dirs
+    x = np.asarray(x)
+    return np.array([np.sign(x[sl][-1] - x[sl][0])  for sl in swp], dtype=int)
+
+# -----------------------------------------
+# hysteresis indices of IV curves, evaluated for pairs of consecutive sweeps in opposite direction
+# (forward+backward, e.g. 2 pairs for a 4-sweep stability measurement), all curves at once
+# input:    x, Y, area, Pin, nfit, swp   see ivpar()
+# output:   hy      dict of arrays of shape (.., npair):
+#                   HI_P      (Pmpp_bw - Pmpp_fw) / Pmpp_bw     (same as with PCE)
+#                   HI_area   integral |J_bw - J_fw| dV / integral |J_bw| dV   in the 4th quadrant (0 <= V <= max. Voc)
+#                   dVoc      Voc_bw - Voc_fw  [V]
+#                   dFF       FF_bw - FF_fw
+#                   pairs     list of (isweep_fw, isweep_bw) (indices of res['sweeps'])
+#                   res       ivpar() results of all sweeps
+# -----------------------------------------
+def hysteresis(x, Y, area=None, Pin=0.1, nfit=3, swp=None):    # -> hy
+    x   = np.asarray(x, dtype=np.float64)
+    res = ivpar(x, Y, area, Pin, nfit, swp)
+    swp = res['sweeps']
+    d   = sweeps_dir(x, swp)
+    pairs, i = [], 0
+    while i+1 < len(swp):
+        if d[i] * d[i+1] < 0:
+            pairs.append((i, i+1)  if d[i] > 0  else (i+1, i))
+            i += 2
+        else:
+            i += 1
+    J  = np.asarray(Y, dtype=np.float64) / (1.0  if area is None  else area)
+    hy = {k: []  for k in ['HI_P', 'HI_area', 'dVoc', 'dFF']}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for ifw, ibw in pairs:
+            hy['HI_P'].append((res['Pmpp'][..., ibw] - res['Pmpp'][..., ifw]) / res['Pmpp'][..., ibw])
+            hy['dVoc'].append(res['Voc'][..., ibw] - res['Voc'][..., ifw])
+            hy['dFF'].append(res['FF'][..., ibw] - res['FF'][..., ifw])
+            xf, Jf = _ascending(x[swp[ifw]], J[..., swp[ifw]])
+            xb, Jb = _ascending(x[swp[ibw]], J[..., swp[ibw]])
+            Jb = interp_rows(xf, xb, Jb)                       # backward sweep on grid of forward sweep
+            vmax = np.fmax(res['Voc'][..., ifw], res['Voc'][..., ibw])[..., None]
+            w  = np.gradient(xf) * ((xf >= 0) & (xf <= vmax))  # trapezoidal weights, 4th quadrant only
+            hy['HI_area'].append(np.nansum(np.abs(Jb - Jf) * w, axis=-1) / np.nansum(np.abs(Jb) * w, axis=-1))
+    sh = res['Pmpp'].shape[:-1]
+    hy = {k: np.stack(v, axis=-1)  if len(v) > 0  else np.zeros((*sh, 0))  for k, v in hy.items()}
+    hy['pairs'] = pairs
+    hy['res']   = res
+    return hy
+
+# --- sweep with ascending x ---
+def _ascending(x, J):    # -> x, J
+    return (x[::-1], J[..., ::-1])  if x[-1] < x[0]  else (x, J)
+
+# -----------------------------------------
+# linear interpolation of all rows of Y (given on ascending grid xs) to grid xt (NaN outside of xs)
+# (same grid for all rows -> index and weights computed once)
+# -----------------------------------------
+def interp_rows(xt, xs, Y):    # -> Yt (.., len(xt))
+    k = np.clip(np.searchsorted(xs, xt) - 1, 0, len(xs)-2)
+    f = (xt - xs[k]) / (xs[k+1] - xs[k])
+    Yt = Y[..., k] * (1.0 - f) + Y[..., k+1] * f
+    return np.where((xt >= xs[0]) & (xt <= xs[-1]), Yt, np.nan)
+
+# -----------------------------------------
+# solar cell parameters of one sweep with ascending x (J: (.., n) current (density), generation negative)
+# -----------------------------------------
+def ivpar_sweep(x, J, nfit=3):    # -> dict
+    n   = len(x)
+    sh  = J.shape[:-1]
+    if n < 2:    # (e.g. single point at the end of x) no parameters
+        return {k: np.full(sh, np.nan)  for k in ('Jsc', 'Voc', 'Vmpp', 'Jmpp', 'Pmpp', 'FF', 'PCE', 'Rs', 'Rp')}
+    J2  = J.reshape((-1, n))
+    m   = len(J2)
+    rows = np.arange(m)
+    # Jsc: J at V=0 (same interval for all curves)
+    k0 = int(np.clip(np.searchsorted(x, 0.0) - 1, 0, n-2))
+    if x[0] <= 0.0 <= x[-1] and n > 1:
+        f   = (0.0 - x[k0]) / (x[k0+1] - x[k0])
+        Jsc = -(J2[:, k0] + f * (J2[:, k0+1] - J2[:, k0]))
+    else:
+        Jsc = np.full(m, np.nan)
+    # Voc: 1st sign change of J from <0 to >=0 (interpolated)
+    cr   = (J2[:, :-1] < 0) & (J2[:, 1:] >= 0)
+    has  = cr.any(axis=1)
+    kv   = cr.argmax(axis=1)
+    j0, j1 = J2[rows, kv], J2[rows, kv+1]
+    Voc  = np.where(has, x[kv] + (0.0 - j0) * (x[kv+1] - x[kv]) / np.where(j1 != j0, j1 - j0, 1.0), np.nan)
+    # MPP: max. of P = -V*J in the 4th quadrant, refined by parabola through neighbours
+    P    = np.where((x > 0) & (J2 < 0), -x * J2, -np.inf)
+    km   = P.argmax(axis=1)
+    ok   = np.isfinite(P[rows, km])
+    kc   = np.clip(km, 1, n-2)  if n >= 3  else km
+    Vm, Pm = x[km], P[rows, km]
+    if n >= 3:
+        p0, p1, p2 = P[rows, kc-1], P[rows, kc], P[rows, kc+1]
+        x0, x1, x2 = x[kc-1], x[kc], x[kc+1]
+        inner = (km == kc) & np.isfinite(p0) & np.isfinite(p2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            den = (x0-x1)*(x0-x2)*(x1-x2)
+            A   = (x2*(p1-p0) + x1*(p0-p2) + x0*(p2-p1)) / den
+            B   = (x2*x2*(p0-p1) + x1*x1*(p2-p0) + x0*x0*(p1-p2)) / den
+            C   = (x1*x2*(x1-x2)*p0 + x2*x0*(x2-x0)*p1 + x0*x1*(x0-x1)*p2) / den
+            xv  = -B / (2*A)
+            inner &= (A < 0) & (xv >= x0) & (xv <= x2)
+            Vm  = np.where(inner, xv, Vm)
+            Pm  = np.where(inner, C - B*B/(4*A), Pm)
+    Vmpp = np.where(ok, Vm, np.nan)
+    Pmpp = np.where(ok, Pm, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Jmpp = Pmpp / Vmpp
+        FF   = Pmpp / (Voc * Jsc)
+    # Rs, Rp: inverse slopes of linear fits around Voc and V=0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Rs = np.where(has, 1.0 / lin_slope(x, J2, kv, nfit), np.nan)
+        Rp = 1.0 / lin_slope(x, J2, np.full(m, k0), nfit)  if x[0] <= 0.0 <= x[-1]  else np.full(m, np.nan)
+    res = {'Jsc': Jsc, 'Voc': Voc, 'Vmpp': Vmpp, 'Jmpp': Jmpp, 'Pmpp': Pmpp, 'FF': FF, 'PCE': Pmpp, 'Rs': Rs, 'Rp': Rp}
+    return {k: v.reshape(sh)  for k, v in res.items()}
+
+# -----------------------------------------
+# slopes dJ/dx of linear fits of points k-nfit+1 .. k+nfit of each row of J2 (k: index per row, window clipped to data)
+# -----------------------------------------
+def lin_slope(x, J2, k, nfit):    # -> slope per row
+    n  = len(x)
+    w  = min(2*nfit, n)
+    i0 = np.clip(k - nfit + 1, 0, n - w)
+    ii = i0[:, None] + np.arange(w)
+    xx = x[ii]
+    yy = np.take_along_axis(J2, ii, axis=1)
+    xm = xx.mean(axis=1, keepdims=True)
+    ym = yy.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ((xx - xm) * (yy - ym)).sum(axis=1) / ((xx - xm)**2).sum(axis=1)
+
+# -----------------------------------------
+# solar cell parameters of many stala files
+# input:    ffs     list of rdstala_class objects (None entries, e.g. failed loads of load_many(), give NaN)
+#           idat    index of current in the measured quantities (see rdstala_class.scol())
+#           area, Pin, nfit   see ivpar()
+# output:   res     as ivpar() with additional 1st axis (file) if all files have the same x and cube shape,
+#                   otherwise list of ivpar() results (None for None entries)
+# -----------------------------------------
+def ivpar_many(ffs, idat=0, area=None, Pin=0.1, nfit=3):    # -> res
+    ok = [ff for ff in ffs if ff is not None]
+    if len(ok) == 0:
+        return [None for ff in ffs]
+    x0, sh0 = np.asarray(ok[0].x), ok[0].cube.shape
+    if all(np.array_equal(ff.x, x0) and ff.cube.shape == sh0 for ff in ok[1:]):
+        Y = np.full((len(ffs), *sh0[:2], sh0[-1]), np.nan)
+        for i, ff in enumerate(ffs):
+            if ff is not None:
+                Y[i] = ff.cube[:, :, idat]
+        return ivpar(x0, Y, area, Pin, nfit)
+    return [None  if ff is None  else ivpar(ff.x, ff.cube[:, :, idat], area, Pin, nfit)  for ff in ffs]
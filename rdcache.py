@@ -0,0 +1,142 @@
+# rdcache.py
+# written by Veit Wagner
+#  --- binary sidecar cache for text data files in 1.Ac Institute format (see rdspec.py, rdstala_class.py) ---
+# v0.01 18.10.2026 initial version
+# v0.02 18.10.2026 p stored as dict of the fields of stalainfo_rec (rdcache_version 2)
+#
+# A cache entry consists of two files in the cache directory:
+#   <key>.npy    matrix [x; y] as float64 (row 0 = x-values, rows 1.. = y-columns as returned by rdspec())
+#   <key>.json   cmt, npar and (optional) the p-dict of rdstala_class.stalainfo()
+# key = hash of (absolute path, file size, file mtime, rdcache_version), i.e. a changed data file gets a new key
+# and old entries vanish by LRU eviction when the cache exceeds its size limit.
+#
+# usage:
+#  from meas.rdcache import rdspec_cached
+#  x, y, cmt, npar = rdspec_cached('Z:/data/IV/2023/02/20/ACO003_iv.dat')
+#  ff = rdstala_class('Z:/data/IV/2023/02/20/ACO003_iv.dat', cache=True)     # cache=<dir> to use other cache dir
+import numpy as np
+import os
+import json
+import hashlib
+import dataclasses
+from meas.rdspec import rdspec
+
+rdcache_version = 2                                                    # increase if rdspec() or stalainfo() output changes -> invalidates all entries
+rdcache_dir     = os.path.join(os.path.expanduser('~'), '.rdcache')    # default cache directory
+rdcache_maxsize = 2**30                                                # [bytes] max. size of cache directory (LRU eviction above)
+
+# -----------------------------------------
+# returns cache key (base filename w/o extension) of a data file, None if file does not exist
+# -----------------------------------------
+def rdcache_key(filename):    # -> key
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    txt = f"{os.path.abspath(filename)}|{st.st_size}|{st.st_mtime_ns}|{rdcache_version}"
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+# -----------------------------------------
+# loads cache entry of a data file
+# input:    filename    data file (the original text file)
+#           cachedir    cache directory (dflt: rdcache_dir)
+#           mmap        True: y-data is memory mapped (read only) instead of loaded
+# output:   x, y, cmt, npar, p    (see rdspec(), p=None if no stalainfo() was stored)  or  None if not in cache
+# -----------------------------------------
+def rdcache_load(filename, cachedir=None, mmap=False):    # -> [x,y,cmt,npar,p] or None
+    cachedir = rdcache_dir if cachedir is None else cachedir
+    key = rdcache_key(filename)
+    if key is None:
+        return None
+    fjson = os.path.join(cachedir, key + '.json')
+    try:
+        with open(fjson, 'r', encoding='utf-8') as f:
+            hdr = json.load(f, object_hook=_json_dec)
+        m = np.load(os.path.join(cachedir, key + '.npy'), mmap_mode='r' if mmap else None)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(fjson)     # mark as recently used (LRU)
+    except OSError:
+        pass
+    return m[0], m[1:], hdr['cmt'], hdr['npar'], hdr['p']
+
+# -----------------------------------------
+# stores cache entry of a data file (and evicts least recently used entries if cache gets too large)
+# input:    filename            data file (the original text file)
+#           x, y, cmt, npar     as returned by rdspec()
+#           p                   dict of rdstala_class.stalainfo() (optional)
+#           cachedir, maxsize   cache directory and its max. size in bytes (dflt: rdcache_dir, rdcache_maxsize)
+# -----------------------------------------
+def rdcache_save(filename, x, y, cmt, npar, p=None, cachedir=None, maxsize=None):    # -> -
+    cachedir = rdcache_dir     if cachedir is None else cachedir
+    maxsize  = rdcache_maxsize if maxsize  is None else maxsize
+    key = rdcache_key(filename)
+    if key is None:
+        return
+    os.makedirs(cachedir, exist_ok=True)
+    m = np.vstack([np.asarray(x, dtype=np.float64).reshape((1, -1)), np.asarray(y, dtype=np.float64).reshape((-1, len(x)))])
+    hdr = {'filename': os.path.abspath(filename), 'version': rdcache_version, 'cmt': cmt, 'npar': npar, 'p': p}
+    fbase = os.path.join(cachedir, key)
+    ftmp  = f"{fbase}.{os.getpid()}.tmp"    # write to tmp + rename -> other processes never see half written entries
+    with open(ftmp, 'wb') as f:
+        np.save(f, m)
+    os.replace(ftmp, fbase + '.npy')
+    with open(ftmp, 'w', encoding='utf-8') as f:
+        json.dump(hdr, f, default=_json_enc)
+    os.replace(ftmp, fbase + '.json')      # .json is written last: marks entry as complete
+    rdcache_evict(cachedir, maxsize)
+
+# -----------------------------------------
+# removes least recently used entries until cache directory is not larger than maxsize [bytes]
+# -----------------------------------------
+def rdcache_evict(cachedir=None, maxsize=None):    # -> -
+    cachedir = rdcache_dir     if cachedir is None else cachedir
+    maxsize  = rdcache_maxsize if maxsize  is None else maxsize
+    entries = []    # [mtime, size, key]
+    for fn in os.listdir(cachedir):
+        if not fn.endswith('.json'):
+            continue
+        key = fn[:-5]
+        try:
+            st1 = os.stat(os.path.join(cachedir, fn))
+            st2 = os.stat(os.path.join(cachedir, key + '.npy'))
+        except OSError:
+            continue
+        entries.append([st1.st_mtime_ns, st1.st_size + st2.st_size, key])
+    ntot = sum(e[1] for e in entries)
+    for mtime, size, key in sorted(entries):
+        if ntot <= maxsize:
+            break
+        for ext in ['.json', '.npy']:
+            try:
+                os.remove(os.path.join(cachedir, key + ext))
+            except OSError:   # e.g. still memory mapped (Windows) or removed by other process
+                pass
+        ntot -= size
+
+# -----------------------------------------
+# rdspec() with cache: reads data file from cache if unchanged, otherwise parses and stores it
+# -----------------------------------------
+def rdspec_cached(filename, cachedir=None, maxsize=None):    # -> [x,y,cmt,npar]
+    res = rdcache_load(filename, cachedir)
+    if res is not None:
+        return res[:4]
+    x, y, cmt, npar = rdspec(filename)
+    rdcache_save(filename, x, y, cmt, npar, None, cachedir, maxsize)
+    return x, y, cmt, npar
+
+# --- json helpers: numpy arrays are stored with dtype and shape ---
+def _json_enc(a):
+    if isinstance(a, np.ndarray):
+        return {'__ndarray__': a.tolist(), 'dtype': str(a.dtype), 'shape': list(a.shape)}
+    if isinstance(a, np.generic):
+        return a.item()
+    if dataclasses.is_dataclass(a):      # e.g. stalainfo_rec -> dict (converted back by the caller)
+        return {f.name: getattr(a, f.name)  for f in dataclasses.fields(a)}
+    raise TypeError(f"rdcache: can't store object of type {type(a)}")
+
+def _json_dec(d):
+    if '__ndarray__' in d:
+        return np.asarray(d['__ndarray__'], dtype=d['dtype']).reshape(d['shape'])
+    return d
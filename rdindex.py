@@ -0,0 +1,134 @@
+# rdindex.py
+# written by Veit Wagner
+#  --- index (catalog) of stala data files in a SQLite database: sample, operator, date, T, .. of each file, with query function ---
+# v0.01 18.10.2026 initial version
+#
+# The index is updated incrementally: only new files or files with changed size/mtime are read (header only, see
+# rdstala_class.rdinfo()), entries of deleted files are removed.
+#
+# usage:
+#  from meas.rdindex import rdindex_update, rdindex_query
+#  rdindex_update('Z:/data/IV')                                        # crawl (first time slow, afterwards only changes)
+#  fnames = rdindex_query(sample='X', operator='Y', T_min=40)          # -> list of filenames
+#  ffs    = rdindex_query(sample='X', id_meas='iv curve', load=True)   # -> list of rdstala_class objects
+#  fnames = rdindex_query(dev='C100', date_min='2023-02-01')           # dev/slot/mask/s_sample: matches any device of the file
+#  fnames = rdindex_query(where="comment LIKE ?", params=['%anneal%'])
+import os
+import json
+import fnmatch
+import sqlite3
+import datetime
+from meas.rdstala_class import rdstala_class
+from meas.rdmany import load_many
+
+rdindex_db = os.path.join(os.path.expanduser('~'), '.rdindex.sqlite')   # default database file
+
+# columns of table files (besides path, size, mtime_ns, err) and of table slots (besides path, islot)
+_file_cols = ['sample', 'operator', 'date', 'date_iso', 'T', 'RH', 'id_meas', 'comment', 'version', 'col_info',
+              'n', 'ncol', 'njw', 'n1', 'rev1', 'nsample', 'npar']
+_slot_cols = ['dev', 's_sample', 'slot', 'mask']
+
+# -----------------------------------------
+# opens (and creates if needed) index database
+# -----------------------------------------
+def rdindex_open(dbfile=None):    # -> con
+    con = sqlite3.connect(rdindex_db if dbfile is None else dbfile)
+    con.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, err TEXT, "
+                "sample TEXT, operator TEXT, date TEXT, date_iso TEXT, T REAL, RH REAL, id_meas TEXT, comment TEXT, version TEXT, col_info TEXT, "
+                "n INTEGER, ncol INTEGER, njw INTEGER, n1 INTEGER, rev1 INTEGER, nsample INTEGER, npar TEXT)")
+    con.execute("CREATE TABLE IF NOT EXISTS slots (path TEXT, islot INTEGER, dev TEXT, s_sample TEXT, slot TEXT, mask TEXT)")
+    for col in ['sample', 'operator', 'date_iso', 'T', 'id_meas']:
+        con.execute(f"CREATE INDEX IF NOT EXISTS files_{col} ON files ({col})")
+    con.execute("CREATE INDEX IF NOT EXISTS slots_path ON slots (path)")
+    con.execute("CREATE INDEX IF NOT EXISTS slots_dev ON slots (dev)")
+    return con
+
+# -----------------------------------------
+# crawls directory tree and updates index of all matching files (only new or changed files are read)
+# input:    root        top directory of data tree (e.g. 'Z:/data/IV')
+#           pattern     filename pattern of files to index
+#           dbfile      database file (dflt: rdindex_db)
+#           workers     # of processes reading files (see load_many())
+# output:   nnew, ndel  # of files (re)indexed, # of removed entries (files no longer existing)
+# -----------------------------------------
+def rdindex_update(root, pattern='*.dat', dbfile=None, workers=None):    # -> nnew, ndel
+    con = rdindex_open(dbfile)
+    root = os.path.abspath(root)
+    known = {path: (size, mtime)  for path, size, mtime in con.execute("SELECT path, size, mtime_ns FROM files") if path.startswith(os.path.join(root, ''))}
+    todo, found = [], set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        for fn in fnmatch.filter(filenames, pattern):
+            path = os.path.join(dirpath, fn)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.add(path)
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                todo.append((path, st.st_size, st.st_mtime_ns))
+    gone = [path for path in known if path not in found]
+    res, err = load_many([path for path, size, mtime in todo], reader=_rdindex_info, workers=workers)
+    errs = {i: txt  for i, fn, txt in err}
+    with con:
+        for path in gone:
+            con.execute("DELETE FROM files WHERE path=?", (path,))
+            con.execute("DELETE FROM slots WHERE path=?", (path,))
+        for i, ((path, size, mtime), r) in enumerate(zip(todo, res)):
+            con.execute("DELETE FROM slots WHERE path=?", (path,))
+            if r is None:    # not readable: keep entry with error text (is read again if file changes)
+                con.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, err) VALUES (?, ?, ?, ?)", (path, size, mtime, errs.get(i, '')))
+                continue
+            f, slots = r
+            con.execute(f"INSERT OR REPLACE INTO files (path, size, mtime_ns, err, {', '.join(_file_cols)}) VALUES ({', '.join(['?']*(4+len(_file_cols)))})",
+                        (path, size, mtime, None, *[f[c] for c in _file_cols]))
+            con.executemany("INSERT INTO slots (path, islot, dev, s_sample, slot, mask) VALUES (?, ?, ?, ?, ?, ?)",
+                            [(path, islot, *s)  for islot, s in enumerate(slots)])
+    con.close()
+    return len(todo), len(gone)
+
+# -----------------------------------------
+# query index
+# input:    dbfile      database file (dflt: rdindex_db)
+#           where       additional SQL condition (on columns of table files), with ? for values in params
+#           params      values for ? in where
+#           load        True: return rdstala_class objects instead of filenames (loaded by load_many())
+#           workers     # of processes for load=True (see load_many())
+#           **cond      conditions  <col>=value, <col>_min=value, <col>_max=value  for the columns of table files
+#                       (e.g. sample, operator, date_iso (yyyy-mm-dd hh:mm:ss), T, RH, id_meas, n, njw, n1, nsample),
+#                       dev, s_sample, slot, mask  match if any device/slot of the file has this value
+# output:   list of filenames (sorted) or of rdstala_class objects (None if file could not be loaded)
+# -----------------------------------------
+def rdindex_query(dbfile=None, where=None, params=(), load=False, workers=None, **cond):    # -> list
+    sql, par = ["err IS NULL"], []
+    for key, val in cond.items():
+        col, op = (key[:-4], '>=') if key.endswith('_min') else (key[:-4], '<=') if key.endswith('_max') else (key, '=')
+        col = {'date': 'date_iso'}.get(col, col)  if op != '='  else col    # ranges of dates need sortable format
+        if col in _slot_cols:
+            sql.append(f"path IN (SELECT path FROM slots WHERE {col} {op} ?)")
+        else:
+            assert col in _file_cols, f"rdindex_query: unknown column '{col}' (known: {_file_cols + _slot_cols})"
+            sql.append(f"{col} {op} ?")
+        par.append(val)
+    if where:
+        sql.append(f"({where})")
+        par += list(params)
+    con = rdindex_open(dbfile)
+    paths = [r[0] for r in con.execute(f"SELECT path FROM files WHERE {' AND '.join(sql)} ORDER BY path", par)]
+    con.close()
+    if load:
+        return load_many(paths, reader=rdstala_class, workers=workers)[0]
+    return paths
+
+# --- runs in worker process: header-only read of one file -> dict of file columns, list of slot rows ---
+def _rdindex_info(path):    # -> f, slots
+    ff = rdstala_class(path, info_only=True)
+    p, npar = ff.p, ff.npar
+    try:
+        date_iso = datetime.datetime.strptime(p['date'], "%m-%d-%Y %H:%M:%S").isoformat(' ')
+    except ValueError:
+        date_iso = None
+    f = {'sample': p['sample'], 'operator': p['operator'], 'date': p['date'], 'date_iso': date_iso, 'T': p['T'], 'RH': p['RH'],
+         'id_meas': p['id_meas'], 'comment': p['comment'], 'version': p.get('version', ''), 'col_info': p['col_info'],
+         'n': npar[0], 'ncol': npar[1], 'njw': p['njw'], 'n1': p['n1'], 'rev1': p['rev1'], 'nsample': p['nsample'], 'npar': json.dumps(npar)}
+    slots = [(s['dev'], s['sample'], s['slot'], s['mask'])  for s in p['s']]
+    return f, slots
@@ -0,0 +1,72 @@
+# rdmany.py
+# written by Veit Wagner
+#  --- loads many data files in parallel (process pool) with any of the readers rdspec, rduvvis, rdstala_class, .. ---
+# v0.01 18.10.2026 initial version
+#
+# usage:
+#  from meas.rdmany import load_many
+#  from meas.rduvvis import rduvvis
+#  fnames = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.SP')]
+#  res, err = load_many(fnames, reader=rduvvis, workers=8)                 # res[i] = (x,y,p,cmt) of fnames[i]
+#  (x, Y), err = load_many(fnames, reader=rduvvis, workers=8, stack=True)  # Y[i] = y of fnames[i]
+# note: with a process pool the reader must be importable by the worker processes (i.e. defined in a module,
+#       not in a notebook cell) and on Windows the calling script needs the  if __name__ == "__main__":  guard.
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from meas.rdspec import rdspec
+
+# -----------------------------------------
+# loads list of files with reader (in parallel by a process pool)
+# input:    paths       list of filenames
+#           reader      function or class called as reader(filename), e.g. rdspec (dflt), rduvvis, rdstala_class
+#           workers     # of worker processes (dflt: # of cpus), 1 = sequential in this process
+#           stack       False: res is list of reader results
+#                       True:  res is tuple (x, Y) with Y[i] = y-data of paths[i] (NaN if file had an error),
+#                              if the x-grids of all files match (otherwise res is the list as for stack=False)
+# output:   res         see stack (list entries of files with errors are None)
+#           err         list of (i, filename, error text) of files which could not be loaded
+# -----------------------------------------
+def load_many(paths, reader=rdspec, workers=None, stack=False):    # ret: res, err
+    paths   = list(paths)
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(paths) <= 1:
+        out = [_load_one(reader, fn) for fn in paths]
+    else:
+        chunk = max(1, len(paths) // (4*workers))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            out = list(ex.map(_load_one, [reader]*len(paths), paths, chunksize=chunk))   # map keeps order of paths
+    res = [r  for ok, r in out]
+    err = [(i, fn, r)  for i, (fn, (ok, r)) in enumerate(zip(paths, out)) if not ok]
+    for i, fn, r in err:
+        res[i] = None
+    xY = stack_xy(res)  if stack  else None
+    if xY is not None:
+        res = xY
+    return res, err
+
+# -----------------------------------------
+# stacks y-data of reader results with matching x-grids
+# input:    res         list of reader results (tuple x, y, .. or object with .x, .y), None entries are skipped
+# output:   (x, Y)      with Y[i] = y of res[i] (NaN for None entries)  or  None if x-grids differ
+# -----------------------------------------
+def stack_xy(res):    # ret: (x, Y) or None
+    xy = [None if r is None else ((r.x, r.y) if hasattr(r, 'x') else (r[0], r[1]))  for r in res]
+    ok = [i for i, r in enumerate(xy) if r is not None]
+    if len(ok) == 0:
+        return None
+    x0, y0 = np.asarray(xy[ok[0]][0]), np.asarray(xy[ok[0]][1])
+    for i in ok[1:]:
+        if not np.array_equal(x0, xy[i][0]) or np.shape(xy[i][1]) != y0.shape:
+            return None
+    Y = np.full((len(res), *y0.shape), np.nan)
+    for i in ok:
+        Y[i] = xy[i][1]
+    return x0, Y
+
+# --- runs in worker process: errors are returned as text (exceptions can't always be pickled) ---
+def _load_one(reader, filename):    # ret: ok, result or error text
+    try:
+        return True, reader(filename)
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
@@ -3,10 +3,24 @@
 #  --- loads text data files in 1.Ac Institute format (experimental data) ---
 # v0.01 19.09.2022 initial version
 # v0.02 12.07.2023 allow not unicode text files -> open with encoding='latin1'
+# v0.03 18.10.2026 fast parse path: data block is parsed in one bulk call (old line by line parse kept as fallback)
+# v0.04 18.10.2026 rdspec_lazy(): memory mapped file, y-columns are decoded on first access only
+# v0.05 18.10.2026 rdspec_tail_class, rdspec_follow(): read files still being written, only new rows are parsed
+# v0.06 18.10.2026 rdspec_info(): reads header and comment lines only (data block is skipped)
+# v0.07 18.10.2026 binary data block (written by svspec(.., mode='bin')): text header and comments, data as raw float64
+# v0.08 18.10.2026 binary data block: only the 1st ncol values of each row are used (as text files, see rdspec_lines())
+# v0.09 18.10.2026 fast parse path: also only the 1st ncol values of each row (svspec() files have 1+ncol values per row)
 #
 # usage:
 #
 import numpy as np
+import io
+import os
+import time
+import mmap
+import locale
+
+rdspec_bin_tag = b'#binary float64 little-endian'   # line 5 of files with binary data block: tag + ' <# of values per row>'
 
 # -----------------------------------------
 # reads standard data file (typically created by Stala and other Lab equipment)
@@ -14,12 +28,412 @@ import numpy as np
 # output:   x           numpy vector of x-values
 #           y           numpy matrix of y-values
 #           cmt         list of strings with comments (1st is line 4, afterwards all lines below data)
-#           npar        list of integer from line 3 (1st two: n, ncol; following: nxx, njw, nrev1, n1, nglob, nrev2, n2, n0V) 
+#           npar        list of integer from line 3 (1st two: n, ncol; following: nxx, njw, nrev1, n1, nglob, nrev2, n2, n0V)
 # -----------------------------------------
 def rdspec(filename):    # -> [x,y,cmt,npar]
 #if((argn(2)<1) | (length(filename)==0)) then filename = uigetfile("", "c:\"); end    // allow file selection if no name is given
     #[f,err] = mopen(filename, 'r');
     #if(err ~= 0) then error(sprintf("rdspec: cant open file %s for reading.", filename)); end
+    with open(filename, 'rb') as f:
+        data = f.read()
+    res = rdspec_bin(data, filename)
+    if res is None:
+        res = rdspec_fast(data, filename)
+    if res is None:
+        res = rdspec_lines(filename)   # irregular file -> old line by line parse
+    return res
+
+# -----------------------------------------
+# parse of file contents with binary data block (see svspec(.., mode='bin')):
+#   lines 1-4 header (as text file), line 5 rdspec_bin_tag + ' <nval>', n*nval float64 values (little-endian, row by row as in
+#   text file), comment lines (as text file).  nval = # of values per row (svspec() writes 1+ncol values: x and ncol y-values)
+#   As for text files only the 1st ncol values (ncol from line 3) of each row are used, so text and binary files give the same x, y.
+# input:    data        complete file contents (bytes)
+#           filename    filename (only used for error messages)
+# output:   x, y, cmt, npar  (see rdspec())  or  None if file has no binary data block
+# -----------------------------------------
+def rdspec_bin(data, filename=""):    # -> [x,y,cmt,npar] or None
+    res = rdspec_bin_start(data)
+    if res is None:
+        return None
+    ihdr, i0, nval = res
+    xmin, xmax, npar, cmt, enc = rdspec_hdr(data[:ihdr], filename)
+    n, ncol = npar[:2]
+    i_end = i0 + 8*n*nval
+    assert len(data) >= i_end, f"rdspec: binary data block of file {filename} is shorter than n*nval={n}*{nval} values"
+    assert nval >= ncol, f"rdspec: binary data block of file {filename} has only {nval} values per row, but ncol={ncol}"
+    m = np.frombuffer(data, dtype='<f8', count=n*nval, offset=i0).reshape((n, nval)).T[:ncol].astype(np.float64)   # (copy, as data is read only)
+    if xmin != xmax:
+        x = np.linspace(xmin, xmax, n)
+        y = m
+    else:
+        x = m[0]
+        y = m[1:]
+    try:
+        ftr = rdspec_ftr(data[i_end:], enc)
+    except UnicodeDecodeError:
+        ftr = rdspec_ftr(data[i_end:], 'latin1')
+    return x,  y, [ cmt , *ftr ], npar
+
+# returns end of header (line 4), start of binary data block (after line 5) and # of values per row
+#   or None if data has no binary data block
+def rdspec_bin_start(data):    # -> ihdr, i0, nval  or None
+    ihdr = -1
+    for k in range(4):
+        ihdr = data.find(b'\n', ihdr+1)
+        if ihdr < 0:
+            return None
+    if data[ihdr+1:ihdr+1+len(rdspec_bin_tag)] != rdspec_bin_tag:
+        return None
+    i0 = data.find(b'\n', ihdr+1) + 1
+    nval = int(data[ihdr+1+len(rdspec_bin_tag):i0])
+    return ihdr, i0, nval
+
+# -----------------------------------------
+# fast parse of file contents (same output as rdspec_lines(), bit-identical)
+# input:    data        complete file contents (bytes)
+#           filename    filename (only used for error messages)
+# output:   x, y, cmt, npar  (see rdspec())  or  None if file is not regular (-> use rdspec_lines())
+# -----------------------------------------
+def rdspec_fast(data, filename=""):    # -> [x,y,cmt,npar] or None
+    if data.count(b'\r') != data.count(b'\r\n'):   # old Mac line ends -> let universal newline of text mode handle it
+        return None
+    inl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0a)   # positions of all '\n'
+    if len(inl) < 4:
+        return None
+    # line 1-4: header
+    xmin, xmax, npar, cmt, enc = rdspec_hdr(data[:inl[3]], filename)
+    n, ncol = npar[:2]
+    if n <= 0 or ncol <= 0 or len(inl) < 4+n:   # (last data line w/o newline -> rdspec_lines())
+        return None
+    # line 5ff: data block -> x,y  (parsed in one go, 1st ncol values of each row as fromiter(.., count=ncol) in rdspec_lines())
+    i_end = inl[3+n] + 1     # 1st byte after data block
+    try:
+        m = np.loadtxt(io.BytesIO(data[inl[3]+1:i_end]), dtype=np.float64, comments=None, usecols=range(ncol), ndmin=2).T
+    except ValueError:       # line with less than ncol values or non-numeric text
+        return None
+    if m.shape != (ncol, n): # (e.g. empty lines in data block)
+        return None
+    if xmin != xmax:
+        x = np.linspace(xmin, xmax, n)
+        y = m
+    else:
+        x = m[0]
+        y = m[1:]
+    # lines after data block: further comments
+    try:
+        ftr = rdspec_ftr(data[i_end:], enc)
+    except UnicodeDecodeError:
+        return None          # header was unicode but footer is not -> let rdspec_lines() decide coding
+    cmt = [ cmt , *ftr ]
+    return x,  y, cmt, npar
+
+# -----------------------------------------
+# reads only header and comment lines of standard data file, the data block is skipped by counting n lines (not parsed)
+# input:    filename    filename with path to file to be loaded
+#           nchunk      [bytes] read block size used to skip the data block
+# output:   cmt, npar   see rdspec()
+# -----------------------------------------
+def rdspec_info(filename, nchunk=2**20):    # -> [cmt,npar]
+    with open(filename, 'rb') as f:
+        # line 1-4: header
+        data = b''
+        while data.count(b'\n') < 4:
+            a = f.read(4096)
+            if len(a) == 0:     # e.g. old Mac line ends -> universal newline of text mode
+                x, y, cmt, npar = rdspec_lines(filename)
+                return cmt, npar
+            data += a
+        inl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0a)
+        xmin, xmax, npar, cmt, enc = rdspec_hdr(data[:inl[3]], filename)
+        n = npar[0]
+        # line 5ff: skip n lines of data block
+        data += f.read(len(rdspec_bin_tag) + 32)
+        res = rdspec_bin_start(data)
+        if res is not None:      # binary data block -> skip by seek
+            ihdr, i0, nval = res
+            f.seek(i0 + 8*n*nval)
+            data = b''
+        else:
+            data = data[inl[3]+1:]
+        while res is None:
+            k = data.count(b'\n')
+            if k >= n:
+                data = data[np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0a)[n-1]+1:]  if n > 0  else data
+                break
+            n -= k
+            data = f.read(nchunk)
+            assert len(data) > 0, f"rdspec_info: file {filename} has less than n={npar[0]} data lines"
+        # lines after data block: further comments
+        data += f.read()
+    try:
+        ftr = rdspec_ftr(data, enc)
+    except UnicodeDecodeError:
+        ftr = rdspec_ftr(data, 'latin1')
+    return [ cmt , *ftr ], npar
+
+# -----------------------------------------
+# reads standard data file lazy: only header, comments (and x-values) are read, y-columns are decoded on first access
+# input:    filename    filename with path to file to be loaded
+# output:   x           numpy vector of x-values
+#           y           rdspec_lazy_class object, use like numpy matrix of y-values: y[icol], y[i1:i2], y[[i1,i2,..]], np.asarray(y)
+#           cmt, npar   see rdspec()
+# -----------------------------------------
+def rdspec_lazy(filename):    # -> [x,y,cmt,npar]
+    with open(filename, 'rb') as f:
+        st = os.fstat(f.fileno())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            res = rdspec_bin_start(mm[:65536])
+            if res is not None:  # binary data block -> memory mapped numpy matrix
+                ihdr, i0, nval = res
+                xmin, xmax, npar, cmt, enc = rdspec_hdr(mm[:ihdr], filename)
+                n, ncol = npar[:2]
+                assert nval >= ncol, f"rdspec_lazy: binary data block of file {filename} has only {nval} values per row, but ncol={ncol}"
+                m = np.memmap(filename, dtype='<f8', mode='r', offset=i0, shape=(n, nval)).T[:ncol]   # (as text, see rdspec_bin())
+                try:
+                    ftr = rdspec_ftr(mm[i0+8*n*nval:], enc)
+                except UnicodeDecodeError:
+                    ftr = rdspec_ftr(mm[i0+8*n*nval:], 'latin1')
+                x, y = (np.linspace(xmin, xmax, n), m)  if xmin != xmax  else  (np.asarray(m[0]), m[1:])
+                return x,  y, [ cmt , *ftr ], npar
+            inl = np.flatnonzero(np.frombuffer(mm, dtype=np.uint8) == 0x0a)   # positions of all '\n'
+            assert len(inl) >= 4, f"rdspec_lazy: less than 4 header lines in file {filename}"
+            # line 1-4: header
+            xmin, xmax, npar, cmt, enc = rdspec_hdr(mm[:inl[3]], filename)
+            n, ncol = npar[:2]
+            # line 5ff: data block -> only byte offsets of lines are stored
+            ioff = inl[3:4+n] + 1    # start of data lines (+ end of last line)
+            if len(ioff) < n+1:      # last data line w/o newline
+                ioff = np.append(ioff, len(mm))
+            assert len(ioff) == n+1, f"rdspec_lazy: file {filename} has less than n={n} data lines"
+            # lines after data block: further comments
+            try:
+                ftr = rdspec_ftr(mm[ioff[-1]:], enc)
+            except UnicodeDecodeError:
+                ftr = rdspec_ftr(mm[ioff[-1]:], 'latin1')
+            cmt = [ cmt , *ftr ]
+    y = rdspec_lazy_class(filename, ioff, ncol, icol0=0, stat=(st.st_size, st.st_mtime_ns))
+    if xmin != xmax:
+        x = np.linspace(xmin, xmax, n)
+    else:
+        x = y[0]        # x is 1st column
+        y = y.sub(1)
+    return x,  y, cmt, npar
+
+# -----------------------------------------
+# lazy y-data of rdspec_lazy(): columns are decoded on first access from memory mapped file and kept in cache
+# (the file is only opened while decoding, so many objects can exist without using up file handles)
+# -----------------------------------------
+class rdspec_lazy_class:
+    def __init__(self, filename, ioff, ncol, icol0=0, stat=None, cache=None):
+        self.filename = filename
+        self.ioff     = ioff         # byte offsets of data lines in file (n+1 values)
+        self.ncol     = ncol         # # of columns in file
+        self.icol0    = icol0        # file column of y[0]
+        self.stat     = stat         # (size, mtime_ns) of file when indexed
+        self.cache    = {} if cache is None else cache   # decoded columns {file column: vector}
+
+    @property
+    def shape(self):
+        return (self.ncol - self.icol0, len(self.ioff) - 1)
+
+    def __len__(self):
+        return self.shape[0]
+
+    # returns same data with y[0] shifted to column icol (shares index and cache)
+    def sub(self, icol):   # -> rdspec_lazy_class
+        return rdspec_lazy_class(self.filename, self.ioff, self.ncol, self.icol0 + icol, self.stat, self.cache)
+
+    def __getitem__(self, idx):
+        icol, idx2 = (idx[0], idx[1:]) if isinstance(idx, tuple) else (idx, ())
+        icols = np.arange(len(self))[icol]       # int, slice, list or mask -> y-column(s)
+        self.load(np.atleast_1d(icols))
+        if np.ndim(icols) == 0:
+            return self.cache[self.icol0 + int(icols)][idx2]
+        m = np.asarray([self.cache[self.icol0 + i] for i in icols]).reshape((len(icols), self.shape[1]))
+        return m[(slice(None), *idx2)]
+
+    def __array__(self, dtype=None):
+        m = self[:]
+        return m if dtype is None else m.astype(dtype)
+
+    # decodes y-columns icols (if not yet in cache)
+    def load(self, icols):    # -> -
+        todo = [self.icol0 + int(i) for i in icols if self.icol0 + int(i) not in self.cache]
+        if len(todo) == 0:
+            return
+        with open(self.filename, 'rb') as f:
+            st = os.fstat(f.fileno())
+            assert self.stat is None or self.stat == (st.st_size, st.st_mtime_ns), f"rdspec_lazy: file {self.filename} was changed since it was indexed"
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ioff = self.ioff.tolist()
+                for k in todo:
+                    self.cache[k] = np.array([mm[i0:i1].split(None, k+1)[k] for i0, i1 in zip(ioff[:-1], ioff[1:])], dtype=np.float64)
+
+# -----------------------------------------
+# follows a standard data file which is still being written (e.g. by stala): each update() parses only the newly appended lines
+# usage:    tl = rdspec_tail_class(filename)
+#           x_new, y_new = tl.update()    # rows appended since last call
+#           tl.x, tl.y, tl.cmt, tl.npar   # all rows read so far (y: ncol x nrow), tl.complete: all n rows are read
+# -----------------------------------------
+class rdspec_tail_class:
+    def __init__(self, filename):
+        self.filename = filename
+        self.npar     = None     # from header (None until lines 1-4 are written)
+        self.cmt      = None     # [line 4, lines below data block written so far]
+        self.nrow     = 0        # # of data rows read
+        self.data_end = False    # True: no further data rows (n rows read or non-data line found)
+        self.off      = 0        # byte offset of 1st line not yet parsed (after data block: start of comment lines)
+        self.size     = 0        # file size at last update()
+        self.enc      = None
+        self.xlin     = None     # x-values if given by xmin, xmax
+        self.m        = None     # data rows read, preallocated (ncol x n)
+
+    @property
+    def complete(self):
+        return self.npar is not None and self.nrow == self.npar[0]
+
+    @property
+    def x(self):
+        return self._x(0, self.nrow)
+
+    @property
+    def y(self):
+        return self._y(0, self.nrow)
+
+    def _x(self, i0, i1):
+        if self.npar is None:
+            return np.zeros(0)
+        return self.xlin[i0:i1]  if self.xlin is not None  else self.m[0, i0:i1]
+
+    def _y(self, i0, i1):
+        if self.npar is None:
+            return np.zeros((0, 0))
+        return self.m[:, i0:i1]  if self.xlin is not None  else self.m[1:, i0:i1]
+
+    # reads lines appended since last call
+    def update(self):    # -> x_new, y_new
+        nrow0 = self.nrow
+        with open(self.filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.size:     # file was truncated / rewritten -> start again
+                self.__init__(self.filename)
+                nrow0 = 0
+            if size == self.size:
+                return self._x(nrow0, nrow0), self._y(nrow0, nrow0)
+            f.seek(self.off)
+            data = f.read(size - self.off)
+        self.size = self.off + len(data)
+        data = data[:data.rfind(b'\n')+1]    # complete lines only (last line may be written just now)
+        # line 1-4: header
+        if self.npar is None:
+            inl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0a)
+            if len(inl) < 4:
+                self.size = 0                # re-read header at next call
+                return self._x(0, 0), self._y(0, 0)
+            xmin, xmax, self.npar, cmt, self.enc = rdspec_hdr(data[:inl[3]], self.filename)
+            assert not data[inl[3]+1:].startswith(rdspec_bin_tag), f"rdspec_tail_class: file {self.filename} has binary data block (not supported)"
+            self.cmt = [cmt]
+            n, ncol = self.npar[:2]
+            self.xlin = np.linspace(xmin, xmax, n)  if xmin != xmax  else None
+            self.m    = np.zeros((ncol, n))
+            self.off += inl[3] + 1
+            data = data[inl[3]+1:]
+        # line 5ff: data block
+        if not self.data_end:
+            n, ncol = self.npar[:2]
+            inl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0a)
+            k = min(len(inl), n - self.nrow)
+            i_end = inl[k-1] + 1  if k > 0  else 0
+            try:
+                m = np.loadtxt(io.BytesIO(data[:i_end]), dtype=np.float64, comments=None, usecols=range(ncol), ndmin=2)  if k > 0  else np.zeros((0, ncol))
+                assert m.shape[0] == k
+            except (ValueError, AssertionError):   # non-data line (e.g. measurement aborted) -> parse up to it
+                m, i_end = [], 0
+                for l in data.split(b'\n')[:k]:
+                    try:
+                        m.append(np.fromiter(l.split(), float, count=ncol))
+                    except ValueError:
+                        self.data_end = True
+                        break
+                    i_end += len(l) + 1
+                m = np.asarray(m).reshape((-1, ncol))
+            self.m[:, self.nrow:self.nrow+len(m)] = m.T
+            self.nrow += len(m)
+            self.off  += i_end
+            data = data[i_end:]
+            self.data_end = self.data_end or self.nrow == n
+        # lines after data block: further comments (re-read completely, are only a few)
+        if self.data_end:
+            try:
+                ftr = rdspec_ftr(data, self.enc)
+            except UnicodeDecodeError:
+                ftr = rdspec_ftr(data, 'latin1')
+            self.cmt = [self.cmt[0], *ftr]
+            self.size = self.off     # comment lines are read again at next call
+        return self._x(nrow0, self.nrow), self._y(nrow0, self.nrow)
+
+# -----------------------------------------
+# generator yielding newly appended rows of a standard data file still being written
+# input:    filename    filename with path to file to follow
+#           dt          [s] polling interval
+#           timeout     [s] stop if file did not grow for this time (None: never)
+# output:   yields (x_new, y_new, tl) with tl the rdspec_tail_class object (tl.x, tl.y, tl.cmt: all data so far)
+#           stops after all n data rows are read
+# -----------------------------------------
+def rdspec_follow(filename, dt=1.0, timeout=None):    # yields x_new, y_new, tl
+    tl = rdspec_tail_class(filename)
+    t_last = time.time()
+    while True:
+        x_new, y_new = tl.update()
+        if len(x_new) > 0 or tl.complete:
+            t_last = time.time()
+            yield x_new, y_new, tl
+        if tl.data_end:
+            return
+        if timeout is not None and time.time() - t_last > timeout:
+            return
+        time.sleep(dt)
+
+# -----------------------------------------
+# parses header lines 1-4 of standard data file
+# input:    hdr         bytes of line 1-4 (w/o last newline)
+#           filename    filename (only used for error messages)
+# output:   xmin, xmax, npar, cmt (comment of line 4), enc (text coding used)
+# -----------------------------------------
+def rdspec_hdr(hdr, filename=""):    # -> xmin, xmax, npar, cmt, enc
+    enc = locale.getpreferredencoding(False)   # same as default of open(filename, 'r')
+    try:
+        lines = hdr.decode(enc).split('\n')
+    except UnicodeDecodeError:
+        enc = 'latin1'       # try old text coding for e.g. german ü
+        lines = hdr.decode(enc).split('\n')
+    # line 1+2: xmin, xmax
+    xmin = float(lines[0].split()[0])
+    xmax = float(lines[1].split()[0])
+    # line 3: nx, ny [, ..]
+    npar = [int(d) for d in lines[2].split()]
+    assert len(npar) >= 2, f"rdspec: less than 2 parameters, i.e. {len(npar):d}, for n, ncol in file {filename} in line 3: {lines[2]}"
+    # line 4: comment line
+    cmt = lines[3].rstrip()
+    if len(cmt) == 0:
+        cmt = "  "   # ensure cmt is counted as the 1st line
+    return xmin, xmax, npar, cmt, enc
+
+# -----------------------------------------
+# splits bytes after data block into comment lines (as readlines() + rstrip() in text mode)
+# -----------------------------------------
+def rdspec_ftr(ftr, enc):    # -> list of str
+    ftr = ftr.decode(enc).replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if ftr[-1] == '':
+        ftr.pop()            # last line ends with '\n' -> no further line (as readlines())
+    return [l.rstrip()  for l in ftr]
+
+# -----------------------------------------
+# reads standard data file line by line (original version of rdspec(), handles also irregular files)
+# input / output: see rdspec()
+# -----------------------------------------
+def rdspec_lines(filename):    # -> [x,y,cmt,npar]
     try:
         with open(filename, 'r') as f:
             lines = f.readlines()
@@ -52,3 +466,26 @@ def rdspec(filename):    # -> [x,y,cmt,npar]
 #
 # memo meaning npar (see rdstala()):
 #   nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = npar
+
+# --- benchmark: fast parse path vs. line by line parse on a file written by svspec() ---
+# execute with python -m meas.rdspec
+if __name__ == '__main__':
+    import tempfile
+    from meas.savefile import svspec
+    n, ny = 100000, 3
+    x = np.linspace(0, 1e-3, n)
+    y = np.random.default_rng(0).normal(size=(n, ny))
+    with tempfile.TemporaryDirectory() as d:
+        fn = os.path.join(d, 'tmp.dat')
+        svspec(fn, x, y, ['comment1', 'comment2'])
+        with open(fn, 'rb') as f:
+            data = f.read()
+        t = time.perf_counter()
+        rf = rdspec_fast(data, fn)
+        dt_fast = time.perf_counter() - t
+        assert rf is not None, "rdspec_fast() fell back for svspec() file"
+        t = time.perf_counter()
+        rl = rdspec_lines(fn)
+        dt_lines = time.perf_counter() - t
+    assert all(np.array_equal(a, b) for a, b in zip(rf[:2], rl[:2])) and rf[2:] == rl[2:], "different results"
+    print(f"n={n} ncol={rl[3][1]}:  rdspec_lines {dt_lines*1e3:7.1f} ms   rdspec_fast {dt_fast*1e3:7.1f} ms   (speedup {dt_lines/dt_fast:.1f}x)")
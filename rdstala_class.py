@@ -3,66 +3,460 @@
 # --- collection of routines to load/save and handle stala data (experimental data measured by stala-setup) ---
 # v0.01 19.09.2022? initial version
 # v0.02 24.02.2023 several bug fixes to get it working ; renamed file stala_class.py -> rdstala_class.py
+# v0.03 18.10.2026 lazy mode: y-columns are decoded on first access from memory mapped file (see rdspec_lazy())
+# v0.04 18.10.2026 optional binary sidecar cache (see rdcache.py)
+# v0.05 18.10.2026 update(): follow stala file still being measured (see rdspec_tail_class)
+# v0.06 18.10.2026 rdinfo(): header-only mode, only comment lines are read and parsed by stalainfo()
+# v0.07 18.10.2026 stalainfo(): table-driven parser with precompiled regexes, returns new stalainfo_rec (no shared default dict)
+# v0.08 18.10.2026 calc_z(), xramp0(): vectorized, repeated sweeps (rev1) are concatenated; loglist ramps (xramp0_indeces_list_log())
+# v0.09 18.10.2026 cube: y-data as view (nglob, nz, njw, n)
+# v0.10 18.10.2026 xsweeps(), zsweeps(), sweep(): forward/backward sweeps from npar/p ; hysteresis() of all devices (see ivpar.py)
+# v0.11 18.10.2026 stalainfo(): line by line parser again (table-driven parser was not faster), other keys in stalainfo_rec.extra
 
 # usage:
 #
 
 import numpy as np
 import re
-from meas.rdspec import rdspec
+from dataclasses import dataclass, field, fields
+from typing import Optional
+from meas.rdspec import rdspec, rdspec_lazy, rdspec_lazy_class, rdspec_tail_class, rdspec_info
+from meas.rdcache import rdcache_load, rdcache_save
+from meas.ivpar import sweeps, sweeps_dir, hysteresis
+
+# -----------------------------------------
+# parameters extracted from the comment lines of a stala file by rdstala_class.stalainfo()
+# fields can be accessed as attributes (p.sample) or as with the former dict (p['sample'], p.get(), 'z_end' in p, p.keys()),
+# optional fields (None) count as missing for the dict access, other keys set by p['key'] = val are kept in p.extra
+# -----------------------------------------
+@dataclass(slots=True)
+class stalainfo_rec:
+    comment:          str   = ""
+    settle_time:      float = 0.0     # [s]
+    nplc:             float = 0.0     # [20ms] or [16.6667ms]
+    intg_time:        float = 0.0     # [s]
+    period:           float = 0.0     # [s]
+    z_start:          float = 0.0     # [?] Hz or V or ..
+    z_step:           float = 0.0     # [?] Hz or V or ..
+    z_end:            Optional[float] = None    # (exists if xramp with log or impedance)
+    delay0:           float = 0.0     # [s] pause at start
+    delay1:           float = 0.0     # [s] pause at start of each scan
+    njw:              int   = 1
+    n1:               int   = 1
+    rev1:             int   = 0
+    nsample:          int   = 1
+    ramp_catchup:     int   = 1
+    full_settletime:  int   = 0
+    xr_linlog:        int   = 0
+    xr_uselist:       int   = 0
+    xr_list:          np.ndarray = field(default_factory=lambda: np.array([], dtype=np.float64))
+    sample:           str   = ""
+    operator:         str   = ""
+    date:             str   = ""      # e.g. "04-19-2012 15:19:09"
+    time_since_start: float = 0.0
+    id:               str   = ""
+    id_meas:          str   = ""      # e.g. "impedance vs frequency (Cp-Rp)", "transfer curve", ..
+    version:          Optional[str]   = None
+    ver_no:           Optional[float] = None
+    ver_subno:        Optional[int]   = None
+    ver_txt:          Optional[str]   = None
+    T:                float = 0.0     # [C]
+    RH:               float = 0.0     # [%]
+    swb_time:         float = 0.0     # [s]
+    swb_type:         list  = field(default_factory=list)
+    s_idx:            list  = field(default_factory=list)
+    s_iref:           list  = field(default_factory=list)
+    s_slot:           list  = field(default_factory=list)
+    s_mask:           list  = field(default_factory=list)
+    s_dev:            list  = field(default_factory=list)
+    s_sample:         list  = field(default_factory=list)
+    filename:         str   = ""
+    col_info:         str   = ""
+    remote_sensing:   bool  = False
+    # stala version > 2.06:
+    t_start:          Optional[float] = None
+    t_end:            Optional[float] = None
+    t_ref_date:       Optional[str]   = None
+    t_ref:            Optional[list]  = None
+    s_t_start:        Optional[list]  = None
+    meas_pdev:        Optional[int]   = None   # 0=no, 1=before, 2=after, 3=before and after
+    n_TRHX:           Optional[int]   = None
+    s_TRHX1:          Optional[np.ndarray] = None
+    lbl_TRHX1:        Optional[list]  = None
+    s_TRHX2:          Optional[np.ndarray] = None
+    lbl_TRHX2:        Optional[list]  = None
+    extra:            dict  = field(default_factory=dict)    # keys which are no field (set as p['key'] = val)
+
+    @property
+    def s(self):    # list of dicts (idx, iref, slot, mask, dev, sample) per device
+        return [{"idx":idx, "iref":iref, "slot":slot, "mask":mask, "dev":dev, "sample":sample}
+                for idx, iref, slot, mask, dev, sample  in zip(self.s_idx, self.s_iref, self.s_slot, self.s_mask, self.s_dev, self.s_sample)]
+
+    def __getitem__(self, key):
+        v = self.extra[key]  if key in self.extra  else getattr(self, key, None)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def __setitem__(self, key, val):
+        if key in _si_fields:
+            setattr(self, key, val)
+        else:
+            self.extra[key] = val
+
+    def __contains__(self, key):
+        return key in self.extra  or  getattr(self, key, None) is not None
+
+    def get(self, key, dflt=None):
+        v = self.extra[key]  if key in self.extra  else getattr(self, key, None)
+        return dflt  if v is None  else v
+
+    def keys(self):
+        return [f.name for f in fields(self) if f.name != 'extra' and getattr(self, f.name) is not None] + ['s', *self.extra]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+_si_fields = frozenset(f.name for f in fields(stalainfo_rec)) - {'extra'}
+
+# --- stalainfo(): comment lines are parsed line by line (the line prefix is checked, unknown line -> error message) ---
+_si_rx_quoted  = re.compile(r'"([^"]*)"')
+_si_rx_version = re.compile(' - |;|:')
+
+# -----------------------------------------
+# fills p (stalainfo_rec) from comment lines cmt, stops at the last line given (e.g. shortened comments)
+# -----------------------------------------
+def stalainfo_parse(p, cmt):    # -> -
+    n = len(cmt)
+    # line 1: <cmt>
+    if n<1: return
+    p.comment = cmt[0]
+
+    # line 2: ;settle time (ms): 100.000000  ; nplc (20ms):  0.00 ; intg.time (ms): 0.000000 ; period (s): 0.000000
+    if n<2: return
+    a = cmt[1].split(':')
+    assert a[0] == ';settle time (ms)', f"stalainfo: unexpected comment line 2: {cmt[1]}"
+    p.settle_time = float( a[1].split(';')[0] ) * 1e-3    # [s]
+    p.nplc        = float( a[2].split(';')[0] )           # [20ms] or [16.6667ms]
+    p.intg_time   = float( a[3].split(';')[0] ) * 1e-3    # [s]
+    p.period      = float( a[4].split(';')[0] )           # [s]
+
+    # line 3: ;z-start(V) z-step(V) extrapause at start and scan (ms): 0.000000 0.500000 0.000000 0.000000  ; njw n1 rev1 nsample: 8 1 0 1 ; ramp_catchup full_settletime: 1 0 ; xramp> linlog uselist [list]: 0 0
+    if n<3: return
+    a = cmt[2].split(':')
+    assert a[0][:8] == ';z-start', f"stalainfo: unexpected comment line 3: {cmt[2]}"
+    aa = a[0].split()  # aa[1] = "z-step(Hz)" "z-step(V)" or  "z-end(Hz)"  "z-end(V)"
+    zz = a[1].split()  # 1st four are the numbers
+    p.z_start = float( zz[0] )    # [?] Hz or V or ..
+    p.z_step  = float( zz[1] )    # [?] Hz or V or ..
+    if aa[1][:5] == "z-end":      # position to store z_end if linlog=1
+        p.z_end = p.z_step
+    p.delay0 = float( zz[2] )*1e-3 # [s] pause at start
+    p.delay1 = float( zz[3] )*1e-3 # [s] pause at start of each scan
+    p.njw, p.n1, p.rev1, p.nsample = [int(z) for z in a[2].split()[:4]]  if len(a) > 2  else [1, 1, 0, 1]
+    p.ramp_catchup, p.full_settletime = [int(z) for z in a[3].split()[:2]]  if len(a) > 3  else [1, 1]
+    azxr = a[4].split()  if len(a) > 4  else ['0', '0', '0']   # linlog uselist [n_list list] (for xramp)
+    if azxr[0]=='1' and azxr[1]=='0' and aa[1][:5]=="z-end":   # outdated position to store z_end
+        p.z_end = float( azxr[2] )
+    p.xr_linlog  = int( azxr[0] )
+    p.xr_uselist = int( azxr[1] )
+    if p.xr_uselist:
+        p.xr_list = np.asarray([float(az) for az in azxr[2:]], dtype=np.float64)
+
+    # line 4: ;sample: -,"empty"
+    #         ;sample: SPM163,"SPM163 2A1","SPM163 2A1","SPM163 2A1"
+    if n<4: return
+    a = cmt[3].split(':', 1)
+    assert a[0][:7] == ';sample', f"stalainfo: unexpected comment line 4: {cmt[3]}"
+    b = a[1].split(',', 1)  if len(a)>1  else ['']           # separate sample by "," to b[0]
+    p.sample   = b[0].strip()
+    p.s_sample = _si_rx_quoted.findall(b[1])  if len(b)>1  else []   # sample names per slot w/o quotes
+
+    # line 5: ;operator: vw
+    if n<5: return
+    a = cmt[4].split(':')
+    assert a[0][:9] == ';operator' or a[0][:5] == ';user', f"stalainfo: unexpected comment line 5: {cmt[4]}"
+    p.operator = a[1].strip()
+
+    # line 6:      ;date: 04-19-2012 15:19:09 ;  time since start (s) : 0.114707
+    #   v2.12.03:  ;date: 04-26-2019 11:19:13
+    if n<6: return
+    a = cmt[5].split(':', 1)
+    assert a[0][:5] == ';date', f"stalainfo: unexpected comment line 6: {cmt[5]}"
+    aa = a[1].split(';')
+    p.date = aa[0].strip()   # = "04-19-2012 15:19:09"
+    p.time_since_start = float( aa[1].split(':')[1] )  if len(aa) > 1  else 0.0  # = 0.114707
+
+    # line 7: ;iv curve - stala v2.12.05
+    #         ;impedance vs frequency (Cp-Rp); ; Vac (V) #average: 0.500000 1; time mode: MED - stala v2.05pre
+    #         ;transfer curve - stala v1.02
+    if n<7: return
+    a = _si_rx_version.split(cmt[6])
+    p.version = a[-1].strip()
+    aaa = p.version.split('v', 1)[1].strip().split(".", 1)
+    i = 0
+    for c in aaa[1]:
+        if not c.isnumeric(): break
+        i += 1
+    txt_frac    = aaa[1][:i]    # take only initial digits
+    p.ver_no    = float( ".".join([aaa[0], txt_frac]) )
+    is_subno    = len(aaa[1]) > len(txt_frac) and aaa[1][len(txt_frac)] == '.'
+    txt_subno   = "".join([c if c.isnumeric() else ""  for c in aaa[1][len(txt_frac)+1:]])  if is_subno  else "0"
+    p.ver_subno = int( txt_subno )
+    p.ver_txt   = aaa[1][(len(txt_frac) + ((len(txt_subno) + 1) if is_subno else 0)):].strip()
+    p.id        = cmt[6][1:].strip()
+    p.id_meas   = a[1].strip()   # e.g. "impedance vs frequency (Cp-Rp)", "impedance vs voltage (Cp-Rp)", "transfer curve", ..
+
+    # line 8: ;relative humidity   :  0.000000; sample temp (C):  0.000000
+    if n<8: return
+    a = cmt[7].split(':')
+    assert a[0][:18] == ";relative humidity", f"stalainfo: unexpected comment line 8: {cmt[7]}"
+    p.T  = float( a[1].split(';')[0] )   # [C]
+    p.RH = float( a[2] )                 # [%]
+
+    # line 9: ;swbtime (ms) : 10.000000 swbtype: 3706
+    if n<9: return
+    a = cmt[8].split(':')
+    assert a[0][:13] == ";swbtime (ms)", f"stalainfo: unexpected comment line 9: {cmt[8]}"
+    p.swb_time = float( a[1].strip().split()[0] ) * 1e-3  # [s]
+    p.swb_type = [int(s) for s in a[2].split()]
+
+    # line 10: ;nch: 1   name: dev1   (not used)
+    # line 11: ;idx                :	1	2
+    # line 12: ;ref-list (slot/pos):	17001	1702
+    # line 13: ;slot-list          :	imped01	slot01
+    # line 14: ;mask-list          :	mask13	mask2
+    # line 15: ;dev-list           :	C100	K10
+    for i, hdr, key, conv in [(10, ";idx", 's_idx', int), (11, ";ref-list", 's_iref', int), (12, ";slot-list", 's_slot', None),
+                              (13, ";mask-list", 's_mask', None), (14, ";dev-list", 's_dev', None)]:
+        if n<=i: return
+        a = cmt[i].split(':', 1)
+        assert a[0][:len(hdr)] == hdr, f"stalainfo: unexpected comment line {i+1}: {cmt[i]}"
+        setattr(p, key, [conv(s) for s in a[1].split()]  if conv  else a[1].split())
+
+    # line 16: ;c:\stala_data\test_imped_x_04_impedf.dat   (stala version <= 2.06)
+    if n<16: return
+    if p.ver_no <= 2.06:
+        p.filename = cmt[15][1:].strip()
+        # line 17: ;
+        # line 18: ; V/Hz  Cp Rp Vac Iac Vdc Iac  Cp Rp Vac Iac Vdc Iac ..
+        if n<18: return
+        p.col_info = cmt[17][1:].strip()
+        return
+    # line 16, stala version > 2.06: ;start end time (s) :   304.445056   397.312649 ; reference date and 2 time stamps (s) : 26.04.2019 11:12:35   4873.727502 0.000000
+    a = cmt[15].split(':', 2)
+    assert a[0][:19] == ";start end time (s)", f"stalainfo: unexpected comment line 16: {cmt[15]}"
+    aa  = a[1].split(';')
+    aaa = aa[0].split()
+    p.t_start = float( aaa[0] )
+    p.t_end   = float( aaa[1] )
+    assert aa[1].strip() == "reference date and 2 time stamps (s)", f"stalainfo: unexpected comment line 16: {cmt[15]}"
+    bb = a[2].split()
+    p.t_ref_date = bb[0] + " " + bb[1]
+    p.t_ref      = [float(bb[2]), float(bb[3])]
+    # line 17: ;dev-start time (s) :	1.936	16.323	30.631
+    if n<17: return
+    a = cmt[16].split(':', 1)
+    assert a[0][:19] == ";dev-start time (s)", f"stalainfo: unexpected comment line 17: {cmt[16]}"
+    p.s_t_start = [float(s) for s in a[1].split()]
+    # line 18: ; meas_pdev   ba/#  : 3 2
+    if n<18: return
+    a = cmt[17].split(':', 1)
+    assert a[0][:18] == "; meas_pdev   ba/#", f"stalainfo: unexpected comment line 18: {cmt[17]}"
+    aa = a[1].split()
+    p.meas_pdev = int( aa[0] )     # 0=no, 1=before, 2=after, 3=before and after, list only if was measured
+    p.n_TRHX    = int( aa[1] )
+    # line 19ff: n_TRHX lines before and/or after meas.:  ;dev-temperature (C):	0.000	0.000 ..   ;dev-  rel. humidity:	0.000	0.000 ..
+    ipos = 18             # current cmt line
+    for bit, key in [(1, 'TRHX1'), (2, 'TRHX2')]:
+        if p.meas_pdev & bit:
+            assert n > ipos + p.n_TRHX
+            s_TRHX = np.zeros((p.n_TRHX, len(p.s_t_start)))
+            lbl_TRHX = p.n_TRHX * [""]
+            for i in range(p.n_TRHX):
+                a = cmt[ipos+i].split(':', 1)
+                lbl_TRHX[i] = a[0][5:].rstrip()
+                s_TRHX[i]   = [float(s) for s in a[1].split()]
+            setattr(p, 's_'+key, s_TRHX)
+            setattr(p, 'lbl_'+key, lbl_TRHX)
+            ipos += p.n_TRHX
+    # line 23: ;\\dali\data\data\IV\2018\06\13\180202\180202_iv_dark.dat
+    p.filename = cmt[ipos][1:].rstrip()
+    ipos += 1
+    # line 24 (optional): ; remote sensing
+    p.remote_sensing = (cmt[ipos].rstrip() == "; remote sensing")  if n > ipos  else False
+    ipos += 1
+    # line 25: ;
+    # line 26: ; V/Hz  Cp Rp Vac Iac Vdc Iac  Cp Rp Vac Iac Vdc Iac ..
+    ipos += 1
+    if n <= ipos: return
+    p.col_info = cmt[ipos][1:].strip()
+
+
+# -----------------------------------------
+# start position of a loglist xramp (values xsign * l[i] * 10**n10exp, i.e. the list l is repeated every decade)
+# input:    l           list of values of one decade (ascending, e.g. [1, 2, 5])
+#           z_start     1st value of ramp
+#           z_end       last value of ramp
+# output:   flag_incr   True if |z_end| >= |z_start| (ramp runs to higher decades)
+#           xsign       sign of values (-1 or 1)
+#           i0          index of z_start in l
+#           n10exp_0    decade of z_start:  z_start = xsign * l[i0] * 10**n10exp_0
+#           ntot        # of ramp values from z_start to z_end (incl. both)
+# -----------------------------------------
+def xramp0_indeces_list_log(l, z_start, z_end):    # -> flag_incr, xsign, i0, n10exp_0, ntot
+    l = np.asarray(l, dtype=np.float64)
+    assert len(l) > 0 and np.all(l > 0) and z_start != 0.0, f"xramp0_indeces_list_log: illegal loglist ramp (list={l}, z_start={z_start})"
+    def pos(z):    # -> index in l, decade  of value z (nearest list value on log scale)
+        e  = np.round(np.log10(abs(z)) - np.log10(l))
+        i  = int(np.argmin(np.abs(np.log10(abs(z)) - np.log10(l) - e)))
+        return i, int(e[i])
+    xsign = -1.0  if z_start < 0  else 1.0
+    i0, n10exp_0 = pos(z_start)
+    i1, n10exp_1 = pos(z_end)  if z_end != 0.0  else (i0, n10exp_0)
+    k0, k1 = n10exp_0*len(l) + i0, n10exp_1*len(l) + i1    # position counted in list values
+    return k1 >= k0, xsign, i0, n10exp_0, abs(k1 - k0) + 1
+
+# -----------------------------------------
+# cube of lazy y-data (see rdstala_class.cube): indexing like a numpy array (nglob, nz, njw, n), only selected columns are decoded
+# -----------------------------------------
+class rdstala_cube_class:
+    def __init__(self, y, shape):
+        self.y    = y                                                        # rdspec_lazy_class
+        self.icol = np.arange(shape[0]*shape[1]*shape[2]).reshape(shape)     # y-column of (iglob, iz, idat)
+
+    @property
+    def shape(self):
+        return (*self.icol.shape, self.y.shape[1])
+
+    def __getitem__(self, idx):
+        idx  = idx  if isinstance(idx, tuple)  else (idx,)
+        if any(i is Ellipsis for i in idx):     # expand ... to full index
+            k   = idx.index(Ellipsis)
+            idx = (*idx[:k], *[slice(None)]*(4 - len(idx) + 1), *idx[k+1:])
+        icol = self.icol[idx[:3]]
+        m    = self.y[np.ravel(icol).tolist()].reshape((*np.shape(icol), self.y.shape[1]))
+        return m[(Ellipsis, *idx[3:])]
+
+    def __array__(self, dtype=None):
+        m = self[:]
+        return m if dtype is None else m.astype(dtype)
 
 class rdstala_class:
-    def __init__(self, filename=None): #"/buffer/tmp.dat"):
+    def __init__(self, filename=None, lazy=False, cache=False, info_only=False): #"/buffer/tmp.dat"):
         self.filename = None
+        self.lazy     = lazy     # True: self.y is a rdspec_lazy_class object, y-columns are decoded on 1st access (e.g. ff.y[ff.scol(idev, iz, ival)])
+        self.cache    = cache    # False: no cache, True: use binary sidecar cache in dflt dir (rdcache.rdcache_dir), str: cache dir to use
         self.x        = None
         self.y        = None
         self.z        = None
         self.cmt      = None
         self.npar     = None
         self.p        = None
+        self.tail     = None     # rdspec_tail_class object used by update()
         if filename is not None:
-            self.rdstala(filename)
+            if info_only:
+                self.rdinfo(filename)    # only self.cmt, self.npar, self.p
+            else:
+                self.rdstala(filename)
 
     # -----------------------------------------
     # reads stala standard data file (typically created by Stala and other Lab equipment)
     # -----------------------------------------
     # readfile (based on scilab code: readfile.sci v0.12 status 14.06.2018)
-    def rdstala(self, filename=None):
+    def rdstala(self, filename=None, lazy=None):
         if filename is not None:
             self.filename = filename
+        if lazy is not None:
+            self.lazy = lazy
         assert self.filename is not None, "No filename was given to read from"
-        x, y, cmt, npar  = rdspec(self.filename)    # read complete file
+        cachedir = self.cache  if isinstance(self.cache, str)  else None    # None -> dflt cache dir
+        ent = rdcache_load(self.filename, cachedir, mmap=self.lazy)  if self.cache  else None
+        if ent is not None:
+            x, y, cmt, npar  = ent[:4]                      # from cache (lazy: y is memory mapped)
+        elif self.lazy:
+            x, y, cmt, npar  = rdspec_lazy(self.filename)   # read header+comments only, y-columns on demand
+        else:
+            x, y, cmt, npar  = rdspec(self.filename)    # read complete file
+        x_raw, y_raw = x, y
         self.cmt, self.npar = cmt, npar  # assign alread for self.stalainfo() call below
-        # for stala: npar = [n, ncol, nxx, njw, nrev1, n1, nglob, nrev2, n2, n0V]
-        npar_dflt = [npar[0], npar[1], 0, 1, 1, 1, 1, 1, npar[0], 0 ]    # default stala npar-values (it's forbidden, that nrev2 is given but n2 not !)
-        npar      = [*npar, *npar_dflt[len(npar):] ]    # use val. from default if npar is to short
+        npar = self.npar_stala()
         nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = npar
         # reshape x if nxx>0 :
         if nn_nxx > 0:
             x = np.vstack([x.reshape(1,(len(x))), y[0:nn_nxx,:]])   # x = cat(2,x,y(:, 1:nn.nxx));
-            y = y[nn_nxx:,:]                                        # y = y(:, (1+nn.nxx):$);
+            y = y.sub(nn_nxx)  if isinstance(y, rdspec_lazy_class) else  y[nn_nxx:,:]      # y = y(:, (1+nn.nxx):$);
         # analyze cmt data :
         if True: # p-return <=> (argn(1)>=4) then 
-            p = self.stalainfo()
+            p = stalainfo_rec(**ent[4])  if ent is not None and ent[4] is not None  else self.stalainfo()
+            if self.cache and (ent is None or ent[4] is None) and not isinstance(y_raw, rdspec_lazy_class):
+                rdcache_save(self.filename, x_raw, y_raw, self.cmt, self.npar, p, cachedir)   # (lazy w/o cache entry: nothing to store)
             assert (p['rev1']+1 == nn_nrev1) and (p['n1'] == nn_n1), "xxx"   # consistency check
-            # compute z
-            #a = self.xramp0_init(p)
-            #z = self.xramp0(a)
-            z = self.xramp0( self.xramp0_init(p) )
-            if p['rev1'] > 0  :   # was: if(p.rev1>1) then
-                z0   = z
-                zrev = z0[-2::-1]    # skipping 1st value on repeats
-                zfwd = z0[1:]        #     "
-                for i in range(1, p['rev1']+1): # =1:p.rev1 do
-                    if i % 2 == 0:
-                        z += zfwd
-                    else:
-                        z += zrev
-            # end of compute z
+            z = self.calc_z(p)
         #self.cmt, self.npar = cmt, npar  (already done, s.a.)
         self.x, self.y, self.z, self.p = x, y, z, p
         return x, y
 
+    # -----------------------------------------
+    # computes z-values (e.g. gate voltages of output curves) incl. repeated sweeps
+    # input:    p        parameters read from stala file (see stalainfo())
+    # output:   z        vector of z values
+    # -----------------------------------------
+    #           (1 + (rev1+1)*(n1-1) values: z0, then rev1 repeats alternately reversed/forward, skipping 1st value on repeats)
+    # -----------------------------------------
+    def calc_z(self, p):    # -> z
+        z  = self.xramp0( self.xramp0_init(p) )
+        n1 = len(z)
+        if p['rev1'] > 0 and n1 > 1:   # was: if(p.rev1>1) then
+            j, r = np.divmod(np.arange((p['rev1']+1) * (n1-1)), n1-1)   # sweep #, index in sweep (w/o its 1st value)
+            iz   = np.where(j % 2 == 0, r+1, n1-2-r)                     # even sweeps z0[1:], odd sweeps z0[-2::-1]
+            z    = np.concatenate([z[:1], z[iz]])
+        return z
+
+    # -----------------------------------------
+    # reads newly appended rows of a stala file which is still being measured (only the new rows are parsed)
+    # usage:    ff = rdstala_class() ; ff.update(fname) ; .. ; ff.update()   (e.g. in a live plot loop)
+    # output:   nnew     # of new rows; self.x, self.y contain all rows read so far,
+    #                    self.p, self.z are set as soon as all rows and the comment lines below are written (else None)
+    # -----------------------------------------
+    def update(self, filename=None):    # -> nnew
+        if filename is not None:
+            self.filename = filename
+        assert self.filename is not None, "No filename was given to read from"
+        if self.tail is None or self.tail.filename != self.filename:
+            self.tail = rdspec_tail_class(self.filename)
+            self.x, self.y, self.z, self.cmt, self.npar, self.p = None, None, None, None, None, None
+        cmt0 = self.tail.cmt
+        x_new, y_new = self.tail.update()
+        if self.tail.npar is None:   # header not yet written
+            return 0
+        x, y = self.tail.x, self.tail.y
+        nn_nxx = self.tail.npar[2]  if len(self.tail.npar) > 2  else 0
+        if nn_nxx > 0:
+            x = np.vstack([x.reshape(1,(len(x))), y[0:nn_nxx,:]])
+            y = y[nn_nxx:,:]
+        self.x, self.y = x, y
+        self.cmt, self.npar = self.tail.cmt, self.tail.npar
+        if self.tail.data_end and (self.p is None or self.cmt != cmt0):   # comment lines (may) have changed
+            try:
+                p = self.stalainfo()
+                self.z, self.p = self.calc_z(p), p
+            except (AssertionError, IndexError, ValueError, KeyError):   # comment lines not yet complete
+                self.z, self.p = None, None
+        return len(x_new)
+
+    # -----------------------------------------
+    # reads only header and comment lines of stala file (data block is skipped), e.g. for overviews of many files
+    # output:   p        parameters extracted by stalainfo() (also self.p; self.cmt, self.npar are set, self.x, self.y not)
+    # -----------------------------------------
+    def rdinfo(self, filename=None):    # -> p
+        if filename is not None:
+            self.filename = filename
+        assert self.filename is not None, "No filename was given to read from"
+        self.cmt, self.npar = rdspec_info(self.filename)
+        self.p = self.stalainfo()
+        return self.p
+
     # -----------------------------------------
     # calculates proper y-col index for multi-sample stala data files
     # input:     npar     parameters returned by rdstala()
@@ -72,283 +466,97 @@ class rdstala_class:
     # output:    icol     y-column index -> y[icol,:] of y-data returned by rdstala()
     # -----------------------------------------
     def scol(self, iglob=0, iz=0, idat=0):    # ->  icol
-        nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = self.npar
+        nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = self.npar_stala()
         icol = idat + nn_njw * (iz + (1+nn_nrev1*(nn_n1-1)) * iglob );
         return icol
+
+    # -----------------------------------------
+    # y-data as 4-dim. array cube[iglob, iz, idat, ix] (same order as scol(), i.e. ff.cube[iglob, iz, idat] = ff.y[ff.scol(iglob, iz, idat)])
+    # shape:     (nglob, 1+nrev1*(n1-1), njw, n)  from npar
+    # output:    view of self.y (no copy, writes go to self.y), all numpy indexing works, e.g.
+    #              ff.cube[:, -1, 0]                   last sweep of quantity 0 for all devices  -> (nglob, n)
+    #              ff.cube[[0, 2], :, 1][..., ff.x > 0.5]   devices 0 and 2, all sweeps, quantity 1, selected x
+    #              ff.cube[..., 0, i0].mean(axis=0)    e.g. mean over devices of value at x[i0] per sweep
+    #            lazy mode: rdstala_cube_class object, which decodes only the selected columns
+    # -----------------------------------------
+    @property
+    def cube(self):    # -> y as (nglob, nz, njw, n)
+        nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = self.npar_stala()
+        shape = (nn_nglob, 1+nn_nrev1*(nn_n1-1), nn_njw)
+        assert shape[0]*shape[1]*shape[2] == len(self.y), f"cube: npar (nglob, nz, njw) = {shape} doesn't match {len(self.y)} y-columns"
+        if isinstance(self.y, rdspec_lazy_class):
+            return rdstala_cube_class(self.y, shape)
+        return self.y.reshape((*shape, self.y.shape[-1]))     # splitting axis 0 -> always a view
+
+    # -----------------------------------------
+    # sweeps of the x-axis (e.g. forward + backward sweep of iv curves)
+    # output:    swp      list of slices of x (neighbouring sweeps share their turning point)
+    #            dirs     direction of each sweep: +1 forward (increasing x), -1 backward, 0 constant x
+    # -----------------------------------------
+    #            (from npar: n = 1 + nrev2*(n2-1) values, i.e. nrev2 sweeps of n2 values; if npar doesn't describe x this way,
+    #             the monotonic parts of x are used)
+    # -----------------------------------------
+    def xsweeps(self):    # -> swp, dirs
+        nn_n, nn_ncol, nn_nxx, nn_njw, nn_nrev1, nn_n1, nn_nglob, nn_nrev2, nn_n2, nn_n0V = self.npar_stala()
+        x = self.x[0]  if np.ndim(self.x) > 1  else self.x
+        if nn_nrev2 > 1 and nn_n2 > 1 and len(x) == 1 + nn_nrev2*(nn_n2-1):
+            swp = [slice(k*(nn_n2-1), (k+1)*(nn_n2-1)+1)  for k in range(nn_nrev2)]
+        else:
+            swp = sweeps(x)
+        return swp, sweeps_dir(x, swp)
+
+    # -----------------------------------------
+    # sweeps of the z-axis (repeated sweeps of z, rev1 > 0, see calc_z()) -> slices of axis iz of cube / z
+    # output:    swp, dirs   as xsweeps()   (rev1+1 sweeps of n1 values, sharing their turning points)
+    # -----------------------------------------
+    def zsweeps(self):    # -> swp, dirs
+        n1, nsw = self.p['n1'], self.p['rev1']+1
+        swp = [slice(k*(n1-1), (k+1)*(n1-1)+1)  for k in range(nsw)]  if n1 > 1  else [slice(0, 1)]
+        return swp, sweeps_dir(self.z, swp)
+
+    # -----------------------------------------
+    # x and y-data of one x-sweep (views, no copy)
+    # input:     k        sweep index (see xsweeps()), or 'fw' / 'bw' for the first forward / backward sweep
+    #            idat     index of measured quantity (dflt: all -> (nglob, nz, njw, n_k))
+    # output:    x_k      x-values of sweep k
+    #            y_k      ff.cube[:, :, idat, sweep k]
+    # -----------------------------------------
+    def sweep(self, k=0, idat=slice(None)):    # -> x_k, y_k
+        swp, dirs = self.xsweeps()
+        if isinstance(k, str):
+            d = {'fw': 1, 'bw': -1}[k]
+            assert np.any(dirs == d), f"sweep: no {k} sweep in x (sweep directions: {dirs})"
+            k = int(np.argmax(dirs == d))
+        x = self.x[..., swp[k]]
+        return x, self.cube[:, :, idat, swp[k]]
+
+    # -----------------------------------------
+    # hysteresis indices of all devices and z-values at once (see ivpar.hysteresis())
+    # input:     idat     index of current in the measured quantities
+    #            area     [cm2] device area, Pin [W/cm2] light power density (see ivpar())
+    # output:    hy       dict of arrays (nglob, nz, npair): 'HI_P', 'HI_area', 'dVoc', 'dFF';  hy['pairs'], hy['res']
+    # -----------------------------------------
+    def hysteresis(self, idat=0, area=None, Pin=0.1):    # -> hy
+        x = self.x[0]  if np.ndim(self.x) > 1  else self.x
+        return hysteresis(x, self.cube[:, :, idat], area, Pin, swp=self.xsweeps()[0])
+
+    # -----------------------------------------
+    # npar completed by default values:  [n, ncol, nxx, njw, nrev1, n1, nglob, nrev2, n2, n0V]
+    # -----------------------------------------
+    def npar_stala(self):    # -> npar
+        npar = self.npar
+        npar_dflt = [npar[0], npar[1], 0, 1, 1, 1, 1, 1, npar[0], 0 ]    # default stala npar-values (it's forbidden, that nrev2 is given but n2 not !)
+        return [*npar, *npar_dflt[len(npar):] ][:10]    # use val. from default if npar is to short
     
     
     
     # -----------------------------------------
     # extracts measurement, sample, etc. parameters from comment lines of standard data file (typically created by Stala and other Lab equipment)
+    # output:   p        stalainfo_rec (new object on each call), fields can also be accessed as p['sample'] etc.
     # -----------------------------------------
-    def stalainfo(self, p={"comment":"", "settle_time":0.0, "nplc":0.0, "intg_time":0.0, "period":0.0,"z_start":0.0, "z_step":0.0, "delay0":0.0, "delay1":0.0, "njw":1, "n1":1, "rev1":0, "nsample":1, "ramp_catchup":1, "full_settletime":0, "xr_linlog":0, "xr_uselist":0, "xr_list":np.array([],dtype=np.float_), "sample":"", "operator":"", "date":"", "time_since_start":0.0, "id":"", "T":0.0, "RH":0.0, "swb_time":0.0, "swb_type":0, "s_idx":[], "s_iref":[], "s_slot":[], "s_mask":[], "s_dev":[], "s_sample":[], "s":[], "filename":"", "col_info":"", "id_meas":"", "remote_sensing":False}):   # -> p
-        rname = "stalainfo";
-        cmt, npar = self.cmt, self.npar
-        # optional field in p: "z_end", 0.0, (exists if xramp with log) 
-        # optional field in p: "z_end", 0.0, (exists if impedance) 
-        n = len(cmt) #size(cmt, '*');
-        #
-        while True :   # <- break-statement allows to jump to end
-            # line 1: <cmt>
-            if n<1: break
-            p['comment'] = cmt[0]
-
-            # line 2: ;settle time (ms): 100.000000  ; nplc (20ms):  0.00 ; intg.time (ms): 0.000000 ; period (s): 0.000000
-            if n<2 : break
-            a = cmt[1].split(':')
-            assert a[0] == ';settle time (ms)'
-            p['settle_time'] = float( a[1].split(';')[0] ) * 1e-3    # [s]
-            p['nplc']        = float( a[2].split(';')[0] )           # [20ms] or [16.6667ms]
-            p['intg_time']   = float( a[3].split(';')[0] ) * 1e-3    # [s]
-            p['period']      = float( a[4].split(';')[0] )           # [s]
-
-            # line 3: ;z-start(V) z-step(V) extrapause at start and scan (ms): 0.000000 0.500000 0.000000 0.000000  ; njw n1 rev1 nsample: 8 1 0 1 ; ramp_catchup full_settletime: 1 0 ; xramp> linlog uselist [list]: 0 0
-            if  n<3: break
-            a = cmt[2].split(':')
-            assert a[0][:8] == ';z-start'
-            aa = a[0].split()  # aa[1] = "z-step(Hz)" "z-step(V)" or  "z-end(Hz)"  "z-end(V)"
-            zz = a[1].split()  # 1st four are the numbers
-            p['z_start'] = float( zz[0] )    # [?] Hz or V or ..
-            p['z_step']  = float( zz[1] )    # [?] Hz or V or ..
-            if aa[1][:5] == "z-end":          # position to store z_end if linlog=1
-                p['z_end']  = float( zz[1] )    # [?] Hz or V or ..
-            p['delay0'] = float( zz[2] )*1e-3 # [s] pause at start
-            p['delay1'] = float( zz[3] )*1e-3 # [s] pause at start of each scan
-            #
-            nn = [int(z) for z in a[2].split()[:4]] if len(a) > 2  else [1, 1, 0, 1]   # njw n1 rev1 nsample
-            p['njw']     = nn[0]
-            p['n1']      = nn[1]
-            p['rev1']    = nn[2]
-            p['nsample'] = nn[3]
-            #
-            f1 = [int(z) for z in a[3].split()[:2]] if len(a) > 3  else [1, 1]   # ramp_catchup full_settletime
-            p['ramp_catchup']    = f1[0]
-            p['full_settletime'] = f1[0]
-            #
-            azxr = a[4].split() if len(a) > 4  else ['0', '0', '0']   # linlog uselist [n_list list] (for xramp)
-            if azxr[0]=='1' and azxr[1]=='0' and aa[1][:5]=="z-end":  # outdated position to store z_end
-                p['z_end'] = float( azxr[2] )  # outdated position to store z_end  ,was aax = msscanf(a(5), "%d %d %f");
-            p['xr_linlog']  = int( azxr[0] );
-            p['xr_uselist'] = int( azxr[1] );
-            p['xr_list']    = np.asarray([float(az) for az in azxr[2:]], dtype=np.float_)  if p['xr_uselist']    else  np.array([], dtype=np.float_)
-
-            # line 4: ;sample: -,"empty"
-            #         ;sample: VJ190401,"","","","","","",""
-            #         ;sample: SPM163,"SPM163 2A1","SPM163 2A1","SPM163 2A1"
-            if n<4: break
-            a = cmt[3].split(':', 1)                        # https://docs.python.org/3/library/re.html
-            b = a[1].split(',', 1) if len(a)>1 else ['']           # separate sample by "," to b[0]
-            A = re.findall(r'"[^"]*"', b[1]) if len(b)>1 else []   # get slot-samples by searching for quoted text by regex ".." to A
-            #print("cmt[3]:", cmt[3])
-            #print("a:", a)
-            #print("b:", b)
-            #print("A:", A)
-            assert a[0][:7] == ';sample'
-            p['sample'] = b[0].strip()
-            p['s_sample'] = [s[1:-1] for s in A]   # list of sample names per slot w/ stripped quotes
-            #print("p['sample']:", p['sample'])
-            #print("p['s_sample']:", p['s_sample'])
-
-            # line 5: ;operator: vw
-            if n<5: break
-            a = cmt[4].split(':')
-            assert a[0][:9] == ';operator' or a[0][:5] == ';user'
-            p['operator'] = a[1].strip()
-
-            # line 6:      ;date: 04-19-2012 15:19:09 ;  time since start (s) : 0.114707
-            #   v2.12.03:  ;date: 04-26-2019 11:19:13
-            if n<6: break
-            a = cmt[5].split(':', 1)
-            assert a[0][:5] == ';date'
-            aa = a[1].split(';')
-            #print("cmt[5]:", cmt[5])
-            #print("a:", a)
-            #print("aa:", aa)
-            p['date'] = aa[0].strip()   # = "04-19-2012 15:19:09"
-            p['time_since_start'] = float( aa[1].split(':')[1] )  if len(aa) > 1 else 0.0  # = 0.114707
-
-            # line 7: ;iv curve - stala v2.12.05
-            #         ;impedance vs frequency (Cp-Rp); ; Vac (V) #average: 0.500000 1; time mode: MED - stala v2.05pre
-            #         ;transfer curve - stala v1.02
-            #         ;transfer curve (on/off) - stala v1.02
-            if n<7: break
-            ipos = 6
-            a = re.split(' - |;|:', cmt[ipos]) # .split('strsplit(cmt(7), strindex(cmt(7),[" - ", ";", ":"])); //xx
-            p['version'] = a[-1].strip()    # part(a($), 3:length(a($))); //xx
-            aa = p['version'].split('v', 1)[1].strip() # "%lf.%d %s"
-            aaa  = aa.split(".", 1)
-            #print('cmt[ipos]:', cmt[ipos])
-            #print('a:', a)
-            #print('aa:', aa)
-            #print('aaa:', aaa)
-            if len(aaa):
-                i=0
-                for c in aaa[1]:
-                    if not c.isnumeric(): break
-                    i += 1
-                txt_frac = aaa[1][:i]
-            else:
-                txt_frac = ""
-            #txt_frac       = "".join([c if c.isnumeric() else ""  for c in aaa[1] ])  if len(aaa) else ""  # take only initial digits
-            p['ver_no']    = float( ".".join([aaa[0], txt_frac]) )
-            is_subno       = ( len(aaa)>0 and len(aaa[1])>len(txt_frac) and aaa[1][len(txt_frac)]=='.' )
-            txt_subno      = "".join([c if c.isnumeric() else ""  for c in aaa[1][len(txt_frac)+1:] ])  if is_subno else "0"
-            p['ver_subno'] = int( txt_subno )
-            p['ver_txt']   = aaa[1][(len(txt_frac) + ( (len(txt_subno) + 1) if is_subno else 0)):].strip()  if len(aaa) else ""      # [nn, p.ver_no, p.ver_subno, p.ver_txt] = msscanf(p.version, "stala v%lf.%d %s");
-            p['id']        = cmt[ipos][1:].strip()  # part(cmt(7), 2:length(cmt(7)));
-            p['id_meas']   = a[1].strip()        # e.g. "impedance vs frequency (Cp-Rp)", "impedance vs voltage (Cp-Rp)", "transfer curve", .. 
-            #if( part(p.id_meas, 1:min(length(p.id_meas), length("impedance vs"))) == "impedance vs") then ; end  // <- to be finished, VW 11.08.2017
-            #print("txt_frac:", txt_frac)
-            #print("is_subno:", is_subno)
-            #print("txt_subno:", txt_subno)
-            #print("p['ver_no']:", p['ver_no'])
-            #print("p['ver_subno']:", p['ver_subno'])
-            #print("p['ver_txt']:", p['ver_txt'])
-            #print("p['id']:", p['id'])
-            #print("p['id_meas']:", p['id_meas'])
-
-            # line 8: ;relative humidity   :  0.000000; sample temp (C):  0.000000
-            if n<8: break
-            a = cmt[7].split(':')
-            assert a[0][:18] == ";relative humidity"
-            p['T']  = float( a[1].split(';')[0] )   # [C]
-            p['RH'] = float( a[2] )                 # [%]
-
-            # line 9: ;swbtime (ms) : 10.000000 swbtype: 3706
-            if n<9: break
-            a = cmt[8].split(':')
-            assert a[0][:13] == ";swbtime (ms)"
-            p['swb_time'] = float( a[1].strip().split()[0] ) * 1e-3  # [s]
-            p['swb_type'] = [int(s) for s in a[2].strip().split()]   # [-]    msscanf(a(3),"%d %d %d %d %d %d %d %d %d");
-
-            # line 10: ;nch: 1   name: dev1
-            if n<10: break
-
-            # line 11: ;idx                :	1	2 
-            if n<11: break
-            a = cmt[10].split(':', 1)
-            assert a[0][:4] == ";idx"
-            idx = [int(s) for s in a[1].split()]
-            p['s_idx'] = idx
-
-            # line 12: ;ref-list (slot/pos):	17001	1702
-            if n<12: break
-            a = cmt[11].split(':', 1)
-            assert a[0][:9] == ";ref-list"
-            ref = [int(s) for s in a[1].split()]
-            p['s_iref'] = ref
-
-            # line 13: ;slot-list          :	imped01	slot01
-            if n<13: break
-            a = cmt[12].split(':', 1)
-            assert a[0][:10] == ";slot-list"
-            slo = a[1].split()
-            p['s_slot'] = slo
-
-            # line 14: ;mask-list          :	mask13	mask2
-            if n<14: break
-            a = cmt[13].split(':', 1)
-            assert a[0][:10] == ";mask-list"
-            msk = a[1].split()
-            p['s_mask'] = msk
-
-            # line 15: ;dev-list           :	C100	K10
-            if n<15: break
-            a = cmt[14].split(':', 1)
-            assert a[0][:9] == ";dev-list"
-            dev = a[1].split()
-            p['s_dev'] = dev
-
-            # line 16: ;c:\stala_data\test_imped_x_04_impedf.dat
-            if n<16: break
-            if p['ver_no'] <= 2.06:
-                p['filename'] = cmt[15][1:].strip() # part(cmt(16), 2:length(cmt(16)));
-                # line 17: ;
-                if n<17: break
-                # line 18: ; V/Hz  Cp Rp Vac Iac Vdc Iac  Cp Rp Vac Iac Vdc Iac ..
-                if n<18: break
-                p['col_info'] = cmt[17][1:].strip() # stripblanks( part(cmt(18), 2:length(cmt(18))), %T);
-            else:
-                # line 16, stala version >2.06 -> v2.12 : ;start end time (s) :     1.936476   101.554196 ; reference date and 2 time stamps (s) : 13.06.2018 09:27:32   183.035202 0.000000 
-                #                               v2.12.03: ;start end time (s) :   304.445056   397.312649 ; reference date and 2 time stamps (s) : 26.04.2019 11:12:35   4873.727502 0.000000
-                a = cmt[15].split(':', 2)
-                assert a[0][:19] == ";start end time (s)"
-                aa  = a[1].split(';')
-                aaa = aa[0].strip().split()
-                #print("cmt[15]:", cmt[15])
-                #print("a:", a)
-                #print("aa:", aa)
-                #print("aaa:", aaa)
-                p['t_start'] = float( aaa[0] )
-                p['t_end']   = float( aaa[1] )
-                assert aa[1].strip() == "reference date and 2 time stamps (s)"
-                bb  = a[2].strip().split() 
-                #print("bb:", bb)
-                p['t_ref_date']  = bb[0] + " " + bb[1]
-                p['t_ref']       = [float(bb[2]), float(bb[3])]
-                # line 17, stala version 2.12 : ;dev-start time (s) :	1.936	16.323	30.631	44.857	59.220	72.794	86.689
-                if n<17: break
-                a = cmt[16].split(':', 1)
-                assert a[0][:19] == ";dev-start time (s)"
-                p['s_t_start'] = [float(s) for s in a[1].split()]
-                # line 18, stala version 2.12 : ; meas_pdev   ba/#  : 3 2
-                if n<18: break
-                a = cmt[17].split(':', 1)
-                assert a[0][:18] == "; meas_pdev   ba/#"
-                aa = a[1].strip().split()
-                p['meas_pdev'] = int( aa[0] )     # 0=no, 1=before, 2=after, 3=before and after, list only if was measured
-                p['n_TRHX']    = int( aa[1] )     #
-                # line 19, stala version 2.12 : ;dev-temperature (C):	0.000	0.000	0.000	0.000	0.000	0.000	0.000
-                nx_meas_pdev = 0      # # of extra cmt lines for measurements per device data
-                ipos = 18             # current cmt line
-                if (p['meas_pdev'] & 1): # before meas.
-                    p['s_TRHX1']   = np.zeros((p['n_TRHX'], len(p['s_t_start'])))
-                    p['lbl_TRHX1'] =  p['n_TRHX'] * [""]
-                    assert n > ipos+p['n_TRHX']
-                    for i in range(p['n_TRHX']):
-                        # line 19, stala version 2.12 : ;dev-temperature (C):	0.000	0.000	0.000	0.000	0.000	0.000	0.000
-                        # line 20, stala version 2.12 : ;dev-  rel. humidity:	0.000	0.000	0.000	0.000	0.000	0.000	0.000
-                        a = cmt[ipos+i].split(':', 1)
-                        p['lbl_TRHX1'][i] = a[0][5:].rstrip()
-                        p['s_TRHX1'][i]   = [float(s) for s in a[1].strip().split()] 
-                    nx_meas_pdev += p['n_TRHX']
-                    ipos         += p['n_TRHX']
-                if (p['meas_pdev'] & 2): # after meas.
-                    p['s_TRHX2']   = np.zeros((p['n_TRHX'], len(p['s_t_start'])))
-                    p['lbl_TRHX2'] = p['n_TRHX'] * [""]
-                    assert n > ipos+p['n_TRHX']
-                    for i in range(p['n_TRHX']):
-                        # line 21, stala version 2.12 : ;dev-end temp.   (C):	0.000	0.000	0.000	0.000	0.000	0.000	0.000
-                        # line 22, stala version 2.12 : ;dev-end   rel. hum.:	0.000	0.000	0.000	0.000	0.000	0.000	0.000
-                        a = cmt[ipos+i].split(':', 1)
-                        p['lbl_TRHX2'][i] = a[0][5:].rstrip()
-                        p['s_TRHX2'][i]   = [float(s) for s in a[1].strip().split()] 
-                    nx_meas_pdev += p['n_TRHX']
-                    ipos         += p['n_TRHX']
-
-                # line 23, stala version 2.12 : ;\\dali\data\data\IV\2018\06\13\180202\180202_iv_dark.dat
-                a = cmt[ipos]  # cmt(19+nx_meas_pdev);
-                p['filename'] = a[1:].rstrip()
-                ipos += 1
-
-                # line 24 (optional),  stala version 2.12 : ; remote sensing
-                p['remote_sensing'] = (cmt[ipos].rstrip() == "; remote sensing") if n > ipos  else False
-                ipos += 1
-
-                # line 25: ;
-                if n <= ipos: break
-                ipos += 1
-
-                # line 26: ; V/Hz  Cp Rp Vac Iac Vdc Iac  Cp Rp Vac Iac Vdc Iac ..
-                if n <= ipos: break
-                a = cmt[ipos]  # (21+nx_meas_pdev+p.remote_sensing);
-                p['col_info'] = a[1:].strip()
-                # new: t_start, t_end, t_ref_date, t_ref, meas_pdev, n_TRHX, p.s_TRHX1, p.lbl_TRHX1, p.s_TRHX2, p.lbl_TRHX2, p.remote_sensing
-            #
-            p['s'] = []
-            for idx, iref, slot, mask, dev, sample  in zip(p['s_idx'], p['s_iref'], p['s_slot'], p['s_mask'], p['s_dev'], p['s_sample']):
-                p['s'].append( {"idx":idx, "iref":iref, "slot":slot, "mask":mask, "dev":dev, "sample":sample} )
-            break  # final (needed!) break of  while True:
+    def stalainfo(self):   # -> p
+        p = stalainfo_rec()
+        stalainfo_parse(p, self.cmt)
         return p
 
     # -----------------------------------------
@@ -368,10 +576,8 @@ class rdstala_class:
         elif flag==1: x = xr0["start"] * np.exp( np.arange(xr0["n"]) * xr0["step"] )  # log
         elif flag==2: x = np.asarray(xr0["l"])                                        # list
         elif flag==3:                                                                 # loglist
-            x = []
-            for i in range(xr0["n"]):
-                x.append( xr0["l"][i % xr0["nl"]] * np.exp( int(i/xr0["nl"]) * xr0["step"]  ) )   # <- calc to be checked again ??
-            x = np.asarray(x)
+            i = np.arange(xr0["n"])
+            x = np.asarray(xr0["l"], dtype=np.float64)[i % xr0["nl"]] * np.exp( (i // xr0["nl"]) * xr0["step"] )
         else: assert False, f"xramp0: illegal flag parameter {flag} (allowed 0=lin, 1=log, 2=list, 3=loglist)"
         return x
 
@@ -390,7 +596,7 @@ class rdstala_class:
 
                 xr0['flag'] = 3       # loglist
                 z_end = p['z_step']   # (ATTN: z_end is stored as z_step)
-                flag_incr, xsign, i_0, n10exp_0, ntot = xramp0_indeces_list_log(p['xr_list'], p['z_start'], z_end)
+                flag_incr, xsign, i0, n10exp_0, ntot = xramp0_indeces_list_log(p['xr_list'], p['z_start'], z_end)
                 n = len(p['xr_list'])
                 xr0['nl'] = n
                 if flag_incr:
@@ -398,8 +604,8 @@ class rdstala_class:
                      ii = i0 + np.arange(n)
                 else:
                      xr0['step'] = np.log(0.1)
-                     ii = i0 + n - np.arange(n)
-                xr0['list'] = xsign * p['xr_list'][ii % n] * 10.0**(n10exp_0 + np.floor(ii / n) )
+                     ii = i0 - np.arange(n)
+                xr0['l'] = xsign * p['xr_list'][ii % n] * 10.0**(n10exp_0 + np.floor(ii / n) )   # 1st decade, starting at z_start
 
             else:
 
@@ -415,6 +621,7 @@ class rdstala_class:
                 xr0['start'] = p['z_start']
                 if (p['n1'] <= 1) or (p['z_start'] == 0.0) or (z_end / p['z_start'] <= 0):
                     xr0['n'] = min(p['n1'], 1)
+                    xr0['step'] = 0.0
                 else:
                     xr0['step'] = np.log(z_end / p['z_start']) / (p['n1'] - 1)
 
@@ -434,8 +641,9 @@ if __name__ == '__main__':
     # memo:
     #  ff.x        x-values
     #  ff.y        all y-values, select specific y by  y = ff.y[ ff.scol(idev, iz, ival) ]
+    #              (with rdstala_class(fname, lazy=True) only the selected y-columns are read from file)
     #  ff.z        z-values  (can be ignored for simple measurements)
-    #  ff.p[]      dictionary of extracted parameters from file comments
+    #  ff.p        extracted parameters from file comments (stalainfo_rec, ff.p.sample or as dict ff.p['sample'])
     #  ff.cmt      comment lines of file
     #  ff.filename file used
     #  ff.npar     integers of 3rd line of file
@@ -450,6 +658,75 @@ if __name__ == '__main__':
     # further data are:
     # dict_keys(['comment', 'settle_time', 'nplc', 'intg_time', 'period', 'z_start', 'z_step', 'delay0', 'delay1', 'njw', 'n1', 'rev1', 'nsample', 'ramp_catchup', 'full_settletime', 'xr_linlog', 'xr_uselist', 'xr_list', 'sample', 'operator', 'date', 'time_since_start', 'id', 'T', 'RH', 'swb_time', 'swb_type', 's_idx', 's_iref', 's_slot', 's_mask', 's_dev', 's_sample', 's', 'filename', 'col_info', 'id_meas', 'remote_sensing', 'version', 'ver_no', 'ver_subno', 'ver_txt', 't_start', 't_end', 't_ref_date', 't_ref', 's_t_start', 'meas_pdev', 'n_TRHX', 's_TRHX1', 'lbl_TRHX1', 's_TRHX2', 'lbl_TRHX2'])
     
+    # parity of calc_z(), xramp0() with the former loop code (v0.07), repeats rev1 concatenated (former z += zrev added elementwise)
+    def xramp0_loop(xr0):    # -> x
+        flag = xr0["flag"]
+        if   flag==0: x = xr0["start"] + np.arange(xr0["n"]) * xr0["step"]
+        elif flag==1: x = xr0["start"] * np.exp( np.arange(xr0["n"]) * xr0["step"] )
+        elif flag==2: x = np.asarray(xr0["l"])
+        elif flag==3:
+            x = []
+            for i in range(xr0["n"]):
+                x.append( xr0["l"][i % xr0["nl"]] * np.exp( int(i/xr0["nl"]) * xr0["step"]  ) )
+            x = np.asarray(x)
+        return x
+    def calc_z_loop(ff, p):    # -> z
+        z = xramp0_loop( ff.xramp0_init(p) )
+        if p['rev1'] > 0  :
+            z0   = z
+            zrev = z0[-2::-1]    # skipping 1st value on repeats
+            zfwd = z0[1:]        #     "
+            for i in range(1, p['rev1']+1):
+                z = np.concatenate([z, zfwd  if i % 2 == 0  else zrev])
+        return z
+    ff, nchk = rdstala_class(), 0
+    for linlog, uselist, z_start, z_step, z_end, l in [(0, 0, -1.0, 0.25, None, []), (0, 0, 2.0, -0.1, None, []), (1, 0, 1e-3, 0.0, 10.0, []), (1, 0, -5.0, 0.0, -0.01, []),
+                                                       (0, 1, 0.0, 0.0, None, None), (1, 1, 1e-2, 100.0, None, [1, 2, 5]), (1, 1, 500.0, 0.1, None, [1, 2, 5]), (1, 1, -3e-6, -3e-2, None, [1, 3])]:
+        for n1 in [1, 2, 5, 11]:
+            for rev1 in [0, 1, 2, 3]:
+                p = stalainfo_rec(z_start=z_start, z_step=z_step, z_end=z_end, n1=n1, rev1=rev1, xr_linlog=linlog, xr_uselist=uselist,
+                                  xr_list=np.asarray(np.linspace(-1, 2, n1) if l is None else l, dtype=np.float64))
+                xr0 = ff.xramp0_init(p)
+                x   = ff.xramp0(xr0)
+                assert np.array_equal(xramp0_loop(xr0), x), f"xramp0() differs for {xr0}"
+                z0, z1 = calc_z_loop(ff, p), ff.calc_z(p)
+                assert len(z1) == 1 + (rev1+1)*(len(x)-1) and np.array_equal(z0, z1), f"calc_z() differs for flags {linlog} {uselist}, n1={n1}, rev1={rev1}: {z0} != {z1}"
+                nchk += 1
+    print(f" calc_z(), xramp0(): identical to former loop code ({nchk} parameter sets, flags 0..3, n1 <= 11, rev1 <= 3)")
+
+    # micro-benchmark of stalainfo() on an in-memory comment block of 8 devices, stala v2.12
+    # (per file, matters when indexing/loading many files, see rdindex.py, rdmany.py)
+    import timeit, subprocess, os
+    nd = 8
+    cmt = ["test", ";settle time (ms): 100.000000  ; nplc (20ms):  1.00 ; intg.time (ms): 0.000000 ; period (s): 0.000000",
+           ";z-start(V) z-step(V) extrapause at start and scan (ms): 0.000000 0.500000 0.000000 0.000000  ; njw n1 rev1 nsample: 2 1 0 8 ; ramp_catchup full_settletime: 1 0 ; xramp> linlog uselist [list]: 0 0",
+           ';sample: SPM163,' + ','.join(['"SPM163 2A1"']*nd), ";operator: vw", ";date: 04-26-2019 11:19:13", ";iv curve - stala v2.12.05",
+           ";relative humidity   :  40.000000; sample temp (C):  25.000000", ";swbtime (ms) : 10.000000 swbtype: 3706", ";nch: 1   name: dev1",
+           ";idx                :\t" + "\t".join(str(i+1) for i in range(nd)), ";ref-list (slot/pos):\t" + "\t".join(str(17001+i) for i in range(nd)),
+           ";slot-list          :\t" + "\t".join(f"slot{i:02d}" for i in range(nd)), ";mask-list          :\t" + "\t".join(f"mask{i}" for i in range(nd)),
+           ";dev-list           :\t" + "\t".join(f"C{i}" for i in range(nd)),
+           ";start end time (s) :   304.445056   397.312649 ; reference date and 2 time stamps (s) : 26.04.2019 11:12:35   4873.727502 0.000000",
+           ";dev-start time (s) :\t" + "\t".join(f"{1.9+14*i:.3f}" for i in range(nd)), "; meas_pdev   ba/#  : 3 2",
+           *[lbl + "\t" + "\t".join(["25.000"]*nd) for lbl in (";dev-temperature (C):", ";dev-  rel. humidity:", ";dev-end temp.   (C):", ";dev-end   rel. hum.:")],
+           ";\\\\dali\\data\\x_iv.dat", "; remote sensing", ";", "; V  I1 I2"]
+    def us_per_call(f, N=2000):    # -> us
+        return min(timeit.repeat(f, number=N, repeat=10))/N*1e6
+    print(f" stalainfo(): {us_per_call(lambda: stalainfo_parse(stalainfo_rec(), cmt)):.1f} us per call (line by line, stalainfo_rec)")
+    # former dict-based stalainfo() of v0.06 (commit aca86e1), read from the git history if available
+    try:
+        src = subprocess.run(['git', 'show', 'aca86e1:rdstala_class.py'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout
+        ns  = {'__name__': 'rdstala_class_v006'}
+        exec(src.replace('np.float_', 'np.float64'), ns)    # (np.float_ removed in numpy 2)
+        o = ns['rdstala_class']()
+        o.cmt, o.npar = cmt, [2, 1+2*nd]
+        p0, p1 = o.stalainfo(), stalainfo_rec()
+        stalainfo_parse(p1, cmt)
+        assert all(np.array_equal(p0[k], p1[k]) for k in ('sample', 's_dev', 'T', 'RH', 'ver_no', 'filename', 's_t_start', 's_TRHX2', 'col_info')), "stalainfo() differs from v0.06"
+        print(f" stalainfo() v0.06: {us_per_call(lambda: o.stalainfo()):.1f} us per call (line by line, dict)")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f" former stalainfo() (aca86e1) not available: {e}")
+    # measured (numpy 1.26, Python 3.11): stalainfo_rec 23 us, dict v0.06 26 us, table-driven parser of 91a6a7d 27 us per call (-> reverted to line by line)
+
     # in short
     fname = 'Z:/data/IV/2023/02/20/ACO003_iv.dat'
     ff = rdstala_class(fname)
@@ -473,4 +750,3 @@ if __name__ == '__main__':
     print(ff.p['T'])#         temperature during measurement
     print(ff.p['RH'])#        humidity during measurement
     print(ff.p['id_meas'])#        humidity during measurement
-    
@@ -4,8 +4,13 @@
 # usage:
 #  from meas.savefile import savefile
 # v0.01 01.11.2022 initial version (based on scilab  meas/savefile.sci)
+# v0.02 18.10.2026 mode='fast' (dflt): text formatted for whole blocks of rows at once (same output as np.savetxt),
+#                  mode='bin': data block as raw float64 (text header and comments kept, read by rdspec())
+# v0.03 18.10.2026 svspec_append_class: write file incrementally (blocks of rows), n in line 3 is updated after each block
 
 import numpy as np
+import locale
+from meas.rdspec import rdspec_bin_tag
 
 # -----------------------------------------
 # saves standard data file (typically created by Stala and other Lab equipment)
@@ -15,14 +20,38 @@ import numpy as np
 #           cmt         list of strings with comments (1st is line 4, afterwards all lines below data) (optional)
 #           fmtstrx     printf-format string for x values (dflt = '%f') (optional)
 #           fmtstry     printf-format string for y values (dflt = '%e') (optional)
+#           mode        'fast' = text, formatted blockwise (dflt), 'text' = text by np.savetxt (row by row, same output),
+#                       'bin'  = binary data block (float64, fmtstrx/fmtstry are not used) (optional)
 # -----------------------------------------
-def svspec(filename, x, y, cmt=[''], fmtstrx='%f', fmtstry='%e'):  # ret:  -
+def svspec(filename, x, y, cmt=[''], fmtstrx='%f', fmtstry='%e', mode='fast'):  # ret:  -
     #if((argn(2)<1) | (length(filename)==0)) then filename = uigetfile("", "c:\"); end    // allow file selection if no name is given
     #if(argn(2)<4) then cmt = ''; end   // dflt = empty cmt
     #if(argn(2)<5) then fmtstrx = '%f'; end   // dflt = '%f'
     #if(argn(2)<6) then fmtstry = '%e'; end   // dflt = '%e'
     if type(cmt) == str:   # convert simple string to 1-element list
         cmt = [cmt]
+    MM = svspec_mm(x, y)
+    n, ny = MM.shape[0], MM.shape[1]-1
+    # line 1+2: xmin, xmax
+    #xmin = min(x); xmax=max(x); xx = xmin + ([0:n-1].')*(xmax-xmin)/(n-1); bool = (max(abs(xx-x))) < 1e-10*max(abs([xmin,xmax]));
+    #bool = %F;  // always store x-column explicitly
+    #if(~bool) then xmin = 0.0; xmax = 0.0; end
+    xmin, xmax = 0.0, 0.0   # always store x-column explicitly
+    header = f"{xmin}\n{xmax}\n{n} {ny}\n{cmt[0]}"
+    footer = '\n'.join(cmt[1:])
+    fmt    = [fmtstrx] + [fmtstry]*ny
+    if mode == 'bin':
+        svspec_bin(filename, MM, header, footer)
+    elif mode == 'fast':
+        svspec_txt(filename, MM, fmt, header, footer)
+    else:
+        assert mode == 'text', f"svspec: unknown mode '{mode}' (allowed 'fast', 'text', 'bin')"
+        np.savetxt(filename, MM, fmt, delimiter='\t', header=header, footer=footer, comments='')
+
+# -----------------------------------------
+# combines x-vector and y-data (vector or matrix, columns or rows) to matrix MM with rows [x, y1, y2, ..]
+# -----------------------------------------
+def svspec_mm(x, y):  # ret:  MM
     xx = np.asarray(x)
     yy = np.asarray(y)
     assert len(xx.shape) == 1, f"x-data must be a vector, found shape={xx.shape}"
@@ -36,25 +65,130 @@ def svspec(filename, x, y, cmt=[''], fmtstrx='%f', fmtstry='%e'):  # ret:  -
     xx = xx.reshape((n,1))
     if len(yy.shape) == 1:
         yy = yy.reshape((n,1))
-    #
-    ny = yy.shape[-1]
-    # line 1+2: xmin, xmax
-    #xmin = min(x); xmax=max(x); xx = xmin + ([0:n-1].')*(xmax-xmin)/(n-1); bool = (max(abs(xx-x))) < 1e-10*max(abs([xmin,xmax]));
-    #bool = %F;  // always store x-column explicitly
-    #if(~bool) then xmin = 0.0; xmax = 0.0; end
-    xmin, xmax = 0.0, 0.0   # always store x-column explicitly
-    header = f"{xmin}\n{xmax}\n{n} {ny}\n{cmt[0]}"
-    footer = '\n'.join(cmt[1:])
-    fmt    = [fmtstrx] + [fmtstry]*ny
-    MM     = np.concatenate((xx,yy), axis=-1)
-    np.savetxt(filename, MM, fmt, delimiter='\t', header=header, footer=footer, comments='')
+    return np.concatenate((xx,yy), axis=-1)
+
+# -----------------------------------------
+# writes text file like np.savetxt(filename, MM, fmt, delimiter='\t', header=header, footer=footer, comments=''),
+# but formats nblk rows with one %-operation
+# -----------------------------------------
+def svspec_txt(filename, MM, fmt, header, footer, nblk=4096):  # ret:  -
+    rowfmt = '\t'.join(fmt) + '\n'
+    with open(filename, 'wt') as f:
+        f.write(header + '\n')
+        for i0 in range(0, len(MM), nblk):
+            blk = MM[i0:i0+nblk]
+            f.write((rowfmt * len(blk)) % tuple(blk.ravel().tolist()))
+        if len(footer) > 0:
+            f.write(footer + '\n')
+
+# -----------------------------------------
+# writes file with binary data block: header lines 1-4 and comment lines as text file, data as raw float64 (see rdspec_bin())
+# -----------------------------------------
+def svspec_bin(filename, MM, header, footer):  # ret:  -
+    enc = locale.getpreferredencoding(False)   # same coding as text files written by np.savetxt
+    with open(filename, 'wb') as f:
+        f.write((header + '\n').encode(enc))
+        f.write(rdspec_bin_tag + f" {MM.shape[1]}\n".encode(enc))
+        f.write(np.ascontiguousarray(MM, dtype='<f8').tobytes())
+        if len(footer) > 0:
+            f.write((footer + '\n').encode(enc))
+
+# -----------------------------------------
+# writes standard data file incrementally: header at first add(), each add() appends a block of rows and updates n in line 3,
+# comment lines (cmt[1:]) are written at close()  -> bounded memory, after a crash the file holds all blocks added so far
+# input:    filename, cmt, fmtstrx, fmtstry    see svspec()
+#           mode        'fast' = text (dflt), 'bin' = binary data block (see svspec())
+# usage:
+#  with svspec_append_class(fname, cmt, '%e') as sv:
+#      for itt in range(nrep):
+#          t, ch1, ch2 = ..                              # e.g. one acquisition
+#          sv.add(t, np.asarray([ch1, ch2]))             # -> rows of all acquisitions are stacked in data block
+#      sv.close(['; result: ..'])                        # optional: further comment lines known only at end
+# -----------------------------------------
+class svspec_append_class:
+    nwidth = 24    # [chars] line 3 is padded to this width, so that it can be overwritten in place
+
+    def __init__(self, filename, cmt=[''], fmtstrx='%f', fmtstry='%e', mode='fast'):
+        assert mode in ['fast', 'bin'], f"svspec_append_class: unknown mode '{mode}' (allowed 'fast', 'bin')"
+        self.filename = filename
+        self.cmt      = [cmt]  if type(cmt) == str  else list(cmt)
+        self.fmtstrx  = fmtstrx
+        self.fmtstry  = fmtstry
+        self.mode     = mode
+        self.enc      = locale.getpreferredencoding(False)
+        self.n        = 0        # # of rows written
+        self.ny       = None     # # of y-columns (set by 1st add())
+        self.off3     = None     # file position of line 3
+        self.rowfmt   = None
+        self.f        = open(filename, 'wb'  if mode == 'bin'  else 'w+t')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # appends rows (x, y as for svspec()), returns # of rows written so far
+    def add(self, x, y):    # -> n
+        MM = svspec_mm(x, y)
+        if self.ny is None:
+            self.write_header(MM.shape[1]-1)
+        assert MM.shape[1]-1 == self.ny, f"svspec_append_class: file {self.filename} has {self.ny} y-columns, got {MM.shape[1]-1}"
+        if self.mode == 'bin':
+            self.f.write(np.ascontiguousarray(MM, dtype='<f8').tobytes())
+        else:
+            self.f.write((self.rowfmt * len(MM)) % tuple(MM.ravel().tolist()))
+        self.n += len(MM)
+        self.write_npar()
+        return self.n
+
+    # writes comment lines cmt[1:] (and further lines in cmt) after data block and closes file
+    def close(self, cmt=None):    # -> -
+        if self.f is None:
+            return
+        if self.ny is None:
+            self.write_header(0)
+        footer = '\n'.join(self.cmt[1:] + ([]  if cmt is None  else [cmt]  if type(cmt) == str  else list(cmt)))
+        if len(footer) > 0:
+            self.write((footer + '\n'))
+        self.write_npar()
+        self.f.close()
+        self.f = None
+
+    def write(self, txt):
+        self.f.write(txt.encode(self.enc)  if self.mode == 'bin'  else txt)
+
+    def write_header(self, ny):
+        self.ny = ny
+        self.rowfmt = '\t'.join([self.fmtstrx] + [self.fmtstry]*ny) + '\n'
+        self.write(f"{0.0}\n{0.0}\n")             # xmin, xmax: x-column is always stored (see svspec())
+        self.off3 = self.f.tell()
+        self.write(f"{self.n} {ny}".ljust(self.nwidth) + f"\n{self.cmt[0]}\n")
+        if self.mode == 'bin':
+            self.f.write(rdspec_bin_tag + f" {ny+1}\n".encode(self.enc))
+
+    # updates n in line 3 (in place) and flushes file, i.e. file is readable with all rows written so far
+    def write_npar(self):
+        self.f.flush()
+        self.f.seek(self.off3)
+        self.write(f"{self.n} {self.ny}".ljust(self.nwidth))
+        self.f.seek(0, 2)
+        self.f.flush()
 
 # --------------------------------------
 # example usage    
 if __name__ == "__main__":
-    from meas.savefile import savefile
+    from meas.rdspec import rdspec, rdspec_lazy
     x = np.arange(5)
     y = np.asarray([[4, 2.3, 1, 6, 2],
                     [2, 2.2, 2.5, 2.7, 2.9]]).T
     svspec('tmp.dat', x, y, ['comment1', 'comment2', 'comment3'])
-    
\ No newline at end of file
+    # text and binary file give the same data (also for a single y-column)
+    for yy in (y, y[:, 0]):
+        svspec('tmp.dat', x, yy, ['comment1', 'comment2'], '%.17g', '%.17g')
+        svspec('tmp_bin.dat', x, yy, ['comment1', 'comment2'], mode='bin')
+        rt, rb, rl = rdspec('tmp.dat'), rdspec('tmp_bin.dat'), rdspec_lazy('tmp_bin.dat')
+        assert rt[1].shape == rb[1].shape == np.shape(rl[1]), f"text {rt[1].shape} != bin {rb[1].shape} / lazy {np.shape(rl[1])}"
+        assert np.array_equal(rt[0], rb[0]) and np.array_equal(rt[1], rb[1]) and np.array_equal(rb[1], np.asarray(rl[1]))
+        assert rt[2] == rb[2] and rt[3] == rb[3]
+    print("text / binary round trip ok")